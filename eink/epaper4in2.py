@@ -26,7 +26,8 @@ SOFTWARE.
 """
 
 from micropython import const # type: ignore
-from time import sleep_ms # type: ignore
+from time import sleep_ms, ticks_ms, ticks_diff # type: ignore
+import machine # type: ignore
 import ustruct # type: ignore
 
 # Display resolution
@@ -65,9 +66,9 @@ RESOLUTION_SETTING             = const(0x61)
 #AUTO_MEASUREMENT_VCOM          = const(0x80)
 #READ_VCOM_VALUE                = const(0x81)
 VCM_DC_SETTING                 = const(0x82)
-#PARTIAL_WINDOW                 = const(0x90)
-#PARTIAL_IN                     = const(0x91)
-#PARTIAL_OUT                    = const(0x92)
+PARTIAL_WINDOW                 = const(0x90)
+PARTIAL_IN                     = const(0x91)
+PARTIAL_OUT                    = const(0x92)
 
 #PROGRAM_MODE                   = const(0xA0)
 #ACTIVE_PROGRAMMING             = const(0xA1)
@@ -76,8 +77,14 @@ VCM_DC_SETTING                 = const(0x82)
 
 BUSY = const(0)
 
+# BUSY保持有效超过该时长视为墨水屏卡死，抛出OSError而不是无限等待
+BUSY_TIMEOUT_MS = const(30000)
+
+# 分阶段计时的名称：复位、上电、数据上传、刷新、断电
+PHASES = ("reset", "power_on", "upload", "refresh", "power_off")
+
 class EPD:
-    def __init__(self, spi, cs, dc, rst, busy):
+    def __init__(self, spi, cs, dc, rst, busy, chunk_size=0):
         self.spi = spi
         self.cs = cs
         self.dc = dc
@@ -89,6 +96,22 @@ class EPD:
         self.busy.init(self.busy.IN)
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
+        # chunk_size为0时整帧一次spi.write；DMA单次传输有上限的板子可设为如4096分块发送
+        self.chunk_size = chunk_size
+        # 每个阶段最近一次和历史最长的耗时(ms)，历史最长值持续变大说明屏幕在老化
+        self.timings = {name: 0 for name in PHASES}
+        self.timings_max = {name: 0 for name in PHASES}
+        self.busy_timeout_ms = BUSY_TIMEOUT_MS
+        # BUSY释放(上升沿)时触发中断，唤醒等待中的协程或调用回调；不支持中断的移植版退回轮询
+        self._idle_flag = None
+        self._on_idle = None
+        try:
+            self.busy.irq(trigger=self.busy.IRQ_RISING, handler=self._busy_irq)
+            self.busy_irq = True
+        except (AttributeError, ValueError, OSError):
+            self.busy_irq = False
+        self.refresh_start = 0
+        self.partial_pending = False
 
     # 44/42 bytes (look up tables)
     LUT_VCOM0 = bytearray(b'\x00\x17\x00\x00\x00\x02\x00\x17\x17\x00\x00\x02\x00\x0A\x01\x00\x00\x01\x00\x0E\x0E\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
@@ -97,6 +120,13 @@ class EPD:
     LUT_BB    = bytearray(b'\x80\x17\x00\x00\x00\x02\x90\x17\x17\x00\x00\x02\x80\x0A\x01\x00\x00\x01\x50\x0E\x0E\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
     LUT_WB    = LUT_BB
 
+    # partial refresh look up tables, a single short phase without the full flashing sequence
+    LUT_VCOM1 = bytearray(b'\x00\x01\x20\x01\x00\x01' + b'\x00' * 38)
+    LUT_WW1   = bytearray(b'\x00\x01\x20\x01\x00\x01' + b'\x00' * 36)
+    LUT_BW1   = bytearray(b'\x20\x01\x20\x01\x00\x01' + b'\x00' * 36)
+    LUT_WB1   = bytearray(b'\x10\x01\x20\x01\x00\x01' + b'\x00' * 36)
+    LUT_BB1   = bytearray(b'\x00\x01\x20\x01\x00\x01' + b'\x00' * 36)
+
     def _command(self, command, data=None):
         self.dc(0)
         self.cs(0)
@@ -111,18 +141,114 @@ class EPD:
         self.spi.write(data)
         self.cs(1)
 
+    def _data_bulk(self, data):
+        # 在同一个CS窗口内发送整块数据，避免逐字节切换DC/CS和分配bytearray
+        mv = memoryview(data)
+        n = len(mv)
+        step = self.chunk_size if self.chunk_size > 0 else n
+        self.dc(1)
+        self.cs(0)
+        for i in range(0, n, step):
+            self.spi.write(mv[i:i + step])
+        self.cs(1)
+
     def init(self):
+        t0 = ticks_ms()
         self.reset()
+        self._phase("reset", t0)
         self._command(POWER_SETTING, b'\x03\x00\x2B\x2B\xFF') # VDS_EN VDG_EN, VCOM_HV VGHL_LV[1] VGHL_LV[0], VDH, VDL, VDHR
         self._command(BOOSTER_SOFT_START, b'\x17\x17\x17') # 07 0f 17 1f 27 2F 37 2f
+        t0 = ticks_ms()
         self._command(POWER_ON)
         self.wait_until_idle()
+        self._phase("power_on", t0)
         self._command(PANEL_SETTING, b'\xBF\x0B') # KW-BF   KWR-AF  BWROTP 0f
         self._command(PLL_CONTROL, b'\x3C') # 3A 100HZ   29 150Hz 39 200HZ  31 171HZ
 
-    def wait_until_idle(self):
+    def _phase(self, name, t0):
+        # 记录一个阶段的耗时
+        ms = ticks_diff(ticks_ms(), t0)
+        self.timings[name] = ms
+        if ms > self.timings_max[name]:
+            self.timings_max[name] = ms
+        return ms
+
+    def _busy_irq(self, pin):
+        # BUSY上升沿中断(软中断，在调度器中运行)：唤醒协程，调用一次性回调
+        if self._idle_flag is not None:
+            self._idle_flag.set()
+        callback = self._on_idle
+        if callback is not None:
+            self._on_idle = None
+            callback()
+
+    def _busy_timeout(self, t0):
+        # 超时的刷新不会再调用finish_refresh()，先退出局部模式，让控制器回到正常状态
+        self._leave_partial()
+        raise OSError(f"墨水屏BUSY超时: {ticks_diff(ticks_ms(), t0)}ms")
+
+    def wait_until_idle(self, timeout_ms=None):
+        # 等待BUSY释放；有中断时machine.idle()会在中断或系统节拍后立即返回，不再固定睡眠100ms
+        # 超过timeout_ms(默认busy_timeout_ms)仍未释放时抛出OSError
+        timeout_ms = timeout_ms or self.busy_timeout_ms
+        t0 = ticks_ms()
+        while self.busy.value() == BUSY:
+            if ticks_diff(ticks_ms(), t0) > timeout_ms:
+                self._busy_timeout(t0)
+            if self.busy_irq:
+                machine.idle()
+            else:
+                sleep_ms(10)
+
+    async def wait_until_idle_async(self, timeout_ms=None):
+        # 协程版本，等待BUSY中断期间让出CPU，事件循环可以继续处理其他连接
+        import uasyncio as asyncio # type: ignore
+        timeout_ms = timeout_ms or self.busy_timeout_ms
+        t0 = ticks_ms()
+        if self.busy_irq and self._idle_flag is None:
+            self._idle_flag = asyncio.ThreadSafeFlag()
         while self.busy.value() == BUSY:
+            remaining = timeout_ms - ticks_diff(ticks_ms(), t0)
+            if remaining <= 0:
+                self._busy_timeout(t0)
+            if not self.busy_irq:
+                await asyncio.sleep_ms(20)
+                continue
+            # 标志可能是上一次刷新遗留的，醒来后总是重新检查BUSY电平
+            try:
+                await asyncio.wait_for_ms(self._idle_flag.wait(), remaining)
+            except asyncio.TimeoutError:
+                self._busy_timeout(t0)
+
+    def on_idle(self, callback):
+        # 回调版本：BUSY释放时在中断中调用一次callback()，已经空闲时立即调用
+        # 回调没有超时，需要超时的场合使用wait_until_idle/wait_until_idle_async
+        if not self.busy_irq:
+            raise OSError("BUSY引脚不支持中断")
+        self._on_idle = callback
+        if self.busy.value() != BUSY and self._on_idle is not None:
+            self._on_idle = None
+            callback()
+
+    def finish_refresh(self):
+        # 刷新完成(BUSY释放)后调用，记录刷新耗时，局部刷新时退出局部模式
+        self._phase("refresh", self.refresh_start)
+        self._leave_partial()
+
+    def _leave_partial(self):
+        # 上一次局部刷新还没有退出局部模式时(如等待BUSY超时)发送PARTIAL_OUT
+        if self.partial_pending:
+            self.partial_pending = False
+            self._command(PARTIAL_OUT)
+
+    def _start_refresh(self, wait):
+        # 发出刷新命令；wait=False时立即返回，由调用方等待BUSY后调用finish_refresh()
+        self.refresh_start = ticks_ms()
+        self._command(DISPLAY_REFRESH)
+        if wait:
             sleep_ms(100)
+            self.wait_until_idle()
+            self.finish_refresh()
 
     def reset(self):
         self.rst(0)
@@ -137,8 +263,63 @@ class EPD:
         self._command(LUT_WHITE_TO_BLACK, self.LUT_BB) # wb w
         self._command(LUT_BLACK_TO_BLACK, self.LUT_WB) # bb b
 
+    def set_lut_partial(self):
+        self._command(LUT_FOR_VCOM, self.LUT_VCOM1)
+        self._command(LUT_WHITE_TO_WHITE, self.LUT_WW1)
+        self._command(LUT_BLACK_TO_WHITE, self.LUT_BW1)
+        self._command(LUT_WHITE_TO_BLACK, self.LUT_WB1)
+        self._command(LUT_BLACK_TO_BLACK, self.LUT_BB1)
+
+    def _data_rows(self, frame_buffer, x, y, w, h):
+        # send the byte-aligned window (x, y, w, h) of a full frame buffer in one CS window
+        mv = memoryview(frame_buffer)
+        stride = self.width // 8
+        start = y * stride + x // 8
+        nbytes = w // 8
+        self.dc(1)
+        self.cs(0)
+        for _ in range(h):
+            self.spi.write(mv[start:start + nbytes])
+            start += stride
+        self.cs(1)
+
+    # refresh only a window of the panel, x and w must be multiples of 8
+    # old_buffer holds what is currently on the glass, the controller needs it to pick the waveform
+    def display_window(self, frame_buffer, old_buffer, x, y, w, h, wait=True):
+        x_end = x + w - 1
+        y_end = y + h - 1
+        self._leave_partial()
+        # build the window before entering partial mode, so a bad window cannot leave the panel stuck in it
+        window = bytearray([
+            x >> 8, x & 0xF8,
+            x_end >> 8, (x_end & 0xF8) | 0x07,
+            y >> 8, y & 0xFF,
+            y_end >> 8, y_end & 0xFF,
+            0x01]) # gates scan both inside and outside of the partial window
+        self._command(VCM_DC_SETTING, b'\x08')
+        self._command(VCOM_AND_DATA_INTERVAL_SETTING, b'\x47')
+        self.set_lut_partial()
+        self._command(PARTIAL_IN)
+        try:
+            self._command(PARTIAL_WINDOW, window)
+            t0 = ticks_ms()
+            self._command(DATA_START_TRANSMISSION_1)
+            self._data_rows(old_buffer, x, y, w, h)
+            self._command(DATA_START_TRANSMISSION_2)
+            self._data_rows(frame_buffer, x, y, w, h)
+            self._phase("upload", t0)
+        except Exception:
+            # upload failed, leave partial mode before passing the error on
+            self._command(PARTIAL_OUT)
+            raise
+        sleep_ms(2)
+
+        self.partial_pending = True
+        self._start_refresh(wait)
+
     # draw the current frame memory
-    def display_frame(self, frame_buffer):
+    def display_frame(self, frame_buffer, wait=True):
+        self._leave_partial()
         self._command(RESOLUTION_SETTING, ustruct.pack(">HH", EPD_WIDTH, EPD_HEIGHT))
         self._command(VCM_DC_SETTING, b'\x12')
         self._command(VCOM_AND_DATA_INTERVAL_SETTING)
@@ -150,25 +331,43 @@ class EPD:
             # for i in range(0, self.width * self.height // 8):
             #     self._data(bytearray([0xFF])) # bit set: white, bit reset: black
             # sleep_ms(2)
+            t0 = ticks_ms()
             self._command(DATA_START_TRANSMISSION_2)
-            for i in range(0, self.width * self.height // 8):
-                self._data(bytearray([frame_buffer[i]]))
+            self._data_bulk(memoryview(frame_buffer)[:self.width * self.height // 8])
+            self._phase("upload", t0)
             sleep_ms(2)
 
         self.set_lut()
-        self._command(DISPLAY_REFRESH)
-        sleep_ms(100)
-        self.wait_until_idle()
+        self._start_refresh(wait)
 
     # to wake call reset() or init()
     def sleep(self):
+        self._leave_partial()
         self._command(VCOM_AND_DATA_INTERVAL_SETTING, b'\x17') # border floating
         self._command(VCM_DC_SETTING) # VCOM to 0V
         self._command(PANEL_SETTING)
         sleep_ms(100)
         self._command(POWER_SETTING, b'\x00\x00\x00\x00\x00') # VG&VS to 0V fast
         sleep_ms(100)
+        t0 = ticks_ms()
         self._command(POWER_OFF)
         self.wait_until_idle()
+        self._phase("power_off", t0)
+        self._command(DEEP_SLEEP, b'\xA5')
+
+    async def sleep_async(self):
+        # sleep()的协程版本，等待断电(BUSY)期间让出CPU
+        import uasyncio as asyncio # type: ignore
+        self._leave_partial()
+        self._command(VCOM_AND_DATA_INTERVAL_SETTING, b'\x17') # border floating
+        self._command(VCM_DC_SETTING) # VCOM to 0V
+        self._command(PANEL_SETTING)
+        await asyncio.sleep_ms(100)
+        self._command(POWER_SETTING, b'\x00\x00\x00\x00\x00') # VG&VS to 0V fast
+        await asyncio.sleep_ms(100)
+        t0 = ticks_ms()
+        self._command(POWER_OFF)
+        await self.wait_until_idle_async()
+        self._phase("power_off", t0)
         self._command(DEEP_SLEEP, b'\xA5')
 
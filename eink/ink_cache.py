@@ -0,0 +1,146 @@
+import uos # type: ignore
+import ujson # type: ignore
+import ink_http
+
+class FileCache:
+    """
+    保存在闪存目录中的文件缓存，超出字节预算时按最近最少使用(LRU)淘汰。
+    索引文件记录每个key的大小和最近访问序号，重启后依然有效。
+    命中只更新内存中的访问序号，不写闪存，写入、删除、淘汰缓存或调用flush()时才保存索引。
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, dirname="cache", max_bytes=100 * 1024):
+        """
+        :param dirname: 缓存目录
+        :param max_bytes: 缓存文件总大小上限（字节）
+        """
+        self.dirname = dirname
+        self.max_bytes = max_bytes
+        # 本次运行以来的命中/未命中次数
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False  # 内存中的访问序号有还没保存到索引文件的变化
+        try:
+            uos.stat(dirname)
+        except OSError:
+            uos.mkdir(dirname)
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self._path(self.INDEX_FILE), "r") as f:
+                data = ujson.load(f)
+            self.entries = data["entries"]  # key -> [大小, 最近访问序号]
+            self.seq = data["seq"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+            self.seq = 0
+
+    def _save_index(self):
+        with open(self._path(self.INDEX_FILE), "w") as f:
+            ujson.dump({"entries": self.entries, "seq": self.seq}, f)
+        self._dirty = False
+
+    def flush(self):
+        """把命中后更新的访问序号保存到索引文件，没有变化时不写闪存"""
+        if self._dirty:
+            self._save_index()
+
+    def _path(self, key):
+        return self.dirname + "/" + key
+
+    def _remove(self, key):
+        try:
+            uos.remove(self._path(key))
+        except OSError:
+            pass
+        self.entries.pop(key, None)
+
+    def remove(self, key):
+        """删除一个缓存条目，如内容已损坏的文件"""
+        self._remove(key)
+        self._save_index()
+
+    def total_bytes(self):
+        return sum(entry[0] for entry in self.entries.values())
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """返回key对应的缓存文件路径并标记为最近使用，不存在时返回None"""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.seq += 1
+        self.entries[key][1] = self.seq
+        self._dirty = True
+        return self._path(key)
+
+    def stats(self):
+        """返回命中次数、未命中次数、缓存条目数和总字节数"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.total_bytes()}
+
+    def _evict(self, reserve):
+        # 按LRU顺序删除缓存，返回删除的条目数，不保存索引
+        total = self.total_bytes()
+        removed = 0
+        while self.entries and total + reserve > self.max_bytes:
+            oldest = min(self.entries, key=lambda k: self.entries[k][1])
+            total -= self.entries[oldest][0]
+            print(f"缓存淘汰: {oldest}")
+            self._remove(oldest)
+            removed += 1
+        return removed
+
+    def evict(self, reserve=0):
+        """按LRU顺序删除缓存，直到总大小加上reserve字节不超过预算"""
+        if self._evict(reserve):
+            self._save_index()
+
+    def _commit(self, key, tmp_path, size):
+        # 临时文件写完整后再替换正式文件，避免断电留下半个文件
+        self._remove(key)
+        self._evict(size)
+        uos.rename(tmp_path, self._path(key))
+        self.seq += 1
+        self.entries[key] = [size, self.seq]
+        self._save_index()
+
+    def put(self, key, data):
+        """把字节数据写入缓存，返回文件路径"""
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        self._commit(key, tmp_path, len(data))
+        return self._path(key)
+
+    def fetch(self, key, url, chunk_size=1024):
+        """下载url并分块写入缓存，不在内存中保存完整响应体，返回文件路径"""
+        response = ink_http.get(url)
+        tmp_path = self._path(key) + ".tmp"
+        size = 0
+        try:
+            if response.status_code != 200:
+                raise OSError(f"下载失败，状态码: {response.status_code}")
+            buf = bytearray(chunk_size)
+            mv = memoryview(buf)
+            with open(tmp_path, "wb") as f:
+                while True:
+                    n = response.raw.readinto(buf)
+                    if not n:
+                        break
+                    f.write(mv[:n])
+                    size += n
+        except Exception:
+            try:
+                uos.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            response.close()
+        self._commit(key, tmp_path, size)
+        return self._path(key)
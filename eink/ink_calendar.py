@@ -1,28 +1,71 @@
 import time # type: ignore
+import network # type: ignore
 import ink_display
-ink = ink_display.InkDisplay()
+import ink_cache
+import ink_http
+
+CALENDAR_URL = "https://pubdz.paperol.cn/bin/万年历{}.bin"
+# 联网时预取今天及之后PREFETCH_DAYS天的万年历，缓存总大小不超过CACHE_MAX_BYTES
+PREFETCH_DAYS = 3
+CACHE_MAX_BYTES = 8 * 15000
+cache = ink_cache.FileCache("calendar", CACHE_MAX_BYTES)
+
+def date_str(offset_days=0):
+    # 返回今天之后offset_days天的日期字符串，如20260201
+    t = time.localtime(time.time() + offset_days * 86400)
+    return "{:04d}{:02d}{:02d}".format(t[0], t[1], t[2])
+
+def prefetch(days=PREFETCH_DAYS):
+    # 批量下载缓存中还没有的万年历，服务端通常只提前生成次日的，下载失败即停止
+    if not network.WLAN(network.STA_IF).isconnected():
+        print("未联网，跳过万年历预取")
+        return 0
+    fetched = 0
+    for i in range(days + 1):
+        day = date_str(i)
+        key = day + ".bin"
+        if key in cache:
+            continue
+        try:
+            cache.fetch(key, CALENDAR_URL.format(day))
+            fetched += 1
+            print(f"已缓存万年历{day}")
+        except Exception as e:
+            print(f"预取万年历{day}失败: {e}")
+            break
+    return fetched
 
 def show_calendar():
-    current_time = time.localtime()
-    year = current_time[0]
-    month = current_time[1]
-    day = current_time[2]
-    if len(str(day)) == 1:
-        day = "0" + str(day)
-    if len(str(month)) == 1:
-        month = "0" + str(month)
-    today_str = f"{year}{month}{day}"
+    today_str = date_str()
     print(today_str)
 
-    bin_url = f"https://pubdz.paperol.cn/bin/万年历{today_str}.bin"
-
+    ink = ink_display.get_display()
     ink.clear()
+    prefetched = False
     try:
         print("显示万年历")
-        res = ink.display_bin_url(bin_url)
+        path = cache.get(today_str + ".bin")
+        if path is None:
+            prefetched = True
+            prefetch()
+            path = cache.get(today_str + ".bin")
+        if path is None:
+            print("没有今天的万年历")
+            return False
+        ink.display_bin_file(path)
         return True
     except Exception as e:
         print(f"显示万年历错误{e}")
         return False
     finally:
-        ink.show()
\ No newline at end of file
+        ink.show()
+        # 刷新完成后趁联网预取后面几天的万年历，第二天早上直接从闪存显示；
+        # 未命中时已经预取过，不再重复，避免网络故障时再经历一轮请求和超时
+        if not prefetched:
+            prefetch()
+        # 这一批下载都复用同一个连接，结束后关闭空闲连接，释放TLS占用的内存
+        ink_http.close_idle()
+        # 今天命中缓存时只更新了内存中的访问序号，在这里统一写回闪存
+        cache.flush()
+        # 下一次更新要等到明天，直接让墨水屏睡眠
+        ink.sleep()
@@ -0,0 +1,171 @@
+"""
+墨水屏图片的压缩格式，设备端(MicroPython)和电脑端(CPython)通用。
+
+文件/数据格式：
+    4字节魔数 b'EPK\\x01'，2字节宽，2字节高（大端），后面是MONO_HLSB像素数据的PackBits压缩流。
+没有魔数的数据按原始MONO_HLSB处理，所以旧的.bin文件可以继续使用。
+
+电脑端把原始.bin转换为压缩格式：
+    python ink_codec.py encode byte_array.bin byte_array.epk
+"""
+import struct
+
+MAGIC = b'EPK\x01'
+HEADER_SIZE = 8
+
+# 常见的全白/全黑重复块，解码时直接切片，避免每次分配
+_FILL_FF = memoryview(b'\xff' * 128)
+_FILL_00 = memoryview(b'\x00' * 128)
+
+def parse_header(data):
+    """data以压缩格式的头开始时返回(宽, 高)，否则返回None"""
+    if len(data) >= HEADER_SIZE and bytes(data[:4]) == MAGIC:
+        return struct.unpack_from(">HH", data, 4)
+    return None
+
+def frame_size(width, height):
+    """MONO_HLSB格式一帧的字节数，每行按字节对齐"""
+    return (width + 7) // 8 * height
+
+class PackBitsDecoder:
+    """
+    PackBits流式解码器，压缩数据可以分多次feed，解码结果直接写入out缓冲区。
+    """
+    def __init__(self, out):
+        """
+        :param out: 可写缓冲区，如InkDisplay.buf
+        """
+        self.out = memoryview(out)
+        self.pos = 0
+        self.literal = 0  # 还需要原样拷贝的字节数
+        self.repeat = 0   # 下一个字节需要重复的次数
+
+    def done(self):
+        return self.pos >= len(self.out)
+
+    def feed(self, data):
+        data = memoryview(data)
+        out = self.out
+        pos = self.pos
+        limit = len(out)
+        i = 0
+        n = len(data)
+        while i < n:
+            if self.literal:
+                k = min(self.literal, n - i)
+                if pos + k > limit:
+                    raise ValueError("解码数据超出缓冲区")
+                out[pos:pos + k] = data[i:i + k]
+                pos += k
+                i += k
+                self.literal -= k
+            elif self.repeat:
+                k = self.repeat
+                if pos + k > limit:
+                    raise ValueError("解码数据超出缓冲区")
+                value = data[i]
+                if value == 0xFF:
+                    out[pos:pos + k] = _FILL_FF[:k]
+                elif value == 0:
+                    out[pos:pos + k] = _FILL_00[:k]
+                else:
+                    out[pos:pos + k] = bytes((value,)) * k
+                pos += k
+                i += 1
+                self.repeat = 0
+            else:
+                h = data[i]
+                i += 1
+                if h < 128:
+                    self.literal = h + 1
+                elif h > 128:
+                    self.repeat = 257 - h
+                # 128为空操作
+        self.pos = pos
+        return pos
+
+def decode_into(data, out):
+    """把完整的压缩数据（含头）解码到out，返回(宽, 高)"""
+    size = parse_header(data)
+    if size is None:
+        raise ValueError("不是压缩格式的图片")
+    decoder = PackBitsDecoder(memoryview(out)[:frame_size(size[0], size[1])])
+    decoder.feed(memoryview(data)[HEADER_SIZE:])
+    if not decoder.done():
+        raise ValueError("压缩数据不完整")
+    return size
+
+def decode_stream(stream, out, first=b'', chunk_size=512):
+    """
+    从文件或socket分块读取压缩流并解码到out，头部已由调用方读取。
+    :param first: 已经读出的压缩流开头部分
+    :return: 从stream读取的字节数
+    """
+    decoder = PackBitsDecoder(out)
+    decoder.feed(first)
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    nbytes = 0
+    while not decoder.done():
+        n = stream.readinto(buf)
+        if not n:
+            break
+        nbytes += n
+        decoder.feed(mv[:n])
+    if not decoder.done():
+        raise ValueError(f"压缩数据不完整，已解码{decoder.pos}/{len(decoder.out)}字节")
+    return nbytes
+
+def packbits_encode(data):
+    """PackBits压缩：重复段编码为(257-n, 字节)，其余为(n-1, n个原始字节)，n最大128"""
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and j - i < 128 and data[j] == data[i]:
+            j += 1
+        if j - i >= 2:
+            out.append(257 - (j - i))
+            out.append(data[i])
+            i = j
+            continue
+        # 原始字节段，遇到3个以上的重复字节时结束
+        start = i
+        i += 1
+        while i < n and i - start < 128:
+            if i + 2 < n and data[i] == data[i + 1] == data[i + 2]:
+                break
+            i += 1
+        out.append(i - start - 1)
+        out.extend(data[start:i])
+    return bytes(out)
+
+def encode(data, width=400, height=300):
+    """把MONO_HLSB格式的一帧压缩为带头的压缩格式"""
+    if len(data) != frame_size(width, height):
+        raise ValueError(f"数据长度{len(data)}与尺寸{width}x{height}不符")
+    return MAGIC + struct.pack(">HH", width, height) + packbits_encode(data)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="墨水屏图片压缩格式转换")
+    parser.add_argument("action", choices=["encode", "decode"])
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--width", type=int, default=400)
+    parser.add_argument("--height", type=int, default=300)
+    args = parser.parse_args()
+
+    with open(args.src, "rb") as f:
+        src = f.read()
+    if args.action == "encode":
+        dst = encode(src, args.width, args.height)
+    else:
+        width, height = parse_header(src) or (args.width, args.height)
+        dst = bytearray(frame_size(width, height))
+        decode_into(src, dst)
+    with open(args.dst, "wb") as f:
+        f.write(dst)
+    print(f"{args.src}: {len(src)}字节 -> {args.dst}: {len(dst)}字节")
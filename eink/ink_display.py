@@ -3,9 +3,14 @@ from epaper4in2 import EPD, EPD_WIDTH, EPD_HEIGHT
 import framebuf # type: ignore
 from micropython import const # type: ignore
 import ujson # type: ignore
-import urequests # type: ignore
+import ink_http
 import uos # type: ignore
 import ubinascii # type: ignore
+import gc
+import ink_codec
+import ink_cache
+import ink_font
+from time import sleep_ms, ticks_ms, ticks_diff # type: ignore
 
 # esp32
 # 硬件SPI
@@ -23,14 +28,70 @@ import ubinascii # type: ignore
 # rst=Pin(2)-D4, dc=Pin(4)-D2, cs=Pin(15)-D8 , busy=Pin(5)-D1
 # (SPI(0) is used for FlashROM and not available to users.)
 
+# 默认SPI时钟。墨水屏没有接MISO，无法回读校验某个时钟是否可靠，SPI()构造时也不会拒绝过高的时钟，
+# 所以不做探测，按控制器数据手册的写入时钟周期(最短100ns)取10MHz；接线较长、画面出现错位时调低
+SPI_BAUDRATE = const(10000000)
+
+# 变化区域超过屏幕面积的一半时，局部刷新不再划算，改为全屏刷新
+PARTIAL_MAX_AREA = const(400 * 300 // 2)
+
+# 保存最近一次刷新到屏幕上的画面指纹(CRC32)，重启后也能判断画面是否变化
+FRAME_CRC_FILE = "ink_frame.crc"
+
+# 墨水屏空闲超过该时长后进入深度睡眠，下次刷新前再唤醒
+IDLE_SLEEP_MS = const(60000)
+
+# 云函数渲染结果的缓存：相同的请求JSON直接从闪存显示，不再联网；按压缩后的大小计入预算
+JSONDATA_URL = "https://imagepil-ebseiglznc.cn-zhangjiakou.fcapp.run"
+JSONDATA_CACHE_DIR = "jsoncache"
+JSONDATA_CACHE_MAX_BYTES = 64 * 1024
+
+def canonical_json(obj):
+    # 规范化的JSON字符串：字典按键排序、不带多余空格，内容相同的请求得到相同的字符串
+    if isinstance(obj, dict):
+        return "{" + ",".join(ujson.dumps(str(k)) + ":" + canonical_json(obj[k]) for k in sorted(obj)) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(canonical_json(v) for v in obj) + "]"
+    return ujson.dumps(obj)
+
+def jsondata_key(data):
+    # 缓存键：规范化请求JSON的SHA-256
+    import uhashlib # type: ignore
+    digest = uhashlib.sha256(canonical_json(data).encode('utf-8')).digest()
+    return ubinascii.hexlify(digest).decode() + ".epk"
+
+# 进程内共享的显示实例，第一次使用时才创建，避免每次请求重新初始化SPI、帧缓冲和墨水屏
+_display = None
+
+def get_display():
+    global _display
+    if _display is None:
+        _display = InkDisplay()
+    return _display
+
+def idle_check():
+    # 由主循环周期性调用，空闲超时后让墨水屏睡眠
+    if _display is not None:
+        _display.sleep_if_idle()
+
+async def idle_check_async():
+    # idle_check()的协程版本，由事件循环中的后台任务周期性调用
+    if _display is not None:
+        await _display.sleep_if_idle_async()
+
 class InkDisplay():
-    def __init__(self) -> None:
-        self.hspi = SPI(1, baudrate=10000000,sck=Pin(14), mosi=Pin(13), miso=Pin(12))
+    def __init__(self, baudrate=SPI_BAUDRATE, chunk_size=0, partial=True, full_refresh_every=10, idle_sleep_ms=IDLE_SLEEP_MS) -> None:
+        # chunk_size: 整帧上传时每次spi.write的最大字节数，0为一次写完
+        # partial: 是否启用局部刷新；full_refresh_every: 连续局部刷新N次后强制全屏刷新一次以消除残影
+        self.hspi = self._open_spi(baudrate)
         # self.hspi = SPI(1, baudrate=10000000, polarity=0, phase=0)
         self.hspi.init()
-        self.epaper = EPD(self.hspi, rst=Pin(37), dc=Pin(38), cs=Pin(39) , busy=Pin(40))
+        self.epaper = EPD(self.hspi, rst=Pin(37), dc=Pin(38), cs=Pin(39) , busy=Pin(40), chunk_size=chunk_size)
         # self.epaper = EPD(self.hspi, rst=Pin(2), dc=Pin(4), cs=Pin(15) , busy=Pin(5)) 
         self.epaper.init()
+        self.awake = True
+        self.idle_sleep_ms = idle_sleep_ms
+        self.last_used = ticks_ms()
 
         # Display resolution
         self.EPD_WIDTH  = const(400)
@@ -41,54 +102,425 @@ class InkDisplay():
         # 创建帧缓冲
         self.buf = bytearray(self.EPD_WIDTH * self.EPD_HEIGHT // 8)
         self.fb = framebuf.FrameBuffer(self.buf , self.EPD_WIDTH, self.EPD_HEIGHT, framebuf.MONO_HLSB)
+        # 最近一次blit用到的图片缓冲及其FrameBuffer包装：(image_array, width, height, fbimage)
+        self._img_cache = None
+
+        # 局部刷新：dirty为自上次刷新以来被绘制过的区域(x0, y0, x1, y1)，shown为屏幕上当前显示内容的副本
+        self.partial = partial
+        self.full_refresh_every = full_refresh_every
+        self.partial_count = 0
+        self.dirty = None
+        self.shown = None
+        self.last_crc = self._load_crc()
+        # show_async()和sleep_async()使用的刷新锁，见_lock()
+        self._show_lock = None
+        # display_jsondata的渲染结果缓存，第一次使用时才创建目录
+        self._json_cache = None
+        # 本地点阵字体，第一次显示文字时才扫描字体目录
+        self._fonts = None
     
-    def show(self):
-        # 显示buf中的内容
-        self.epaper.display_frame(self.buf)
+    def _open_spi(self, baudrate):
+        # 创建SPI总线，时钟固定为baudrate，见SPI_BAUDRATE
+        self.baudrate = baudrate
+        return SPI(1, baudrate=baudrate, sck=Pin(14), mosi=Pin(13), miso=Pin(12))
+
+    def mark_dirty(self, x, y, w, h):
+        # 记录被绘制过的区域，直接操作self.fb时也应调用此方法
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.EPD_WIDTH)
+        y1 = min(y + h, self.EPD_HEIGHT)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self.dirty is None:
+            self.dirty = (x0, y0, x1, y1)
+        else:
+            d = self.dirty
+            self.dirty = (min(d[0], x0), min(d[1], y0), max(d[2], x1), max(d[3], y1))
+
+    def _dirty_window(self):
+        # 计算需要局部刷新的字节对齐窗口(x, y, w, h)，返回None表示应当全屏刷新
+        if self.dirty is None:
+            return None
+        x0, y0, x1, y1 = self.dirty
+        x0 &= ~7
+        x1 = (x1 + 7) & ~7
+        # 与屏幕上的内容逐行比较，收缩掉首尾没有实际变化的行
+        buf = memoryview(self.buf)
+        shown = memoryview(self.shown)
+        stride = self.EPD_WIDTH // 8
+        a = x0 // 8
+        b = x1 // 8
+        while y0 < y1 and buf[y0 * stride + a:y0 * stride + b] == shown[y0 * stride + a:y0 * stride + b]:
+            y0 += 1
+        while y1 > y0 and buf[(y1 - 1) * stride + a:(y1 - 1) * stride + b] == shown[(y1 - 1) * stride + a:(y1 - 1) * stride + b]:
+            y1 -= 1
+        if y0 >= y1 or (x1 - x0) * (y1 - y0) > PARTIAL_MAX_AREA:
+            return None
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _load_crc(self):
+        try:
+            with open(FRAME_CRC_FILE, "r") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _save_crc(self, crc):
+        self.last_crc = crc
+        try:
+            with open(FRAME_CRC_FILE, "w") as f:
+                f.write(str(crc))
+        except OSError as e:
+            print(f"保存画面指纹失败: {e}")
+
+    def sleep(self):
+        # 让墨水屏进入深度睡眠，画面保持不变，帧缓冲和SPI总线保留
+        if self.awake:
+            self.epaper.sleep()
+            self._slept()
+
+    async def sleep_async(self):
+        # sleep()的协程版本，等待断电(BUSY)期间让出CPU；与show_async()共用刷新锁，不会插在刷新过程中
+        async with self._lock():
+            if self.awake:
+                await self.epaper.sleep_async()
+                self._slept()
+
+    def _slept(self):
+        self.awake = False
+        print("墨水屏进入睡眠")
+        # 空闲时把渲染缓存命中后更新的访问序号写回闪存
+        if self._json_cache is not None:
+            self._json_cache.flush()
+
+    def wake(self):
+        # 从深度睡眠唤醒，只需复位并重新初始化控制器
+        if not self.awake:
+            self.epaper.init()
+            self.awake = True
+            timings = self.epaper.timings
+            print(f"墨水屏唤醒: 复位{timings['reset']}ms, 上电{timings['power_on']}ms")
+        self.last_used = ticks_ms()
+
+    def _idle(self):
+        return self.awake and ticks_diff(ticks_ms(), self.last_used) > self.idle_sleep_ms
+
+    def sleep_if_idle(self):
+        if self._idle():
+            self.sleep()
+
+    async def sleep_if_idle_async(self):
+        if self._idle():
+            async with self._lock():
+                # 等锁期间可能刚刷新过，拿到锁后再确认一次
+                if self._idle():
+                    await self.epaper.sleep_async()
+                    self._slept()
+
+    def _begin_show(self, full, force):
+        # 计算刷新方式并上传画面、发出刷新命令，不等待刷新完成；画面未变化时返回None
+        crc = ubinascii.crc32(self.buf)
+        if crc == self.last_crc and not force:
+            self.dirty = None
+            print("画面未变化，跳过刷新")
+            return None
+        self.wake()
+        window = None
+        if not (full or force) and self.partial and self.shown is not None and self.partial_count < self.full_refresh_every:
+            window = self._dirty_window()
+        if window is None:
+            self.epaper.display_frame(self.buf, wait=False)
+        else:
+            x, y, w, h = window
+            self.epaper.display_window(self.buf, self.shown, x, y, w, h, wait=False)
+        return crc, window
+
+    def _end_show(self, crc, window, t0):
+        # 刷新完成后更新屏幕副本、画面指纹等状态
+        self.epaper.finish_refresh()
+        if window is None:
+            self.partial_count = 0
+            if self.partial:
+                if self.shown is None:
+                    self.shown = bytearray(len(self.buf))
+                memoryview(self.shown)[:] = self.buf
+            mode = "全屏"
+        else:
+            x, y, w, h = window
+            self.partial_count += 1
+            # 只同步刷新过的窗口到屏幕副本
+            buf = memoryview(self.buf)
+            shown = memoryview(self.shown)
+            stride = self.EPD_WIDTH // 8
+            start = y * stride + x // 8
+            for _ in range(h):
+                shown[start:start + w // 8] = buf[start:start + w // 8]
+                start += stride
+            mode = f"局部({x},{y},{w}x{h})"
+        self.dirty = None
+        self.last_used = ticks_ms()
+        if crc != self.last_crc:
+            self._save_crc(crc)
+        timings = self.epaper.timings
+        print(f"{mode}刷新完成: SPI {self.baudrate}Hz, 上传{timings['upload']}ms, 刷新{timings['refresh']}ms(最长{self.epaper.timings_max['refresh']}ms), 总计{ticks_diff(ticks_ms(), t0)}ms")
+
+    def show(self, full=False, force=False):
+        # 显示buf中的内容；只有小范围变化时局部刷新变化窗口，full=True强制全屏刷新
+        # 画面与屏幕上已显示的内容相同时跳过刷新并返回False，force=True时无论如何都全屏刷新
+        t0 = ticks_ms()
+        started = self._begin_show(full, force)
+        if started is None:
+            return False
+        sleep_ms(100)
+        self.epaper.wait_until_idle()
+        self._end_show(started[0], started[1], t0)
+        return True
+
+    def _lock(self):
+        # show_async()和sleep_async()共用的刷新锁，第一次使用时才创建
+        if self._show_lock is None:
+            import uasyncio as asyncio # type: ignore
+            self._show_lock = asyncio.Lock()
+        return self._show_lock
+
+    async def show_async(self, full=False, force=False):
+        # show()的协程版本，等待墨水屏刷新(数秒)期间让出CPU，服务器可以继续响应其他请求
+        # 多个协程同时刷新时按顺序进行，避免刷新过程中改写屏幕副本
+        import uasyncio as asyncio # type: ignore
+        async with self._lock():
+            t0 = ticks_ms()
+            started = self._begin_show(full, force)
+            if started is None:
+                return False
+            await asyncio.sleep_ms(100)
+            await self.epaper.wait_until_idle_async()
+            self._end_show(started[0], started[1], t0)
+            return True
     
     def clear(self,color=1):
         # 清屏，默认为白色
         self.fb.fill(color)
+        self.mark_dirty(0, 0, self.EPD_WIDTH, self.EPD_HEIGHT)
+
+    def clear_area(self, x, y, w, h, color=1):
+        # 清除一块矩形区域，默认为白色，适合时钟、计数等局部更新前擦除旧内容
+        self.fb.fill_rect(x, y, w, h, color)
+        self.mark_dirty(x, y, w, h)
         
     def displaychar(self,text,pos_x=50,pos_y=50):
         # 显示英文字符
         self.fb.text(text, pos_x, pos_y, self.black)
+        self.mark_dirty(pos_x, pos_y, 8 * len(text), 8)
 
     def displaypixle(self,x,y,color=1):
         # 显示像素
         self.fb.pixel(x,y,color)
+        self.mark_dirty(x, y, 1, 1)
+
+    def _image_fb(self, image_array, width, height):
+        # 返回图片缓冲对应的FrameBuffer，同一个bytearray重复绘制时复用缓存的包装对象
+        cached = self._img_cache
+        if cached is not None and cached[0] is image_array and cached[1] == width and cached[2] == height:
+            return cached[3]
+        try:
+            fbimage = framebuf.FrameBuffer(image_array, width, height, framebuf.MONO_HLSB)
+        except TypeError:
+            # FrameBuffer需要可写缓冲，bytes等只读数据先拷贝一份，且不缓存
+            return framebuf.FrameBuffer(bytearray(image_array), width, height, framebuf.MONO_HLSB)
+        if isinstance(image_array, bytearray):
+            self._img_cache = (image_array, width, height, fbimage)
+        return fbimage
 
     def displayimg(self,image_array,width,height,pos_x=50,pos_y=50):
-        fbimage = framebuf.FrameBuffer(image_array, width, height, framebuf.MONO_HLSB)
-        self.fb.blit(fbimage, pos_x , pos_y)
-
-    def displayimgv2(self,image_array):
-        # image_array 是图片像素矩阵对应的二维数组，对应的字节数组
-        screen_width = self.EPD_WIDTH  # 例子中的宽度
-        screen_height = len(image_array) * 8 // screen_width  # 计算屏幕高度
-        # 遍历字节数组并设置像素
-        for byte_index, byte in enumerate(image_array):
-            for bit in range(8):
-                # 计算当前像素的x, y坐标
-                x = (byte_index * 8 + bit) % screen_width
-                y = (byte_index * 8 + bit) // screen_width
-
-                # 计算像素颜色
-                color = (byte >> (7 - bit)) & 1
-                self.displaypixle(x,y,color)
+        self.fb.blit(self._image_fb(image_array, width, height), pos_x , pos_y)
+        self.mark_dirty(pos_x, pos_y, width, height)
+
+    def displayimgv2(self,image_array,width=None,height=None,pos_x=0,pos_y=0):
+        # image_array 是MONO_HLSB格式的字节数组（每行width像素，高位在左），也可以是ink_codec压缩格式
+        # 与self.buf布局相同的整屏图片直接整块拷贝，其他尺寸用blit绘制
+        size = ink_codec.parse_header(image_array)
+        if size is not None:
+            return self._display_packed(image_array, size[0], size[1], pos_x, pos_y)
+        if width is None:
+            width = self.EPD_WIDTH
+        if height is None:
+            height = len(image_array) * 8 // width  # 计算图片高度
+        if (width == self.EPD_WIDTH and height == self.EPD_HEIGHT and pos_x == 0 and pos_y == 0
+                and len(image_array) >= len(self.buf)):
+            memoryview(self.buf)[:] = memoryview(image_array)[:len(self.buf)]
+        else:
+            self.fb.blit(self._image_fb(image_array, width, height), pos_x, pos_y)
+        self.mark_dirty(pos_x, pos_y, width, height)
+        return True
+
+    def _display_packed(self, data, width, height, pos_x=0, pos_y=0):
+        # 压缩格式：整屏图片直接解码到self.buf，其他尺寸解码到临时缓冲后blit
+        if width == self.EPD_WIDTH and height == self.EPD_HEIGHT and pos_x == 0 and pos_y == 0:
+            ink_codec.decode_into(data, self.buf)
+        else:
+            image_array = bytearray(ink_codec.frame_size(width, height))
+            ink_codec.decode_into(data, image_array)
+            self.fb.blit(self._image_fb(image_array, width, height), pos_x, pos_y)
+        self.mark_dirty(pos_x, pos_y, width, height)
+        return True
+
+    def _display_packed_stream(self, stream, header):
+        # 从文件或socket流式解码压缩格式的图片，整屏图片不经过任何中间缓冲
+        # 返回从stream读取的压缩数据字节数
+        width, height = ink_codec.parse_header(header)
+        if width == self.EPD_WIDTH and height == self.EPD_HEIGHT:
+            nbytes = ink_codec.decode_stream(stream, self.buf)
+        else:
+            image_array = bytearray(ink_codec.frame_size(width, height))
+            nbytes = ink_codec.decode_stream(stream, image_array)
+            self.fb.blit(self._image_fb(image_array, width, height), 0, 0)
+        self.mark_dirty(0, 0, width, height)
+        return nbytes
 
     def display_bin_file(self, filename="byte_array.bin"):
         with open(filename, "rb") as f:
+            header = f.read(ink_codec.HEADER_SIZE)
+            if ink_codec.parse_header(header) is not None:
+                self._display_packed_stream(f, header)
+                return True
+            f.seek(0)
+            if uos.stat(filename)[6] == len(self.buf):
+                # 整屏图片直接读入帧缓冲，不经过中间缓冲
+                f.readinto(self.buf)
+                self.mark_dirty(0, 0, self.EPD_WIDTH, self.EPD_HEIGHT)
+                return True
             image_array = f.read()
         self.displayimgv2(image_array)
         return True
 
-    def display_bin_url(self, bin_url="https://pubdz.paperol.cn/bin/byte_array.bin"):
-        response = urequests.get(bin_url)
-        image_array = response.content
-        self.displayimgv2(image_array)
-        return True
+    def _content_length(self, response):
+        # 从响应头中取Content-Length，没有时返回None
+        headers = getattr(response, "headers", None) or {}
+        for key in headers:
+            if key.lower() == "content-length":
+                return int(headers[key])
+        return None
+
+    def _readinto_buf(self, stream, length, chunk_size, pos=0):
+        # 按固定块大小把length字节直接读入帧缓冲，pos为已经读入的字节数
+        mv = memoryview(self.buf)
+        while pos < length:
+            n = stream.readinto(mv[pos:min(pos + chunk_size, length)])
+            if not n:
+                raise OSError(f"连接提前关闭，已接收{pos}/{length}字节")
+            pos += n
+        self.mark_dirty(0, 0, self.EPD_WIDTH, self.EPD_HEIGHT)
+        return pos
+
+    def display_bin_url(self, bin_url="https://pubdz.paperol.cn/bin/byte_array.bin", stream=True, chunk_size=1024):
+        # stream=True时，压缩格式的图片边接收边解码，Content-Length正好是一整屏的原始图片从socket分块readinto到self.buf，
+        # 都不在内存中缓存整个响应体；返回(接收字节数, 耗时ms)
+        t0 = ticks_ms()
+        mem_before = gc.mem_free()
+        response = ink_http.get(bin_url)
+        try:
+            if response.status_code != 200:
+                raise OSError(f"下载图片失败，状态码: {response.status_code}")
+            length = self._content_length(response)
+            if stream and (length is None or length >= ink_codec.HEADER_SIZE):
+                # 先读出文件头判断格式
+                header = bytearray(ink_codec.HEADER_SIZE)
+                pos = 0
+                while pos < len(header):
+                    n = response.raw.readinto(memoryview(header)[pos:])
+                    if not n:
+                        raise OSError("连接提前关闭")
+                    pos += n
+                if ink_codec.parse_header(header) is not None:
+                    nbytes = len(header) + self._display_packed_stream(response.raw, header)
+                elif length == len(self.buf):
+                    memoryview(self.buf)[:len(header)] = header
+                    nbytes = self._readinto_buf(response.raw, length, chunk_size, len(header))
+                else:
+                    # 非整屏的原始图片，拼上已读出的文件头后按普通方式处理
+                    image_array = bytes(header) + response.raw.read()
+                    nbytes = len(image_array)
+                    self.displayimgv2(image_array)
+            else:
+                image_array = response.content
+                nbytes = len(image_array)
+                self.displayimgv2(image_array)
+        finally:
+            response.close()
+        elapsed = ticks_diff(ticks_ms(), t0)
+        print(f"下载图片{nbytes}字节，耗时{elapsed}ms，内存占用{mem_before - gc.mem_free()}字节")
+        return nbytes, elapsed
     
+    def _text_ready(self, data):
+        # 本地字体是否包含全部文字，只检查不绘制
+        if self._fonts is None:
+            self._fonts = ink_font.FontSet()
+        missing = ink_font.missing_chars(self._fonts, data)
+        if missing is None:
+            return False
+        if missing:
+            print(f"本地字体缺字: {''.join(missing[:20])}")
+            return False
+        return True
+
+    def display_text(self, data, pos_y=0):
+        # 用闪存上的点阵字体绘制display_jsondata格式的文字，没有字体或有缺字时返回False且不绘制
+        if not self._text_ready(data):
+            return False
+        end_y = ink_font.render_layout(self.fb, self.EPD_WIDTH, self.EPD_HEIGHT, self._fonts, data, pos_y)
+        self.mark_dirty(0, pos_y, self.EPD_WIDTH, end_y - pos_y)
+        return True
+
+    def fetch_jsondata(self, data):
+        """
+        准备display_jsondata要显示的内容：查本地字体和渲染缓存，都没有时请求云函数并写入缓存。
+        可能联网数秒，不操作帧缓冲，可以在后台线程中执行，之后由draw_jsondata()绘制。
+        :return: ("text", data)、("file", (缓存键, 缓存文件路径))或("image", 图片数据)
+        """
+        # 字体中包含全部文字时直接在本地排版，不联网
+        if self._text_ready(data):
+            return "text", data
+        if self._json_cache is None:
+            self._json_cache = ink_cache.FileCache(JSONDATA_CACHE_DIR, JSONDATA_CACHE_MAX_BYTES)
+        cache = self._json_cache
+        key = jsondata_key(data)
+        path = cache.get(key)
+        if path is not None:
+            print(f"渲染缓存命中: {cache.stats()}")
+            return "file", (key, path)
+        # 向云函数发起请求。
+        headers = {'User-Agent': 'MicroPython ink_http','Content-Type':'application/json'}
+        response = ink_http.post(JSONDATA_URL,data=ujson.dumps(data).encode('utf-8'),headers=headers)
+        try:
+            res_json = response.json()
+        finally:
+            response.close()
+        image_array = ubinascii.a2b_base64(res_json["data"])
+        if len(image_array) == len(self.buf):
+            # 整屏图片压缩后再保存，节省闪存
+            try:
+                cache.put(key, ink_codec.encode(image_array, self.EPD_WIDTH, self.EPD_HEIGHT))
+            except OSError as e:
+                print(f"保存渲染缓存失败: {e}")
+        print(f"渲染缓存未命中: {cache.stats()}")
+        return "image", image_array
+
+    def draw_jsondata(self, prepared):
+        # 把fetch_jsondata()的结果绘制到帧缓冲，不联网
+        kind, value = prepared
+        if kind == "text":
+            return self.display_text(value)
+        if kind == "file":
+            key, path = value
+            try:
+                return self.display_bin_file(path)
+            except (OSError, ValueError):
+                # 缓存文件损坏时删除，下次重新请求云函数
+                self._json_cache.remove(key)
+                raise
+        return self.displayimgv2(value)
+
     def display_jsondata(self, data):
         if data == None:
             data = {
@@ -97,16 +529,15 @@ class InkDisplay():
             "align":-1
             }
         try:
-            # 向云函数发起请求。
-            url = "https://imagepil-ebseiglznc.cn-zhangjiakou.fcapp.run"
-            headers = {'User-Agent': 'MicroPython urequests','Content-Type':'application/json'}
-            data = ujson.dumps(data).encode('utf-8')
-            response = urequests.post(url,data=data,headers=headers)
-            res_json = response.json()
-            image_array_base64 = res_json["data"]
-            image_array = ubinascii.a2b_base64(image_array_base64)
+            prepared = self.fetch_jsondata(data)
         except Exception as e:
             print("解析返回结果失败，错误信息：",e)
             return e
-        self.displayimgv2(image_array)
-        return True
\ No newline at end of file
+        try:
+            return self.draw_jsondata(prepared)
+        except (OSError, ValueError) as e:
+            if prepared[0] != "file":
+                raise
+            print(f"渲染缓存读取失败: {e}")
+        # 损坏的缓存已删除，这次会重新请求云函数
+        return self.display_jsondata(data)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+本地文字渲染：使用保存在闪存上的点阵字体，不联网也能显示中文。
+字体文件只读取文件头，字形按需用seek/readinto读出，最近用过的字形保存在LRU缓存中。
+同时可以在MicroPython的Unix移植版上运行，方便在电脑上测试。
+
+字体文件格式(电脑上用 eink_tools/make_font.py 生成)：
+    文件头12字节：魔数 b'EFN\\x01'，字高(1字节)，保留(1字节)，字形数(2字节)，字形数据起始偏移(4字节)，大端
+    索引：每个字形8字节，码位(4字节) + 宽度(1字节) + 字形数据偏移(3字节)，按码位升序排列
+    字形数据：MONO_HLSB，每行按字节对齐，0为笔画、1为背景，与InkDisplay的帧缓冲一致
+"""
+import framebuf # type: ignore
+import struct
+
+MAGIC = b'EFN\x01'
+HEADER_SIZE = 12
+ENTRY_SIZE = 8
+
+# 字体文件的存放位置，每种字号一个文件，如fonts/font24.efn
+FONT_DIR = "fonts"
+FONT_FILE = "font{}.efn"
+
+# 每个字体的字形缓存数量
+GLYPH_CACHE_SIZE = 64
+
+# 排版参数，与display_jsondata的请求格式相同：每行"文字|对齐|字号"，
+# 对齐为-1居中、-2右对齐、>=0为左边距；行距为字号+LINE_GAP
+ALIGN_CENTER = -1
+ALIGN_RIGHT = -2
+LINE_GAP = 5
+
+class BitmapFont:
+    """
+    单一字号的点阵字体，字形从文件中按需读取。
+    """
+    def __init__(self, path, cache_size=GLYPH_CACHE_SIZE):
+        """
+        :param path: 字体文件路径
+        :param cache_size: 缓存的字形数量
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        header = self.file.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or header[:4] != MAGIC:
+            self.file.close()
+            raise ValueError(f"不是点阵字体文件: {path}")
+        self.height, _, self.count, self.data_offset = struct.unpack_from(">BBHI", header, 4)
+        self.cache_size = cache_size
+        self.cache = {}  # 码位 -> [最近使用序号, 宽度, FrameBuffer]，None表示字体中没有该字
+        self.seq = 0
+        self._entry = bytearray(ENTRY_SIZE)
+
+    def close(self):
+        self.file.close()
+
+    def _find(self, code):
+        # 在索引中二分查找码位，返回(宽度, 字形数据偏移)，找不到时返回None
+        entry = self._entry
+        lo = 0
+        hi = self.count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            self.file.seek(HEADER_SIZE + mid * ENTRY_SIZE)
+            self.file.readinto(entry)
+            value = struct.unpack_from(">I", entry, 0)[0]
+            if value == code:
+                return entry[4], (entry[5] << 16) | (entry[6] << 8) | entry[7]
+            if value < code:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+    def glyph(self, ch):
+        """返回字符的(宽度, FrameBuffer)，字体中没有该字时返回None"""
+        code = ord(ch)
+        self.seq += 1
+        cached = self.cache.get(code)
+        if cached is not None:
+            cached[0] = self.seq
+            return cached[1], cached[2]
+        if code in self.cache:
+            return None
+        found = self._find(code)
+        if found is None:
+            item = None
+        else:
+            width, offset = found
+            buf = bytearray((width + 7) // 8 * self.height)
+            self.file.seek(self.data_offset + offset)
+            self.file.readinto(buf)
+            item = [self.seq, width, framebuf.FrameBuffer(buf, width, self.height, framebuf.MONO_HLSB)]
+        if len(self.cache) >= self.cache_size:
+            # 淘汰最久没有使用的字形(缺字记录优先)
+            oldest = min(self.cache, key=lambda k: self.cache[k][0] if self.cache[k] else -1)
+            del self.cache[oldest]
+        self.cache[code] = item
+        return None if item is None else (item[1], item[2])
+
+    def char_width(self, ch):
+        g = self.glyph(ch)
+        return g[0] if g else self.height // 2
+
+    def text_width(self, text):
+        return sum(self.char_width(ch) for ch in text)
+
+    def missing(self, text):
+        """返回字体中没有的字符"""
+        return [ch for ch in text if ch not in "\r\n" and self.glyph(ch) is None]
+
+    def draw_text(self, fb, text, x, y):
+        """
+        在FrameBuffer上绘制一行文字，只画笔画，背景保持不变。
+        :return: 绘制的宽度
+        """
+        start = x
+        for ch in text:
+            g = self.glyph(ch)
+            if g is None:
+                # 缺字画一个空心框
+                w = self.height // 2
+                fb.rect(x + 1, y + 1, w - 2, self.height - 2, 0)
+                x += w
+                continue
+            fb.blit(g[1], x, y, 1)
+            x += g[0]
+        return x - start
+
+class FontSet:
+    """
+    多种字号的字体集合，字体文件第一次用到时才打开。
+    """
+    def __init__(self, dirname=FONT_DIR, cache_size=GLYPH_CACHE_SIZE):
+        """
+        :param dirname: 字体目录，其中的文件按FONT_FILE命名
+        """
+        import uos # type: ignore
+        self.dirname = dirname
+        self.cache_size = cache_size
+        self.fonts = {}
+        prefix, suffix = FONT_FILE.split("{}")
+        try:
+            names = uos.listdir(dirname)
+        except OSError:
+            names = []
+        self.sizes = sorted(int(name[len(prefix):-len(suffix)]) for name in names
+                            if name.startswith(prefix) and name.endswith(suffix) and name[len(prefix):-len(suffix)].isdigit())
+
+    def font(self, size):
+        """返回最接近size的字体，优先选择不大于size的字号；没有任何字体时返回None"""
+        if not self.sizes:
+            return None
+        smaller = [s for s in self.sizes if s <= size]
+        best = smaller[-1] if smaller else self.sizes[0]
+        if best not in self.fonts:
+            self.fonts[best] = BitmapFont(self.dirname + "/" + FONT_FILE.format(best), self.cache_size)
+        return self.fonts[best]
+
+def parse_layout(data):
+    """
+    把display_jsondata格式的请求解析为[(文字, 对齐, 字号)]。
+    :param data: {"text": "第一行|-1|30\\n第二行", "fontsize": 30, "align": -1}，行内省略的对齐和字号使用外层的值
+    """
+    default_size = int(data.get("fontsize", 30))
+    default_align = int(data.get("align", ALIGN_CENTER))
+    lines = []
+    for line in str(data.get("text", "")).split("\n"):
+        parts = line.split("|")
+        align = int(parts[1]) if len(parts) > 1 and parts[1].strip() else default_align
+        size = int(parts[2]) if len(parts) > 2 and parts[2].strip() else default_size
+        lines.append((parts[0], align, size))
+    return lines
+
+def _wrap(font, text, max_width):
+    # 按字符折行，返回每一行的文字
+    rows = []
+    row = ""
+    width = 0
+    for ch in text:
+        w = font.char_width(ch)
+        if row and width + w > max_width:
+            rows.append(row)
+            row = ""
+            width = 0
+        row += ch
+        width += w
+    rows.append(row)
+    return rows
+
+def missing_chars(fonts, data):
+    """返回排版需要但字体中没有的字符，没有可用字体时返回None"""
+    missing = []
+    for text, _, size in parse_layout(data):
+        font = fonts.font(size)
+        if font is None:
+            return None
+        missing.extend(font.missing(text))
+    return missing
+
+def render_layout(fb, width, height, fonts, data, y=0):
+    """
+    按display_jsondata的排版规则把文字绘制到FrameBuffer上。
+    :param width: 画面宽度，用于对齐和折行
+    :param height: 画面高度，超出的行不再绘制
+    :param fonts: FontSet
+    :return: 下一行的y坐标
+    """
+    for text, align, size in parse_layout(data):
+        font = fonts.font(size)
+        if font is None:
+            raise OSError("没有可用的点阵字体")
+        margin = align if align >= 0 else 0
+        for row in _wrap(font, text, width - margin):
+            if y >= height:
+                return y
+            if align == ALIGN_CENTER:
+                x = (width - font.text_width(row)) // 2
+            elif align == ALIGN_RIGHT:
+                x = width - font.text_width(row)
+            else:
+                x = margin
+            font.draw_text(fb, row, x, y)
+            y += size + LINE_GAP
+    return y
@@ -0,0 +1,324 @@
+"""
+带连接复用的HTTP/1.1客户端，用来代替urequests。
+- 每个主机保留一个空闲的持久连接，连续请求同一主机时省去DNS、TCP和TLS握手
+- 缓存DNS解析结果
+- 连接和读写都有超时
+- 响应体支持Content-Length和chunked编码，可以readinto分块读取，不必整体读入内存
+接口与urequests基本一致：status_code、headers、raw、content、json()、close()，
+响应用完后必须close()，响应体读完时连接放回连接池，否则直接关闭。
+"""
+import usocket as socket # type: ignore
+import ujson # type: ignore
+from time import ticks_ms, ticks_diff # type: ignore
+try:
+    import ssl # type: ignore
+except ImportError:
+    import ussl as ssl # type: ignore
+
+# 连接和读写超时(秒)
+TIMEOUT = 10
+# 空闲连接保留时长，超过后关闭，释放TLS占用的内存
+MAX_IDLE_MS = 30000
+# DNS解析结果的缓存时长
+DNS_TTL_MS = 10 * 60 * 1000
+# 关闭响应时，Content-Length响应体剩余不超过该字节数就读完丢弃，以便复用连接；chunked响应体长度未知，不读
+DRAIN_MAX = 4096
+
+# 主机名, 端口 -> (地址, 解析时间)
+_dns_cache = {}
+
+def resolve(host, port):
+    """解析主机地址，结果缓存DNS_TTL_MS毫秒"""
+    key = (host, port)
+    cached = _dns_cache.get(key)
+    if cached and ticks_diff(ticks_ms(), cached[1]) < DNS_TTL_MS:
+        return cached[0]
+    addr = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][-1]
+    _dns_cache[key] = (addr, ticks_ms())
+    return addr
+
+def split_url(url):
+    """把url拆分为(协议, 主机, 端口, 路径)"""
+    scheme, _, rest = url.partition("://")
+    if scheme not in ("http", "https"):
+        raise ValueError(f"不支持的协议: {scheme}")
+    host, slash, path = rest.partition("/")
+    port = 443 if scheme == "https" else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return scheme, host, port, slash + path if slash else "/"
+
+class Body:
+    """
+    响应体读取器，按Content-Length或chunked编码读到结尾为止，不会多读属于下一个响应的数据。
+    """
+    def __init__(self, stream, length, chunked):
+        self.stream = stream
+        self.chunked = chunked
+        self.length = length
+        self.remaining = 0 if chunked else length  # 长度未知时为None，读到连接关闭为止
+        self.done = not chunked and length == 0
+
+    def _chunk_size(self):
+        line = self.stream.readline()
+        if not line:
+            raise OSError("连接提前关闭")
+        return int(line.split(b";")[0].strip(), 16)
+
+    def readinto(self, buf):
+        """读取到buf中，返回字节数，0表示响应体已读完"""
+        if self.done:
+            return 0
+        if self.chunked and self.remaining == 0:
+            size = self._chunk_size()
+            if size == 0:
+                # 最后一个分块，跳过trailer直到空行
+                while self.stream.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                self.done = True
+                return 0
+            self.remaining = size
+        mv = memoryview(buf)
+        if self.remaining is not None:
+            mv = mv[:min(len(mv), self.remaining)]
+        n = self.stream.readinto(mv)
+        if not n:
+            if self.remaining is None:
+                self.done = True
+                return 0
+            raise OSError("连接提前关闭")
+        if self.remaining is not None:
+            self.remaining -= n
+            if self.remaining == 0:
+                if self.chunked:
+                    self.stream.readline()  # 分块末尾的\r\n
+                else:
+                    self.done = True
+        return n
+
+    def read(self, size=-1):
+        """读取size字节，size<0时读到结尾"""
+        out = bytearray()
+        buf = bytearray(1024 if size < 0 else min(size, 1024))
+        mv = memoryview(buf)
+        while size < 0 or len(out) < size:
+            n = self.readinto(mv if size < 0 else mv[:min(len(buf), size - len(out))])
+            if not n:
+                break
+            out.extend(mv[:n])
+        return bytes(out)
+
+class Response:
+    def __init__(self, session, key, sock, stream, status_code, reason, headers, reusable):
+        self._session = session
+        self._key = key
+        self._sock = sock
+        self._stream = stream
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers  # 响应头，名称为小写
+        self._reusable = reusable
+        self._content = None
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        length = int(length) if length is not None and not chunked else None
+        if length is None and not chunked:
+            # 没有长度信息，只能读到连接关闭，连接不能复用
+            self._reusable = False
+        self.raw = Body(stream, length, chunked)
+
+    @property
+    def content(self):
+        if self._content is None:
+            try:
+                self._content = self.raw.read()
+            finally:
+                self.close()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return ujson.loads(self.content)
+
+    def close(self):
+        """结束响应；响应体已读完(或剩余很少)且服务端允许时，连接放回连接池"""
+        if self._sock is None:
+            return
+        body = self.raw
+        if not body.done and self._reusable and not body.chunked and body.remaining is not None and body.remaining <= DRAIN_MAX:
+            try:
+                body.read()
+            except OSError:
+                self._reusable = False
+        if body.done and self._reusable:
+            self._session._release(self._key, self._sock, self._stream)
+        else:
+            _close(self._stream)
+        self._sock = None
+        self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _close(sock):
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+class Session:
+    """
+    HTTP会话，为每个(协议, 主机, 端口)保留一个空闲的持久连接。
+    """
+    def __init__(self, timeout=TIMEOUT, max_idle_ms=MAX_IDLE_MS):
+        """
+        :param timeout: 连接和读写超时(秒)
+        :param max_idle_ms: 空闲连接保留时长(毫秒)
+        """
+        self.timeout = timeout
+        self.max_idle_ms = max_idle_ms
+        self._idle = {}  # (协议, 主机, 端口) -> (socket, 读写流, 放回时间)
+        self.connects = 0  # 新建连接次数
+        self.reuses = 0    # 复用连接次数
+
+    def _connect(self, scheme, host, port):
+        sock = socket.socket()
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(resolve(host, port))
+            if scheme == "https":
+                stream = ssl.wrap_socket(sock, server_hostname=host)
+            else:
+                stream = sock
+        except Exception:
+            _close(sock)
+            # 地址可能已经变化，下次重新解析
+            _dns_cache.pop((host, port), None)
+            raise
+        self.connects += 1
+        return sock, stream
+
+    def _acquire(self, key):
+        # 取出空闲连接，超过保留时长的直接关闭
+        idle = self._idle.pop(key, None)
+        if idle is None:
+            return None
+        if ticks_diff(ticks_ms(), idle[2]) > self.max_idle_ms:
+            _close(idle[1])
+            return None
+        return idle[0], idle[1]
+
+    def _release(self, key, sock, stream):
+        old = self._idle.pop(key, None)
+        if old is not None:
+            _close(old[1])
+        self._idle[key] = (sock, stream, ticks_ms())
+
+    def close_idle(self):
+        """关闭所有空闲连接，如一批请求结束后释放内存"""
+        for sock, stream, _ in self._idle.values():
+            _close(stream)
+        self._idle = {}
+
+    close = close_idle
+
+    def request(self, method, url, data=None, json=None, headers=None):
+        """
+        发送请求并读取响应头，响应体通过返回值的raw/content读取。
+        复用的连接已被服务端关闭时，自动新建连接重试一次。
+        """
+        scheme, host, port, path = split_url(url)
+        if json is not None:
+            data = ujson.dumps(json)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        head = "%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n" % (method, path, host if port in (80, 443) else "%s:%d" % (host, port))
+        has_type = False
+        for name, value in (headers or {}).items():
+            if name.lower() in ("host", "connection", "content-length"):
+                continue
+            has_type = has_type or name.lower() == "content-type"
+            head += "%s: %s\r\n" % (name, value)
+        if json is not None and not has_type:
+            head += "Content-Type: application/json\r\n"
+        if data is not None:
+            head += "Content-Length: %d\r\n" % len(data)
+        head = (head + "\r\n").encode("utf-8")
+
+        key = (scheme, host, port)
+        conn = self._acquire(key)
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = self._connect(scheme, host, port)
+            sock, stream = conn
+            try:
+                stream.write(head)
+                if data:
+                    stream.write(data)
+                status_line = stream.readline()
+                if not status_line:
+                    raise OSError("连接已被服务端关闭")
+                break
+            except OSError:
+                _close(stream)
+                if not reused:
+                    raise
+                # 复用的连接可能已经失效，新建连接重试一次
+                conn = None
+                reused = False
+        if reused:
+            self.reuses += 1
+
+        parts = status_line.decode().split(" ", 2)
+        if len(parts) < 2:
+            _close(stream)
+            raise OSError(f"无效的响应: {status_line}")
+        version = parts[0]
+        status_code = int(parts[1])
+        reason = parts[2].strip() if len(parts) > 2 else ""
+        resp_headers = {}
+        while True:
+            line = stream.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            resp_headers[name.strip().lower()] = value.strip()
+        connection = resp_headers.get("connection", "").lower()
+        reusable = "close" not in connection and (version != "HTTP/1.0" or "keep-alive" in connection)
+        response = Response(self, key, sock, stream, status_code, reason, resp_headers, reusable)
+        if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+            response.raw.done = True
+        return response
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.request("POST", url, **kw)
+
+# 进程内共享的会话，万年历、缓存下载和云函数请求都通过它复用连接
+_session = None
+
+def session():
+    global _session
+    if _session is None:
+        _session = Session()
+    return _session
+
+def get(url, **kw):
+    return session().request("GET", url, **kw)
+
+def post(url, **kw):
+    return session().request("POST", url, **kw)
+
+def close_idle():
+    if _session is not None:
+        _session.close_idle()
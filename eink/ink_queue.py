@@ -0,0 +1,163 @@
+import uasyncio as asyncio # type: ignore
+from time import ticks_ms, ticks_diff # type: ignore
+import ink_display
+try:
+    import _thread # type: ignore
+except ImportError:
+    _thread = None
+
+# 等待绘制的任务数上限，超出时拒绝新任务
+MAX_PENDING = 8
+# 保留最近多少个任务的状态供查询
+HISTORY_SIZE = 16
+# 执行准备函数的后台线程的栈大小，TLS握手需要较大的栈
+PREPARE_STACK_SIZE = 16 * 1024
+
+# 任务状态
+QUEUED = "queued"          # 等待绘制
+RUNNING = "running"        # 正在绘制或刷新
+DONE = "done"              # 已刷新到屏幕
+UNCHANGED = "unchanged"    # 画面与屏幕上相同，没有刷新
+SUPERSEDED = "superseded"  # 被之后提交的整屏画面覆盖，没有绘制
+FAILED = "error"           # 绘制或刷新出错
+
+class RenderQueue:
+    """
+    墨水屏渲染队列，位于InkDisplay前面。
+    提交任务后立即返回任务编号，由后台协程统一绘制和刷新：
+    整屏画面(full=True)会覆盖之前所有还没开始绘制的任务，其余任务按顺序绘制到帧缓冲，
+    一批任务只刷新一次屏幕，所以连续推送N张图片只需要一次刷新。
+    """
+    def __init__(self, max_pending=MAX_PENDING, history_size=HISTORY_SIZE):
+        """
+        :param max_pending: 等待绘制的任务数上限
+        :param history_size: 保留状态的任务数
+        """
+        self.max_pending = max_pending
+        self.history_size = history_size
+        self.next_id = 1
+        self.pending = []  # [(任务编号, 绘制函数, 是否整屏, 准备函数)]
+        self.jobs = {}     # 任务编号 -> 状态字典
+        self._event = None
+        self._task = None
+
+    def submit(self, draw, full=False, desc="", prepare=None):
+        """
+        提交一个渲染任务，需在事件循环中调用。
+        :param draw: 绘制函数draw(ink)，只绘制到帧缓冲，不要调用show()；有准备函数时为draw(ink, 准备结果)
+        :param full: 是否重绘整屏，为True时之前等待中的任务都会被丢弃
+        :param desc: 任务说明，查询状态时返回
+        :param prepare: 准备函数prepare(ink)，用于联网下载等阻塞操作，在后台线程中执行，不能操作帧缓冲
+        :return: 任务编号
+        """
+        if full:
+            for job_id, _, _, _ in self.pending:
+                self._set(job_id, SUPERSEDED)
+            self.pending = []
+        elif len(self.pending) >= self.max_pending:
+            raise OSError("渲染队列已满")
+        job_id = self.next_id
+        self.next_id += 1
+        self.jobs[job_id] = {"id": job_id, "status": QUEUED, "desc": desc, "submitted": ticks_ms()}
+        self._trim()
+        self.pending.append((job_id, draw, full, prepare))
+        self._start()
+        self._event.set()
+        return job_id
+
+    def status(self, job_id):
+        """返回任务状态字典，任务不存在或已超出历史记录时返回None"""
+        return self.jobs.get(job_id)
+
+    def _set(self, job_id, status, **extra):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["status"] = status
+            job.update(extra)
+
+    def _trim(self):
+        # 只保留最近history_size个任务的状态
+        while len(self.jobs) > self.history_size:
+            del self.jobs[min(self.jobs)]
+
+    def _start(self):
+        if self._task is None:
+            self._event = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+
+    async def _worker(self):
+        ink = ink_display.get_display()
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            while self.pending:
+                batch = self.pending
+                self.pending = []
+                await self._render(ink, batch)
+
+    async def _render(self, ink, batch):
+        # 依次绘制一批任务，然后只刷新一次
+        drawn = []
+        for job_id, draw, _, prepare in batch:
+            self._set(job_id, RUNNING)
+            try:
+                if prepare is None:
+                    draw(ink)
+                else:
+                    draw(ink, await run_blocking(prepare, ink))
+                drawn.append(job_id)
+            except Exception as e:
+                print(f"渲染任务#{job_id}出错: {e}")
+                self._set(job_id, FAILED, error=str(e))
+        if not drawn:
+            return
+        t0 = ticks_ms()
+        try:
+            refreshed = await ink.show_async()
+        except Exception as e:
+            print(f"刷新出错: {e}")
+            for job_id in drawn:
+                self._set(job_id, FAILED, error=str(e))
+            return
+        elapsed = ticks_diff(ticks_ms(), t0)
+        for job_id in drawn:
+            self._set(job_id, DONE if refreshed else UNCHANGED, refresh_ms=elapsed)
+        print(f"渲染队列: {len(drawn)}个任务合并为一次刷新，耗时{elapsed}ms")
+
+async def run_blocking(func, *args):
+    """
+    在后台线程中执行阻塞函数(如联网请求)，等待期间事件循环照常运行；不支持线程时直接执行。
+    :return: func的返回值，func抛出的异常在这里重新抛出
+    """
+    if _thread is None:
+        return func(*args)
+    done = asyncio.ThreadSafeFlag()
+    result = [None, None]  # [返回值, 异常]
+    def run():
+        try:
+            result[0] = func(*args)
+        except BaseException as e:
+            result[1] = e
+        finally:
+            # 无论如何都要唤醒等待的协程，否则渲染队列会一直卡住
+            done.set()
+    try:
+        _thread.stack_size(PREPARE_STACK_SIZE)
+        _thread.start_new_thread(run, ())
+    except (OSError, MemoryError, RuntimeError) as e:
+        # 内存不足等原因无法创建线程时直接执行
+        print(f"无法创建后台线程，直接执行: {e}")
+        return func(*args)
+    await done.wait()
+    if result[1] is not None:
+        raise result[1]
+    return result[0]
+
+# 进程内共享的渲染队列
+_queue = None
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = RenderQueue()
+    return _queue
@@ -0,0 +1,99 @@
+"""
+静态文件发送：按固定大小分块读取和发送，不把整个文件读进内存。
+- 客户端支持gzip且存在同名的.gz文件时，直接发送压缩文件(电脑上用 gzip -9 -k 文件名 生成后一起上传)
+- 用文件内容的CRC32作为ETag，客户端带If-None-Match且未变化时返回304
+"""
+import uos # type: ignore
+import ubinascii # type: ignore
+
+CHUNK_SIZE = 1024
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "js": "application/javascript",
+    "css": "text/css",
+    "json": "application/json",
+    "png": "image/png",
+    "ico": "image/x-icon",
+    "bin": "application/octet-stream",
+}
+
+# 路径 -> (大小, 修改时间, ETag)，文件没有变化时不再重复计算CRC
+_etags = {}
+
+def _stat(path):
+    try:
+        st = uos.stat(path)
+        return st[6], st[8]
+    except OSError:
+        return None
+
+def content_type(path):
+    return CONTENT_TYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+def header(headers, name):
+    """不区分大小写地获取请求头"""
+    name = name.lower()
+    for key in headers:
+        if key.lower() == name:
+            return headers[key]
+    return ""
+
+def etag(path, size, mtime, chunk_size=CHUNK_SIZE):
+    """返回文件的ETag，按路径、大小和修改时间缓存"""
+    cached = _etags.get(path)
+    if cached and cached[0] == size and cached[1] == mtime:
+        return cached[2]
+    crc = 0
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            crc = ubinascii.crc32(mv[:n], crc)
+    tag = '"{:08x}-{:x}"'.format(crc, size)
+    _etags[path] = (size, mtime, tag)
+    return tag
+
+async def send_file(writer, path, request_headers=None, chunk_size=CHUNK_SIZE):
+    """
+    发送静态文件，包含响应头。
+    :param writer: uasyncio的StreamWriter
+    :param path: 设备上的文件路径
+    :param request_headers: 请求头字典，用于判断gzip和If-None-Match
+    :return: HTTP状态码，文件不存在时返回404且不发送任何内容
+    """
+    request_headers = request_headers or {}
+    send_path = path
+    encoding = ""
+    st = None
+    if "gzip" in header(request_headers, "Accept-Encoding"):
+        st = _stat(path + ".gz")
+        if st is not None:
+            send_path = path + ".gz"
+            encoding = "Content-Encoding: gzip\r\n"
+    if st is None:
+        st = _stat(path)
+        if st is None:
+            return 404
+    size, mtime = st
+    tag = etag(send_path, size, mtime, chunk_size)
+    common = "ETag: " + tag + "\r\nCache-Control: no-cache\r\nVary: Accept-Encoding\r\nAccess-Control-Allow-Origin: *\r\n"
+    if header(request_headers, "If-None-Match") == tag:
+        writer.write(("HTTP/1.1 304 Not Modified\r\n" + common + "\r\n").encode())
+        await writer.drain()
+        return 304
+    writer.write(("HTTP/1.1 200 OK\r\nContent-Type: " + content_type(path) + "\r\nContent-Length: " + str(size) + "\r\n" + encoding + common + "\r\n").encode())
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(send_path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            # drain()等待数据发完后才复用缓冲区
+            writer.write(mv[:n])
+            await writer.drain()
+    return 200
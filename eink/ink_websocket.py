@@ -1,14 +1,43 @@
 import network # type: ignore
-import usocket as socket # type: ignore
-import uselect as select # type: ignore
-from time import sleep, ticks_ms # type: ignore
+import uasyncio as asyncio # type: ignore
 import gc
+import uos # type: ignore
 import ubinascii # type: ignore
 import ujson # type: ignore
+import ustruct # type: ignore
 import machine # type: ignore
+import ink_display
+import ink_codec
+import ink_queue
+import ink_static
 wlan_sta = network.WLAN(network.STA_IF)
 
-def handle_websocket_command(message):
+# 二进制图片帧(opcode 0x2)的头部：版本、标志位、x、y、宽、高，后面紧跟MONO_HLSB像素数据或ink_codec压缩数据
+IMAGE_HEADER = ">BBHHHH"
+IMAGE_HEADER_SIZE = 10
+IMAGE_VERSION = 1
+IMAGE_FLAG_CLEAR = 0x01  # 绘制前先清屏
+IMAGE_FLAG_SAVE = 0x02   # 同时保存到byte_array.bin，只支持从(0,0)开始的整屏图片
+
+# 每个WebSocket连接的接收缓冲区大小，需能容纳一整屏的二进制图片帧
+WS_BUFFER_SIZE = 16 * 1024
+
+# 请求头的最大长度，以及等待客户端发完请求头的超时，防止慢客户端长期占用连接
+HTTP_HEADER_MAX = 4096
+HTTP_HEADER_TIMEOUT = 10
+# JSON/表单请求体读入内存的上限；图片等二进制请求体直接分块写入闪存，上限为HTTP_UPLOAD_MAX
+HTTP_BODY_MAX = 8 * 1024
+HTTP_UPLOAD_MAX = 64 * 1024
+# POST /image上传的图片保存位置，原始MONO_HLSB整屏数据或ink_codec压缩格式均可
+UPLOAD_FILE = "ink_upload.bin"
+
+# 可以通过HTTP访问的静态文件，只开放网页，避免wificonfig.json等文件被读取
+STATIC_FILES = {
+    "/": "ink_web_index.html",
+    "/index.html": "ink_web_index.html",
+}
+
+async def handle_websocket_command(message):
     """处理客户端命令"""
     try:
         cmd_json = ujson.loads(message)
@@ -19,7 +48,7 @@ def handle_websocket_command(message):
             wificonfig = {"ssid": cmd_json["ssid"], "password": cmd_json["password"]}
             with open("wificonfig.json", 'w') as f:
                 ujson.dump(wificonfig, f)
-            sleep(3)
+            await asyncio.sleep(3)
             machine.reset()
             return ujson.dumps({"cmd_type":"wifi","return_detail": "success"})
         elif cmd_type == "wifistatus":
@@ -29,44 +58,133 @@ def handle_websocket_command(message):
             base64_data = cmd_json.get("data", "")
             # 解码Base64数据
             binary_data = ubinascii.a2b_base64(base64_data)
-            # 保存到文件
+            if cmd_json.get("save"):
+                # 需要时才保存到文件
+                with open("byte_array.bin", "wb") as f:
+                    f.write(binary_data)
+            def draw(ink):
+                ink.clear()
+                ink.displayimgv2(binary_data)
+            # 放入渲染队列后立即返回任务编号，刷新结果用jobstatus命令查询
+            job_id = ink_queue.get_queue().submit(draw, full=True, desc="binary_data_string")
+            return ujson.dumps({"cmd_type":"binary_data_string", "return_detail": "queued", "job_id": job_id, "bytes_received": len(binary_data)})
+        elif cmd_type == "jobstatus":
+            job = ink_queue.get_queue().status(cmd_json.get("job_id"))
+            if job is None:
+                raise ValueError("任务不存在")
+            return ujson.dumps({"cmd_type":"jobstatus", "job": job})
+    except Exception as e:
+        return ujson.dumps({"cmd_type":"error","return_detail": str(e)})
+
+async def handle_websocket_binary(payload):
+    """处理二进制图片帧，像素数据直接绘制到帧缓冲"""
+    try:
+        if len(payload) < IMAGE_HEADER_SIZE:
+            raise ValueError("图片帧头不完整")
+        version, flags, pos_x, pos_y, width, height = ustruct.unpack_from(IMAGE_HEADER, payload)
+        if version != IMAGE_VERSION:
+            raise ValueError(f"不支持的图片帧版本: {version}")
+        image_data = memoryview(payload)[IMAGE_HEADER_SIZE:]
+        packed = ink_codec.parse_header(image_data)
+        if packed is None:
+            size = (width + 7) // 8 * height
+            image_data = image_data[:size]
+            if len(image_data) != size:
+                raise ValueError(f"图片数据长度不符: {len(image_data)}/{size}")
+        if flags & IMAGE_FLAG_SAVE:
+            # byte_array.bin只保存像素数据，读取时按整屏画面显示，位置和尺寸不同的图片保存后无法还原
+            full_screen = (ink_display.EPD_WIDTH, ink_display.EPD_HEIGHT)
+            if (pos_x, pos_y) != (0, 0) or (width, height) != full_screen or (packed is not None and tuple(packed) != full_screen):
+                raise ValueError("只能保存从(0,0)开始的整屏图片")
             with open("byte_array.bin", "wb") as f:
-                f.write(binary_data)
-            import ink_display
-            ink = ink_display.InkDisplay()
-            ink.clear()
-            ink.display_bin_file()
-            ink.show()
-            return ujson.dumps({"cmd_type":"binary_data_string", "return_detail": "success", "bytes_received": len(binary_data)})
+                f.write(image_data)
+        # payload引用的是连接的接收缓冲区，入队前需要拷贝
+        image_data = bytes(image_data)
+        def draw(ink):
+            if flags & IMAGE_FLAG_CLEAR:
+                ink.clear()
+            ink.displayimgv2(image_data, width, height, pos_x, pos_y)
+        job_id = ink_queue.get_queue().submit(draw, full=bool(flags & IMAGE_FLAG_CLEAR), desc="binary_frame")
+        return ujson.dumps({"cmd_type":"binary_frame", "return_detail": "queued", "job_id": job_id, "bytes_received": len(payload)})
     except Exception as e:
         return ujson.dumps({"cmd_type":"error","return_detail": str(e)})
 
-def handle_http_request(request_json):
-    """处理HTTP请求"""
+def decode_body(data, content_type):
+    """按Content-Type解析小请求体，解析失败时保持原始字符串"""
+    body = data.decode('utf-8')
+    # 如果是application/json类型，尝试解析JSON
+    if 'application/json' in content_type and body:
+        try:
+            body = ujson.loads(body)
+        except:
+            pass
+    # 如果是application/x-www-form-urlencoded类型，解析表单数据
+    elif 'application/x-www-form-urlencoded' in content_type and body:
+        try:
+            body = parse_query_string(body)
+        except:
+            pass
+    return body
+
+async def handle_http_request(request_json, body, writer):
+    """
+    处理HTTP请求，返回响应字符串；静态文件直接分块写入writer，返回None
+    :param body: 请求体的HttpBody读取器
+    """
     print("结构化的HTTP请求数据",request_json)
     request_method = request_json.get("method")
     if request_method == "GET":
         print("处理GET请求")
-        if request_json["path"] == "/":
-            response = 'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nAccess-Control-Allow-Origin: *\r\n\r\n'
-            with open("ink_web_index.html", "r", encoding='utf-8') as f:
-                content = f.read()
-            return response + content
+        if request_json["path"] in STATIC_FILES:
+            status = await ink_static.send_file(writer, STATIC_FILES[request_json["path"]], request_json["headers"])
+            if status != 404:
+                return None
+            return 'HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n\r\n404 Not Found'
         elif request_json["path"] == "/wifistatus":
             response = 'HTTP/1.1 200 OK\r\nAccess-Control-Allow-Origin: *\r\n\r\n' + f"WIFI网络IP地址: {wlan_sta.ifconfig()[0]}"
             return response
+        elif request_json["path"] == "/job":
+            # 查询渲染任务状态：GET /job?id=任务编号
+            try:
+                job = ink_queue.get_queue().status(int(request_json["query_params"].get("id", "")))
+            except ValueError:
+                job = None
+            if job is None:
+                return 'HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n\r\n任务不存在'
+            return 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n\r\n' + ujson.dumps(job)
         else:
             response = 'HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n\r\n404 Not Found'
             return response
     elif request_method == "POST":
         print("处理POST请求")
-        import ink_display
-        ink = ink_display.InkDisplay()
-        ink.clear()
-        ink.display_jsondata(request_json.get("body"))
-        ink.show()
-        response = 'HTTP/1.1 200 OK\r\nAccess-Control-Allow-Origin: *\r\n\r\n' + "显示成功"
+        content_type = ink_static.header(request_json["headers"], "Content-Type")
+        if request_json["path"] == "/image" or "application/octet-stream" in content_type:
+            # 整屏图片，边接收边写入闪存，不在内存中保存完整请求体
+            size = await body.save(UPLOAD_FILE, HTTP_UPLOAD_MAX)
+            print(f"收到图片{size}字节")
+            def draw(ink):
+                ink.clear()
+                ink.display_bin_file(UPLOAD_FILE)
+            prepare = None
+            desc = "image"
+        else:
+            data = decode_body(await body.read(HTTP_BODY_MAX), content_type)
+            request_json["body"] = data
+            # 查缓存和请求云函数在后台线程中进行，绘制时只操作帧缓冲
+            def prepare(ink):
+                return ink.fetch_jsondata(data)
+            def draw(ink, prepared):
+                ink.clear()
+                ink.draw_jsondata(prepared)
+            desc = "jsondata"
+        # 不再等待刷新完成，返回202和任务编号，之后用GET /job?id=任务编号查询结果
+        try:
+            job_id = ink_queue.get_queue().submit(draw, full=True, desc=desc, prepare=prepare)
+        except OSError as e:
+            return 'HTTP/1.1 503 Service Unavailable\r\nContent-Type: text/plain\r\nAccess-Control-Allow-Origin: *\r\n\r\n' + str(e)
+        response = 'HTTP/1.1 202 Accepted\r\nContent-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n\r\n' + ujson.dumps({"job_id": job_id, "status": ink_queue.QUEUED})
         return response
+    return 'HTTP/1.1 405 Method Not Allowed\r\nContent-Type: text/plain\r\n\r\n405 Method Not Allowed'
 
 def parse_query_string(query_string: str) -> dict:
     """
@@ -82,25 +200,19 @@ def parse_query_string(query_string: str) -> dict:
             params[pair] = ''
     return params
 
-def parse_http_request(raw_data: bytes) -> dict:
+def parse_request_head(head: bytes) -> dict:
     """
-    在 MicroPython 中解析 HTTP 请求数据并返回结构化字典。
-    :param raw_data: 原始 HTTP 请求的字节数据
-    :return: 结构化的字典(JSON兼容)
+    解析请求行和请求头，请求体由HttpBody流式读取。
+    :param head: 以空行结束的请求头字节数据
+    :return: 结构化的字典(JSON兼容)，body为空字符串
     """
     try:
-        data_str = raw_data.decode('utf-8')
+        lines = head.decode('utf-8').split('\r\n')
     except UnicodeDecodeError:
-        raise ValueError("无法解码输入数据")
-
-    lines = data_str.split('\r\n')
-
-    if not lines:
-        raise ValueError("无效的 HTTP 请求")
+        raise ValueError("无法解码请求头")
 
     # 解析第一行：方法、路径、版本
-    request_line = lines[0].strip()
-    parts = request_line.split(' ')
+    parts = lines[0].strip().split(' ')
     if len(parts) != 3:
         raise ValueError("无效的请求行")
     method, full_path, http_version = parts
@@ -114,48 +226,148 @@ def parse_http_request(raw_data: bytes) -> dict:
 
     # 解析 headers
     headers = {}
-    body_start_index = 0
-    for i in range(1, len(lines)):
-        line = lines[i]
-        if line == '':
-            body_start_index = i + 1
-            break
+    for line in lines[1:]:
         if ':' in line:
             key, value = line.split(':', 1)
             headers[key.strip()] = value.strip()
-    
-    # 解析body（如果有）
-    body = ""
-    if body_start_index < len(lines):
-        body_lines = lines[body_start_index:]
-        body = '\r\n'.join(body_lines)
-        
-        # 如果是application/json类型，尝试解析JSON
-        content_type = headers.get('Content-Type', '')
-        if 'application/json' in content_type and body: # type: ignore
-            try:
-                body = ujson.loads(body)
-            except:
-                pass  # 如果解析失败，保持原始字符串
-        
-        # 如果是application/x-www-form-urlencoded类型，解析表单数据
-        elif 'application/x-www-form-urlencoded' in content_type and body:
-            try:
-                body = parse_query_string(body)
-            except:
-                pass  # 如果解析失败，保持原始字符串
 
-    result = {
+    return {
         "method": method,
         "path": path,
         "query_params": query_params,
         "http_version": http_version,
         "headers": headers,
-        "body": body
+        "body": ""
     }
-    return result
 
-def ws_handshake(sock, data):
+class HttpBody:
+    """
+    请求体的流式读取器，支持Content-Length和chunked编码。
+    数据按调用方提供的缓冲区分块读出，可以直接写入文件或帧缓冲，不需要拼接成完整的字符串。
+    """
+    def __init__(self, reader, headers, first=b''):
+        """
+        :param reader: uasyncio的StreamReader
+        :param headers: parse_request_head解析出的请求头
+        :param first: 读取请求头时已经收到的请求体开头部分
+        """
+        self.reader = reader
+        self.pending = first  # 已收到但还没有读出的数据
+        self.chunked = 'chunked' in ink_static.header(headers, 'Transfer-Encoding').lower()
+        if self.chunked:
+            self.length = None
+            self.remaining = 0  # 当前分块还没有读出的字节数
+            self.done = False
+        else:
+            try:
+                self.length = int(ink_static.header(headers, 'Content-Length') or 0)
+            except ValueError:
+                raise ValueError("无效的Content-Length")
+            self.remaining = self.length
+            self.done = self.length == 0
+
+    async def _readline(self):
+        # 读取分块编码中的一行(不含\r\n)
+        while True:
+            i = self.pending.find(b'\r\n')
+            if i >= 0:
+                line = self.pending[:i]
+                self.pending = self.pending[i + 2:]
+                return line
+            if len(self.pending) > 256:
+                raise ValueError("分块长度行过长")
+            data = await self.reader.read(64)
+            if not data:
+                raise OSError("请求体不完整")
+            self.pending += data
+
+    async def readinto(self, buf):
+        """读取请求体到buf，返回读到的字节数，0表示请求体已读完"""
+        if self.done:
+            return 0
+        if self.chunked and self.remaining == 0:
+            try:
+                size = int(bytes(await self._readline()).split(b';')[0], 16)
+            except ValueError:
+                raise ValueError("无效的分块长度")
+            if size == 0:
+                # 最后一个分块，跳过trailer直到空行
+                while await self._readline():
+                    pass
+                self.done = True
+                return 0
+            self.remaining = size
+        mv = memoryview(buf)[:min(len(buf), self.remaining)]
+        if self.pending:
+            n = min(len(mv), len(self.pending))
+            mv[:n] = self.pending[:n]
+            self.pending = self.pending[n:]
+        else:
+            n = await self.reader.readinto(mv)
+            if not n:
+                raise OSError("请求体不完整")
+        self.remaining -= n
+        if self.remaining == 0:
+            if self.chunked:
+                await self._readline()  # 分块末尾的\r\n
+            else:
+                self.done = True
+        return n
+
+    async def read(self, max_size):
+        """读取完整的请求体，只用于JSON等小请求体，超过max_size字节时抛出ValueError"""
+        if self.length is not None and self.length > max_size:
+            raise ValueError(f"请求体过大: {self.length}字节")
+        data = bytearray(self.length if self.length is not None else 0)
+        pos = 0
+        chunk = bytearray(512)
+        while True:
+            if pos < len(data):
+                n = await self.readinto(memoryview(data)[pos:])
+            else:
+                n = await self.readinto(chunk)
+                if n:
+                    if pos + n > max_size:
+                        raise ValueError(f"请求体超过{max_size}字节")
+                    data.extend(memoryview(chunk)[:n])
+            if not n:
+                break
+            pos += n
+        return bytes(data[:pos])
+
+    async def save(self, path, max_size, chunk_size=1024):
+        """把请求体分块写入文件，先写临时文件，完整后再替换，返回字节数"""
+        if self.length is not None and self.length > max_size:
+            raise ValueError(f"请求体过大: {self.length}字节")
+        tmp_path = path + ".tmp"
+        buf = bytearray(chunk_size)
+        mv = memoryview(buf)
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    n = await self.readinto(buf)
+                    if not n:
+                        break
+                    size += n
+                    if size > max_size:
+                        raise ValueError(f"请求体超过{max_size}字节")
+                    f.write(mv[:n])
+            try:
+                uos.rename(tmp_path, path)
+            except OSError:
+                # 有的文件系统不能直接覆盖已存在的文件
+                uos.remove(path)
+                uos.rename(tmp_path, path)
+        except Exception:
+            try:
+                uos.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+async def ws_handshake(writer, data):
     """处理WebSocket握手"""
     if b'Sec-WebSocket-Key:' in data:
         lines = data.decode().split('\r\n')
@@ -176,183 +388,311 @@ def ws_handshake(sock, data):
                 "Connection: Upgrade\r\n"
                 "Sec-WebSocket-Accept: " + accept_key + "\r\n\r\n"
             )
-            sock.send(response.encode())
+            writer.write(response.encode())
+            await writer.drain()
             return True
     return False
 
-def ws_receive(data):
-    """解析WebSocket消息"""
-    # 检查是否是握手响应（包含HTTP头）
-    if b'\r\n\r\n' in data:
-        # print("检测到握手响应，跳过...")
-        header_end = data.find(b'\r\n\r\n') + 4  # 找到HTTP头结束位置
-        data = data[header_end:]  # 提取纯WebSocket数据帧部分
-        
-    if len(data) < 2:
-        return None, data
-    
-    # 检查操作码
-    opcode = data[0] & 0x0F
-    if opcode != 0x01:  # 非文本帧
-        return None, data[2:]
-    
-    masked = data[1] & 0x80
-    payload_len = data[1] & 0x7F
-    
-    idx = 2
-    if payload_len == 126:
-        if len(data) < 4:
-            return None, data
-        payload_len = int.from_bytes(data[2:4], 'big')
-        idx = 4
-    elif payload_len == 127:
-        return None, data  # 不支持超长消息
-    
-    if masked:
-        if len(data) < idx + 4 + payload_len:
-            return None, data
-        mask = data[idx:idx+4]
-        idx += 4
-    else:
-        if len(data) < idx + payload_len:
-            return None, data
-    
-    payload = data[idx:idx+payload_len]
-    
-    if masked:
-        payload = bytearray(payload)
-        for i in range(len(payload)):
-            payload[i] ^= mask[i % 4]
-        payload = bytes(payload)
-    
-    try:
-        return payload.decode('utf-8'), data[idx+payload_len:]
-    except:
-        return None, data[idx+payload_len:]
+# WebSocket操作码
+WS_OP_CONT = 0x0
+WS_OP_TEXT = 0x1
+WS_OP_BINARY = 0x2
+WS_OP_CLOSE = 0x8
+WS_OP_PING = 0x9
+WS_OP_PONG = 0xA
+
+try:
+    import micropython # type: ignore
+
+    @micropython.viper
+    def _unmask(buf, start: int, n: int, mask):
+        # 原生代码逐字节异或掩码，速度接近C
+        p = ptr8(buf) # type: ignore
+        m = ptr8(mask) # type: ignore
+        i = 0
+        while i < n:
+            p[start + i] = p[start + i] ^ m[i & 3]
+            i += 1
+except:
+    def _unmask(buf, start, n, mask):
+        # 没有viper时把整段当作大整数一次异或，避免逐字节的Python循环
+        seg = memoryview(buf)[start:start + n]
+        key = (bytes(mask) * ((n >> 2) + 1))[:n]
+        seg[:] = (int.from_bytes(seg, 'big') ^ int.from_bytes(key, 'big')).to_bytes(n, 'big')
+
+class WsFrameParser:
+    """
+    单个连接的增量WebSocket帧解析器。
+    数据直接接收到预分配的bytearray中，用读写偏移量管理，不再反复拼接和切片bytes；
+    支持16位和64位长度、分片消息和控制帧(ping/pong/close)。
+    """
+    def __init__(self, size=1024):
+        """
+        :param size: 缓冲区大小，需能容纳最大的一条完整消息
+        """
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.start = 0       # 下一帧的起始偏移
+        self.end = 0         # 已接收数据的结束偏移
+        self.msg_opcode = 0  # 正在拼接的分片消息的操作码，0表示没有
+        self.msg_start = 0   # 分片消息已拼接部分的起始偏移
+        self.msg_len = 0     # 分片消息已拼接部分的长度
+
+    def _move(self, dst, src, n):
+        # 把数据向缓冲区前部移动，每次拷贝的长度不超过移动距离，保证源和目标不重叠
+        step = src - dst
+        pos = 0
+        while pos < n:
+            size = min(step, n - pos)
+            self.mv[dst + pos:dst + pos + size] = self.mv[src + pos:src + pos + size]
+            pos += size
+
+    def free(self):
+        """返回缓冲区尾部的空闲空间，空间不足时先把未处理的数据移到缓冲区开头"""
+        keep = self.msg_start if self.msg_opcode else self.start
+        if keep == self.end:
+            # 数据已全部处理，直接复位偏移量
+            if self.msg_opcode:
+                self.msg_start = 0
+            self.start = self.end = 0
+        elif keep > 0 and len(self.buf) - self.end < len(self.buf) >> 2:
+            self._move(0, keep, self.end - keep)
+            self.start -= keep
+            self.end -= keep
+            if self.msg_opcode:
+                self.msg_start -= keep
+        if self.end == len(self.buf):
+            raise ValueError("WebSocket消息超过缓冲区大小")
+        return self.mv[self.end:]
+
+    def commit(self, n):
+        """登记写入free()返回空间中的n个字节"""
+        self.end += n
+
+    def feed(self, data):
+        """拷贝一段已收到的数据到缓冲区，如握手请求之后紧跟的数据"""
+        pos = 0
+        while pos < len(data):
+            space = self.free()
+            n = min(len(space), len(data) - pos)
+            space[:n] = data[pos:pos + n]
+            self.commit(n)
+            pos += n
 
-def ws_send(sock, message):
-    """发送WebSocket消息"""
+    async def recv_from(self, reader):
+        """从uasyncio流直接读入缓冲区，返回读到的字节数，0表示对端已关闭"""
+        n = await reader.readinto(self.free())
+        if n:
+            self.commit(n)
+        return n or 0
+
+    def next(self):
+        """
+        解析下一条完整的消息或控制帧。
+        :return: (操作码, 负载memoryview)，数据不完整时返回None；
+                 负载直接引用内部缓冲区，在下一次调用free/feed/recv_from之前有效
+        """
+        buf = self.buf
+        while True:
+            i = self.start
+            avail = self.end - i
+            if avail < 2:
+                return None
+            fin = buf[i] & 0x80
+            opcode = buf[i] & 0x0F
+            masked = buf[i + 1] & 0x80
+            n = buf[i + 1] & 0x7F
+            hdr = 2
+            if n == 126:
+                if avail < 4:
+                    return None
+                n = (buf[i + 2] << 8) | buf[i + 3]
+                hdr = 4
+            elif n == 127:
+                if avail < 10:
+                    return None
+                n = int.from_bytes(self.mv[i + 2:i + 10], 'big')
+                hdr = 10
+            if masked:
+                hdr += 4
+            if hdr + n + (self.msg_len if self.msg_opcode else 0) > len(buf):
+                raise ValueError(f"WebSocket消息过大: {n}字节")
+            if avail < hdr + n:
+                return None
+            p = i + hdr
+            if masked:
+                _unmask(buf, p, n, bytes(self.mv[p - 4:p]))
+            self.start = p + n
+            if opcode >= WS_OP_CLOSE:
+                # 控制帧不分片，可以插在分片消息中间
+                return opcode, self.mv[p:p + n]
+            if opcode != WS_OP_CONT:
+                if fin:
+                    self.msg_opcode = 0
+                    return opcode, self.mv[p:p + n]
+                # 分片消息的第一帧
+                self.msg_opcode = opcode
+                self.msg_start = p
+                self.msg_len = n
+                continue
+            if not self.msg_opcode:
+                continue  # 没有开头的续帧，丢弃
+            # 续帧：把负载接到已拼接部分的后面
+            dst = self.msg_start + self.msg_len
+            if dst != p:
+                self._move(dst, p, n)
+            self.msg_len += n
+            if fin:
+                opcode = self.msg_opcode
+                self.msg_opcode = 0
+                return opcode, self.mv[self.msg_start:self.msg_start + self.msg_len]
+
+async def ws_send(writer, message, opcode=WS_OP_TEXT):
+    """发送WebSocket消息，message为str或bytes，默认作为文本帧发送"""
     try:
-        msg_bytes = message.encode('utf-8')
-        frame = bytearray([0x81])  # 文本帧
+        msg_bytes = message.encode('utf-8') if isinstance(message, str) else message
+        frame = bytearray([0x80 | opcode])
         
         if len(msg_bytes) < 126:
             frame.append(len(msg_bytes))
-        else:
+        elif len(msg_bytes) < 65536:
             frame.append(126)
             frame.extend(len(msg_bytes).to_bytes(2, 'big'))
+        else:
+            frame.append(127)
+            frame.extend(len(msg_bytes).to_bytes(8, 'big'))
         
-        frame.extend(msg_bytes)
-        sock.send(bytes(frame))
+        # 帧头和负载分开写入，不再拼接出整帧的副本
+        writer.write(frame)
+        writer.write(msg_bytes)
+        await writer.drain()
         return True
     except Exception as e:
         print(f"发送错误: {e}")
         return False
-    
+
+async def ws_process(writer, parser, client_id):
+    """处理解析器中所有完整的WebSocket消息，收到关闭帧时返回False"""
+    while True:
+        frame = parser.next()
+        if frame is None:
+            return True
+        opcode, payload = frame
+        if opcode == WS_OP_TEXT:
+            msg = bytes(payload).decode('utf-8')
+            print(f"📥 客户端 #{client_id}: {msg[:100]}")
+            response = await handle_websocket_command(msg)
+        elif opcode == WS_OP_BINARY:
+            print(f"📥 客户端 #{client_id}: 二进制帧{len(payload)}字节")
+            response = await handle_websocket_binary(payload)
+        elif opcode == WS_OP_PING:
+            await ws_send(writer, bytes(payload), WS_OP_PONG)
+            continue
+        elif opcode == WS_OP_CLOSE:
+            await ws_send(writer, bytes(payload[:2]), WS_OP_CLOSE)
+            return False
+        else:
+            continue
+        await ws_send(writer, response)
+        print(f"📤 服务端: {response}")
+        gc.collect()  # 及时回收内存
+
+async def ws_session(reader, writer, head, rest, client_id):
+    """
+    完成握手后在同一个协程中持续接收和处理WebSocket消息，直到连接关闭
+    :param head: 握手请求头
+    :param rest: 请求头之后已经收到的数据
+    """
+    if not await ws_handshake(writer, head):
+        return
+    print(f"🔗 客户端 #{client_id} WebSocket握手成功")
+    await ws_send(writer, ujson.dumps({"cmd_type":"websocket","connect_status":f"websocket连接成功! 你是客户端 #{client_id}"}))
+    parser = WsFrameParser(WS_BUFFER_SIZE)
+    # 握手请求之后可能已经跟着WebSocket数据
+    parser.feed(rest)
+    while await ws_process(writer, parser, client_id):
+        if not await parser.recv_from(reader):
+            break  # 对端断开
+
+async def read_request_head(reader):
+    """
+    读取到请求头结束(空行)为止，每次只在新收到的数据附近查找空行
+    :return: (请求头, 请求头之后已经收到的数据)
+    """
+    data = b''
+    while True:
+        chunk = await reader.read(1024)
+        if not chunk:
+            raise OSError("请求头不完整")
+        start = max(len(data) - 3, 0)
+        data += chunk
+        end = data.find(b'\r\n\r\n', start)
+        if end >= 0:
+            return data[:end + 4], data[end + 4:]
+        if len(data) > HTTP_HEADER_MAX:
+            raise ValueError("请求头过长")
+
+_next_client_id = 1
+
+async def handle_client(reader, writer):
+    """每个连接一个协程，某个连接读写或刷新墨水屏时不影响接受新连接和处理其他连接"""
+    global _next_client_id
+    client_id = _next_client_id
+    _next_client_id += 1
+    print(f"✅ 客户端 #{client_id} 连接: {writer.get_extra_info('peername')}")
+    try:
+        head, rest = await asyncio.wait_for(read_request_head(reader), HTTP_HEADER_TIMEOUT)
+        request_json = parse_request_head(head)
+        if request_json["method"] == "GET" and ink_static.header(request_json["headers"], "Upgrade").lower() == "websocket":
+            print("检测到WebSocket握手请求...")
+            await ws_session(reader, writer, head, rest, client_id)
+        else:
+            print("检测到HTTP请求...")
+            # 处理除websocket建立链接之外的普通HTTP请求
+            try:
+                body = HttpBody(reader, request_json["headers"], rest)
+                response = await handle_http_request(request_json, body, writer)
+            except ValueError as e:
+                print(f"HTTP请求无效: {e}")
+                response = 'HTTP/1.1 400 Bad Request\r\nContent-Type: text/plain\r\n\r\n' + str(e)
+            except Exception as e:
+                print(f"处理HTTP请求出错: {e}")
+                response = 'HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nInternal Server Error'
+            if response is not None:
+                writer.write(response.encode('utf-8')) # type: ignore
+                await writer.drain()
+    except Exception as e:
+        # 客户端错误或超时
+        print(f"⚠️ 客户端 #{client_id} 错误: {e}")
+    finally:
+        print(f"❌ 客户端 #{client_id} 断开连接")
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+        gc.collect()
+
+async def housekeeping():
+    """后台任务：空闲时让墨水屏睡眠，并定期回收内存"""
+    count = 0
+    while True:
+        await asyncio.sleep(1)
+        await ink_display.idle_check_async()
+        count += 1
+        if count % 5 == 0:  # 每5秒回收一次
+            gc.collect()
+
+async def serve(host="0.0.0.0", port=80):
+    server = await asyncio.start_server(handle_client, host, port, backlog=3)
+    print(f"🚀 WebSocket服务器已启动: ws://本机IP:{port}")
+    asyncio.create_task(housekeeping())
+    await server.wait_closed()
 
 def start_websocket_server():
     """启动WebSocket服务器"""
-    # 创建服务器socket
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_socket.bind(("0.0.0.0", 80))
-    server_socket.listen(3)  # 减少并发连接数
-    print(f"🚀 WebSocket服务器已启动: ws://本机IP:8080")
-    
-    # 使用poll处理多客户端
-    poll = select.poll()
-    poll.register(server_socket, select.POLLIN)
-    
-    clients = {} 
-    client_ids = {}
-    next_client_id = 1
-    
     try:
-        while True:
-            events = poll.poll(1000)  # 处理事件，设置超时避免忙等待，1秒超时
-            for sock, event in events:
-                if sock is server_socket:
-                    client_sock, addr = server_socket.accept()
-                    client_id = next_client_id
-                    next_client_id += 1
-                    clients[client_sock] = b''
-                    client_ids[client_sock] = client_id
-                    poll.register(client_sock, select.POLLIN)  
-                    print(f"✅ 客户端 #{client_id} 连接: {addr}")
-                    
-                else:
-                    # 处理客户端数据
-                    try:
-                        data = sock.recv(1024)
-                        if data:
-                            clients[sock] += data                     
-                            # print("clients[sock]:",clients[sock][:200]) # 打印接收到的数据,为避免太长时打印，只打印前200个字符
-                            if b'GET' in clients[sock] and b'Upgrade: websocket' in clients[sock]:
-                                print("检测到WebSocket握手请求...")
-                                if ws_handshake(sock, clients[sock]):
-                                    # 检查是否是WebSocket握手请求
-                                    client_id = client_ids[sock]
-                                    print(f"🔗 客户端 #{client_id} WebSocket握手成功")
-                                    ws_send(sock, ujson.dumps({"cmd_type":"websocket","connect_status":f"websocket连接成功! 你是客户端 #{client_id}"}))
-                                    clients[sock] = b''  # 清空缓冲区
-                            elif b'GET' in clients[sock] or b'POST' in clients[sock]:
-                                print("检测到HTTP请求...")
-                                # 处理除websocket建立链接之外的普通HTTP请求
-                                try:
-                                    request_json = parse_http_request(clients[sock])
-                                    response = handle_http_request(request_json)
-                                    sock.send(response.encode('utf-8')) # type: ignore
-                                except Exception as e:
-                                    print(f"处理HTTP请求出错: {e}")
-                                    response = 'HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nInternal Server Error'
-                                    sock.send(response.encode('utf-8'))
-                                sock.close()
-                                poll.unregister(sock)
-                                del clients[sock]
-                                del client_ids[sock]
-                            else:
-                                print("监测到WebSocket数据请求...")
-                                # 处理WebSocket请求数据
-                                while True:
-                                    msg, remaining = ws_receive(clients[sock])
-                                    if msg is None:
-                                        break
-                                    client_id = client_ids[sock]
-                                    print(f"📥 客户端 #{client_id}: {msg[:100]}")                           
-                                    response = handle_websocket_command(msg)
-                                    ws_send(sock, response)
-                                    print(f"📤 服务端: {response}")
-                                    clients[sock] = remaining
-                                    gc.collect()  # 及时回收内存
-                        else:
-                            # 客户端断开连接
-                            client_id = client_ids.get(sock, '未知')
-                            print(f"❌ 客户端 #{client_id} 断开连接")
-                            poll.unregister(sock)
-                            sock.close()
-                            if sock in clients:
-                                del clients[sock]
-                            if sock in client_ids:
-                                del client_ids[sock]
-                                
-                    except Exception as e:
-                        # 客户端错误
-                        client_id = client_ids.get(sock, '未知')
-                        print(f"⚠️ 客户端 #{client_id} 错误: {e}")
-                        poll.unregister(sock)
-                        try:
-                            sock.close()
-                        except:
-                            pass
-                        if sock in clients:
-                            del clients[sock]
-                        if sock in client_ids:
-                            del client_ids[sock]
-            
-            # 定期内存回收
-            if ticks_ms() % 5000 < 100:  # 每5秒左右回收一次
-                gc.collect()
-                
+        asyncio.run(serve())
     except KeyboardInterrupt:
         # 捕获用户主动中断退出
         print(f"🛑 服务器被用户停止！")
@@ -360,16 +700,10 @@ def start_websocket_server():
         # 捕获其他错误
         print(f"💥 服务器错误: {e}！")
     finally:
-        # 清理资源
-        for sock in list(clients.keys()):
-            try:
-                poll.unregister(sock)
-                sock.close()
-            except:
-                pass
-        server_socket.close()
+        # 清理事件循环中残留的任务和连接
+        asyncio.new_event_loop()
         print(f"🧹 服务器已关闭！")
 
 # 启动服务器
 if __name__ == "__main__":
-    start_websocket_server()
\ No newline at end of file
+    start_websocket_server()
@@ -0,0 +1,233 @@
+"""
+在电脑上把图片批量转换为墨水屏帧数据(MONO_HLSB，与InkDisplay.buf一致，1为白、0为黑)，需要安装NumPy和Pillow：
+    pip install numpy pillow
+    python img2epd.py 图片目录或文件... -o out --dither floyd --epk --preview
+
+- 缩放/裁剪、灰度、阈值和抖动都用NumPy向量化计算
+- 抖动方式：threshold(固定阈值，与ink_index.html相同)、bayer(有序抖动)、floyd(Floyd-Steinberg误差扩散)
+- --epk输出设备端的压缩格式(ink_codec)，--preview同时输出预览PNG
+- 多个文件时使用进程池并行转换，结束时输出每秒帧数
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# 设备端的压缩格式与本工具共用同一份实现
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eink"))
+import ink_codec  # noqa: E402
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+DITHERS = ("threshold", "bayer", "floyd")
+
+def bayer_matrix(n):
+    """n×n的Bayer矩阵(n为2的幂)，归一化到0~255的阈值"""
+    m = np.zeros((1, 1), dtype=np.float32)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return (m + 0.5) * 255.0 / m.size
+
+def to_gray(rgb):
+    """RGB(A)数组转灰度，权重与ink_index.html相同：0.299R + 0.587G + 0.114B"""
+    rgb = rgb.astype(np.float32)
+    if rgb.ndim == 2:
+        return rgb
+    if rgb.shape[2] == 4:
+        # 透明部分按白色背景合成
+        alpha = rgb[:, :, 3:4] / 255.0
+        rgb = rgb[:, :, :3] * alpha + 255.0 * (1.0 - alpha)
+    return rgb[:, :, 0] * 0.299 + rgb[:, :, 1] * 0.587 + rgb[:, :, 2] * 0.114
+
+def resize(gray, width, height):
+    """双线性缩放"""
+    src_h, src_w = gray.shape
+    if (src_w, src_h) == (width, height):
+        return gray
+    ys = (np.arange(height, dtype=np.float32) + 0.5) * src_h / height - 0.5
+    xs = (np.arange(width, dtype=np.float32) + 0.5) * src_w / width - 0.5
+    ys = np.clip(ys, 0, src_h - 1)
+    xs = np.clip(xs, 0, src_w - 1)
+    y0 = np.floor(ys).astype(np.intp)
+    x0 = np.floor(xs).astype(np.intp)
+    y1 = np.minimum(y0 + 1, src_h - 1)
+    x1 = np.minimum(x0 + 1, src_w - 1)
+    wy = (ys - y0)[:, None]
+    wx = (xs - x0)[None, :]
+    top = gray[y0][:, x0] * (1 - wx) + gray[y0][:, x1] * wx
+    bottom = gray[y1][:, x0] * (1 - wx) + gray[y1][:, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+def fit(gray, width, height, mode="crop"):
+    """
+    把灰度图调整为width×height。
+    :param mode: crop(居中裁剪后铺满)、pad(完整缩放，空白处填白)、stretch(直接拉伸)
+    """
+    src_h, src_w = gray.shape
+    if mode == "stretch":
+        return resize(gray, width, height)
+    if mode == "crop":
+        if src_w * height > width * src_h:
+            w = src_h * width // height
+            x = (src_w - w) // 2
+            gray = gray[:, x:x + w]
+        else:
+            h = src_w * height // width
+            y = (src_h - h) // 2
+            gray = gray[y:y + h, :]
+        return resize(gray, width, height)
+    if mode == "pad":
+        scale = min(width / src_w, height / src_h)
+        w = max(1, round(src_w * scale))
+        h = max(1, round(src_h * scale))
+        out = np.full((height, width), 255.0, dtype=np.float32)
+        x = (width - w) // 2
+        y = (height - h) // 2
+        out[y:y + h, x:x + w] = resize(gray, w, h)
+        return out
+    raise ValueError(f"未知的缩放方式: {mode}")
+
+def dither_threshold(gray, threshold=128):
+    """固定阈值，返回白色像素为True的布尔数组"""
+    return gray > threshold
+
+def dither_bayer(gray, size=4):
+    """有序抖动"""
+    m = bayer_matrix(size)
+    h, w = gray.shape
+    tiled = np.tile(m, ((h + size - 1) // size, (w + size - 1) // size))[:h, :w]
+    return gray > tiled
+
+def dither_floyd(gray, threshold=128):
+    """
+    Floyd-Steinberg误差扩散。
+    像素(y, x)只依赖t=2y+x更小的像素，所以同一条t=2y+x斜线上的像素可以一次向量化处理，
+    共2H+W-2步，每步处理的像素行号各不相同，误差累加不会冲突。
+    """
+    h, w = gray.shape
+    # 误差缓冲左右各多一列、下方多一行，省去边界判断
+    err = np.zeros((h + 1, w + 2), dtype=np.float32)
+    out = np.zeros((h, w), dtype=bool)
+    all_y = np.arange(h)
+    for t in range(2 * (h - 1) + w):
+        y_lo = max(0, (t - w + 2) // 2)
+        y_hi = min(h - 1, t // 2)
+        if y_lo > y_hi:
+            continue
+        ys = all_y[y_lo:y_hi + 1]
+        xs = t - 2 * ys
+        value = gray[ys, xs] + err[ys, xs + 1]
+        white = value > threshold
+        out[ys, xs] = white
+        e = value - np.where(white, 255.0, 0.0)
+        err[ys, xs + 2] += e * (7 / 16)
+        err[ys + 1, xs] += e * (3 / 16)
+        err[ys + 1, xs + 1] += e * (5 / 16)
+        err[ys + 1, xs + 2] += e * (1 / 16)
+    return out
+
+def dither(gray, method="floyd", threshold=128, bayer_size=4):
+    if method == "threshold":
+        return dither_threshold(gray, threshold)
+    if method == "bayer":
+        return dither_bayer(gray, bayer_size)
+    if method == "floyd":
+        return dither_floyd(gray, threshold)
+    raise ValueError(f"未知的抖动方式: {method}")
+
+def pack(white):
+    """布尔像素数组打包为MONO_HLSB字节，每行按字节对齐，最高位在左"""
+    return np.packbits(white, axis=1).tobytes()
+
+def load_image(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        return np.asarray(image)
+
+def convert_array(rgb, width=400, height=300, fit_mode="crop", method="floyd", threshold=128, bayer_size=4, invert=False):
+    """把图像数组转换为(帧数据, 白色像素布尔数组)"""
+    gray = fit(to_gray(rgb), width, height, fit_mode)
+    if invert:
+        gray = 255.0 - gray
+    white = dither(gray, method, threshold, bayer_size)
+    return pack(white), white
+
+def convert_file(src, dst_dir, options):
+    """转换一个文件，返回(输出路径, 输出字节数)"""
+    data, white = convert_array(load_image(src), options["width"], options["height"], options["fit"],
+                                options["dither"], options["threshold"], options["bayer_size"], options["invert"])
+    name = os.path.splitext(os.path.basename(src))[0]
+    if options["epk"]:
+        data = ink_codec.encode(data, options["width"], options["height"])
+        dst = os.path.join(dst_dir, name + ".epk")
+    else:
+        dst = os.path.join(dst_dir, name + ".bin")
+    with open(dst, "wb") as f:
+        f.write(data)
+    if options["preview"]:
+        from PIL import Image
+
+        Image.fromarray(white.astype(np.uint8) * 255).save(os.path.join(dst_dir, name + ".preview.png"))
+    return dst, len(data)
+
+def _convert_job(args):
+    return convert_file(*args)
+
+def collect_images(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTS):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+def convert_batch(files, dst_dir, options, workers=None):
+    """
+    批量转换，workers为1时在当前进程中转换。
+    :return: (结果列表, 耗时秒)
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    jobs = [(src, dst_dir, options) for src in files]
+    t0 = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [_convert_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_convert_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    return results, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图片批量转换为墨水屏帧数据")
+    parser.add_argument("src", nargs="+", help="图片文件或目录")
+    parser.add_argument("-o", "--out", default="out", help="输出目录")
+    parser.add_argument("--width", type=int, default=400)
+    parser.add_argument("--height", type=int, default=300)
+    parser.add_argument("--fit", choices=("crop", "pad", "stretch"), default="crop")
+    parser.add_argument("--dither", choices=DITHERS, default="floyd")
+    parser.add_argument("--threshold", type=int, default=128)
+    parser.add_argument("--bayer-size", type=int, choices=(2, 4, 8, 16), default=4)
+    parser.add_argument("--invert", action="store_true", help="反色")
+    parser.add_argument("--epk", action="store_true", help="输出压缩格式(.epk)")
+    parser.add_argument("--preview", action="store_true", help="同时输出预览PNG")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    args = parser.parse_args()
+
+    options = {
+        "width": args.width, "height": args.height, "fit": args.fit, "dither": args.dither,
+        "threshold": args.threshold, "bayer_size": args.bayer_size, "invert": args.invert,
+        "epk": args.epk, "preview": args.preview,
+    }
+    files = collect_images(args.src)
+    if not files:
+        parser.error("没有找到图片")
+    results, elapsed = convert_batch(files, args.out, options, args.workers)
+    total = sum(n for _, n in results)
+    print(f"{len(results)}帧, 共{total}字节, 耗时{elapsed:.2f}s, {len(results) / elapsed:.1f}帧/秒")
@@ -0,0 +1,89 @@
+"""
+在电脑上生成墨水屏使用的点阵字体文件(格式见eink/ink_font.py)，需要安装Pillow：
+    pip install pillow
+    python make_font.py NotoSansSC-Regular.otf --sizes 16,24,32 --chars 常用字.txt --out fonts
+
+生成的fonts目录整个上传到墨水屏，之后InkDisplay.display_jsondata遇到字体中包含的文字会直接在本地排版。
+字符集为可打印ASCII加上--chars文件和--text参数中的字符，只收录用得到的汉字可以大幅缩小文件。
+"""
+import argparse
+import os
+import struct
+
+MAGIC = b'EFN\x01'
+FONT_FILE = "font{}.efn"
+
+def pack_bitmap(pixels, width, height):
+    """把0/1像素矩阵(1为笔画)打包为MONO_HLSB，0为笔画、1为背景"""
+    stride = (width + 7) // 8
+    out = bytearray(b'\xff' * stride * height)
+    for y in range(height):
+        for x in range(width):
+            if pixels[y][x]:
+                out[y * stride + x // 8] &= ~(0x80 >> (x % 8))
+    return bytes(out)
+
+def write_font(path, height, glyphs):
+    """
+    写出字体文件。
+    :param glyphs: {码位: (宽度, MONO_HLSB字形数据)}
+    """
+    codes = sorted(glyphs)
+    data_offset = 12 + 8 * len(codes)
+    index = bytearray()
+    data = bytearray()
+    for code in codes:
+        width, bitmap = glyphs[code]
+        if not 0 < width < 256:
+            raise ValueError(f"字形宽度超出范围: U+{code:04X} {width}")
+        if len(data) >= 1 << 24:
+            raise ValueError("字形数据超过16MB")
+        index += struct.pack(">IB", code, width) + len(data).to_bytes(3, "big")
+        data += bitmap
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack(">BBHI", height, 0, len(codes), data_offset))
+        f.write(index)
+        f.write(data)
+    return data_offset + len(data)
+
+def render_glyphs(font_path, size, chars, threshold=128):
+    """用Pillow把字符渲染为点阵，半角字符按实际宽度，其余按字号宽度"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.truetype(font_path, size)
+    ascent, descent = font.getmetrics()
+    offset_y = (size - ascent - descent) // 2
+    glyphs = {}
+    for ch in chars:
+        width = max(1, round(font.getlength(ch))) if ord(ch) < 0x2E80 else size
+        width = min(width, 255)
+        image = Image.new("L", (width, size), 255)
+        ImageDraw.Draw(image).text((0, offset_y), ch, font=font, fill=0)
+        pixels = image.load()
+        bits = [[pixels[x, y] < threshold for x in range(width)] for y in range(size)]
+        glyphs[ord(ch)] = (width, pack_bitmap(bits, width, size))
+    return glyphs
+
+def collect_chars(chars_file=None, text=""):
+    chars = {chr(c) for c in range(0x20, 0x7F)}
+    if chars_file:
+        with open(chars_file, encoding="utf-8") as f:
+            chars.update(f.read())
+    chars.update(text)
+    return sorted(ch for ch in chars if ch not in "\r\n\t")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成墨水屏点阵字体")
+    parser.add_argument("font", help="TrueType/OpenType字体文件")
+    parser.add_argument("--sizes", default="16,24,32", help="字号列表，逗号分隔")
+    parser.add_argument("--chars", help="包含所需字符的UTF-8文本文件")
+    parser.add_argument("--text", default="", help="额外需要的字符")
+    parser.add_argument("--out", default="fonts", help="输出目录")
+    args = parser.parse_args()
+
+    chars = collect_chars(args.chars, args.text)
+    os.makedirs(args.out, exist_ok=True)
+    for size in (int(s) for s in args.sizes.split(",")):
+        path = os.path.join(args.out, FONT_FILE.format(size))
+        nbytes = write_font(path, size, render_glyphs(args.font, size, chars))
+        print(f"{path}: {len(chars)}个字符, {nbytes}字节")
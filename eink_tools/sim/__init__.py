@@ -0,0 +1,91 @@
+"""
+在电脑上运行eink/目录下设备端代码的模拟器。
+
+    import sim
+    sim.install(out_dir="sim_out")      # 必须在导入设备端模块之前调用
+    import ink_display
+    ink = ink_display.InkDisplay()
+    with sim.trace.span("show"):
+        ink.show()
+    print(sim.trace.summary())
+
+install()把machine、framebuf、network、ntptime、urequests、usocket、uasyncio等模块替换为本目录下的实现，
+并把time模块的sleep_ms/ticks_ms等指向虚拟时钟：
+- machine.SPI的写入按波特率推进虚拟时间，并交给模拟的墨水屏(panel.FakePanel)解析命令流
+- 墨水屏在上电、刷新、断电时按设定时长拉低BUSY，每次刷新后把画面写成PNG
+- trace记录SPI写入、命令次数、刷新、HTTP请求，以及span()内的Python执行时间和虚拟时间
+"""
+import binascii
+import gc
+import hashlib
+import json
+import os
+import select
+import ssl
+import struct
+import sys
+import time
+
+from . import clock as _clock
+from .clock import clock
+from .trace import trace
+from .net import route
+from . import machine, framebuf, network, ntptime, urequests, usocket, uasyncio, micropython, net, panel as _panel
+from . import _thread as _sim_thread
+
+EINK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "eink"))
+
+panel = None
+
+# 设备端用到的MicroPython模块名 -> 替身
+MODULES = {
+    "machine": machine,
+    "framebuf": framebuf,
+    "network": network,
+    "ntptime": ntptime,
+    "urequests": urequests,
+    "usocket": usocket,
+    "uasyncio": uasyncio,
+    "micropython": micropython,
+    "ujson": json,
+    "uos": os,
+    "ubinascii": binascii,
+    "ustruct": struct,
+    "uhashlib": hashlib,
+    "uselect": select,
+    "_thread": _sim_thread,
+}
+
+def _wrap_socket(wrap):
+    def wrap_socket(sock, *args, **kw):
+        if isinstance(sock, net.FakeSocket):
+            return net.wrap_socket(sock, **kw)
+        return wrap(sock, *args, **kw)
+    return wrap_socket
+
+def install(out_dir=None, eink_dir=EINK_DIR, **panel_options):
+    """
+    安装模拟模块并创建模拟的墨水屏，返回FakePanel。
+    :param out_dir: 每次刷新后的画面PNG写到该目录，None时不写
+    :param panel_options: 传给FakePanel，如full_refresh_ms=3000
+    """
+    global panel
+    sys.modules.update(MODULES)
+    for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "sleep_ms", "sleep_us"):
+        setattr(time, name, getattr(_clock, name))
+    gc.mem_free = lambda: 200 * 1024
+    gc.mem_alloc = lambda: 0
+    if not getattr(getattr(ssl, "wrap_socket", None), "sim", False):
+        ssl.wrap_socket = _wrap_socket(getattr(ssl, "wrap_socket", None))
+        ssl.wrap_socket.sim = True
+    if eink_dir and eink_dir not in sys.path:
+        sys.path.insert(0, eink_dir)
+    if panel is not None:
+        panel.detach()
+    panel = _panel.FakePanel(out_dir=out_dir, **panel_options)
+    return panel
+
+def reset():
+    """清空trace和路由表，虚拟时间不回退"""
+    trace.reset()
+    net.routes.clear()
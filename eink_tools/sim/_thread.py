@@ -0,0 +1,13 @@
+"""
+_thread模块的替身。虚拟时钟和模拟网络不是线程安全的，start_new_thread直接在调用者中执行，
+与不支持线程的设备相同：后台任务执行期间事件循环暂停。
+"""
+
+def start_new_thread(func, args, kwargs=None):
+    func(*args, **(kwargs or {}))
+
+def stack_size(size=0):
+    return 0
+
+def get_ident():
+    return 1
@@ -0,0 +1,118 @@
+"""
+在模拟器上运行几个典型场景，输出每个场景的SPI写入、命令次数、Python执行时间和墨水屏(虚拟)时间，
+刷新后的画面写到输出目录下的frame_NNN.png：
+    python eink_tools/sim/bench.py -o sim_out
+    python eink_tools/sim/bench.py --baudrate 4000000 --chunk-size 512
+"""
+import argparse
+import os
+import sys
+
+# 以包的形式导入sim，本目录不能在sys.path中，否则machine等模块会被重复导入
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != HERE]
+sys.path.insert(0, os.path.dirname(HERE))
+import sim  # noqa: E402
+
+IMAGE_URL = "https://sim.example.com/bin/frame.bin"
+EPK_URL = "https://sim.example.com/bin/frame.epk"
+
+def test_pattern(ink):
+    # 格子和文字组成的测试画面
+    ink.clear()
+    for i in range(0, 400, 40):
+        ink.fb.fill_rect(i, (i // 40 % 2) * 150, 20, 150, 0)
+    ink.fb.fill_rect(40, 120, 320, 60, 1)
+    ink.displaychar("SIM TEST PATTERN", 136, 146)
+    ink.mark_dirty(0, 0, 400, 300)
+
+def run(args):
+    sim.install(out_dir=args.out, full_refresh_ms=args.full_refresh_ms, partial_refresh_ms=args.partial_refresh_ms)
+    os.chdir(args.out)  # 设备端代码在当前目录读写文件
+    if os.path.exists("ink_frame.crc"):
+        os.remove("ink_frame.crc")
+    import ink_display
+    import ink_codec
+    import ink_http
+    trace = sim.trace
+
+    with trace.span("init"):
+        ink = ink_display.InkDisplay(baudrate=args.baudrate, chunk_size=args.chunk_size)
+
+    test_pattern(ink)
+    with trace.span("show full"):
+        ink.show(full=True)
+    frame = bytes(ink.buf)
+
+    with trace.span("show unchanged"):
+        ink.show()
+
+    ink.clear_area(10, 10, 80, 24)
+    ink.displaychar("12:34", 14, 18)
+    with trace.span("show partial"):
+        ink.show()
+
+    # 同一帧分别以原始格式和压缩格式保存，从文件显示
+    with open("frame.bin", "wb") as f:
+        f.write(frame)
+    packed = ink_codec.encode(frame)
+    with open("frame.epk", "wb") as f:
+        f.write(packed)
+    for name in ("frame.bin", "frame.epk"):
+        ink.clear()
+        with trace.span("file " + name):
+            ink.display_bin_file(name)
+            ink.show(full=True)
+
+    # 从网络下载，第二次请求复用连接
+    sim.route(IMAGE_URL, frame)
+    sim.route(EPK_URL, packed)
+    for i, url in enumerate((IMAGE_URL, EPK_URL)):
+        ink.clear()
+        with trace.span("url %s #%d" % (url.rsplit(".", 1)[1], i + 1)):
+            ink.display_bin_url(url)
+            ink.show(full=True, force=True)
+    ink_http.close_idle()
+
+    # 异步刷新期间，另一个协程每10ms运行一次，统计它的最大间隔
+    import uasyncio as asyncio  # type: ignore
+    from time import ticks_ms, ticks_diff  # type: ignore
+
+    async def ticker(state):
+        last = ticks_ms()
+        while not state["done"]:
+            await asyncio.sleep_ms(10)
+            now = ticks_ms()
+            state["max_gap"] = max(state["max_gap"], ticks_diff(now, last))
+            last = now
+
+    async def main():
+        state = {"done": False, "max_gap": 0}
+        task = asyncio.create_task(ticker(state))
+        test_pattern(ink)
+        await ink.show_async(full=True, force=True)
+        state["done"] = True
+        await task
+        return state["max_gap"]
+
+    with trace.span("show_async full"):
+        max_gap = asyncio.run(main())
+
+    with trace.span("sleep"):
+        ink.sleep()
+
+    print(trace.summary())
+    print(f"show_async期间其他协程的最大间隔: {max_gap}ms")
+    print("命令次数: " + ", ".join(f"{name}={n}" for name, n in trace.commands.most_common()))
+    print(f"刷新{len(trace.refreshes)}次，画面保存在{os.path.abspath(args.out)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在模拟器上运行墨水屏显示场景")
+    parser.add_argument("-o", "--out", default="sim_out", help="输出目录")
+    parser.add_argument("--baudrate", type=int, default=10000000)
+    parser.add_argument("--chunk-size", type=int, default=0)
+    parser.add_argument("--full-refresh-ms", type=int, default=3800)
+    parser.add_argument("--partial-refresh-ms", type=int, default=450)
+    args = parser.parse_args()
+    args.out = os.path.abspath(args.out)
+    run(args)
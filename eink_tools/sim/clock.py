@@ -0,0 +1,83 @@
+"""
+模拟器的虚拟时钟。
+虚拟时间只由模拟出来的耗时推进(sleep_ms、SPI传输、墨水屏BUSY等)，不包含Python本身的执行时间，
+所以同一段程序每次运行得到的时间完全相同；Python执行时间由trace用perf_counter单独统计。
+"""
+import heapq
+
+class VirtualClock:
+    def __init__(self):
+        self.now_us = 0
+        self._events = []  # (到期时间us, 序号, 回调)
+        self._seq = 0
+
+    def ticks_ms(self):
+        return self.now_us // 1000
+
+    def ticks_us(self):
+        return self.now_us
+
+    def schedule(self, delay_us, callback):
+        """delay_us微秒后调用callback()，时间推进到该时刻时触发"""
+        self._seq += 1
+        heapq.heappush(self._events, (self.now_us + int(delay_us), self._seq, callback))
+
+    def next_event_us(self):
+        return self._events[0][0] if self._events else None
+
+    def advance_us(self, us):
+        """推进虚拟时间，依次触发期间到期的事件"""
+        target = self.now_us + max(0, int(us))
+        while self._events and self._events[0][0] <= target:
+            due, _, callback = heapq.heappop(self._events)
+            self.now_us = max(self.now_us, due)
+            callback()
+        self.now_us = target
+
+    def advance_to_next_event(self, max_us=None):
+        """推进到下一个事件(如BUSY释放)，没有事件时推进1ms；返回是否触发了事件"""
+        due = self.next_event_us()
+        if due is None:
+            self.advance_us(1000 if max_us is None else min(1000, max_us))
+            return False
+        step = due - self.now_us
+        if max_us is not None and step > max_us:
+            self.advance_us(max_us)
+            return False
+        self.advance_us(step)
+        return True
+
+    def sleep_ms(self, ms):
+        self.advance_us(ms * 1000)
+
+    def sleep_us(self, us):
+        self.advance_us(us)
+
+clock = VirtualClock()
+
+# MicroPython time模块中的ticks函数
+TICKS_PERIOD = 1 << 30
+
+def ticks_ms():
+    return clock.ticks_ms() % TICKS_PERIOD
+
+def ticks_us():
+    return clock.ticks_us() % TICKS_PERIOD
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+def ticks_diff(a, b):
+    diff = (a - b) % TICKS_PERIOD
+    if diff >= TICKS_PERIOD // 2:
+        diff -= TICKS_PERIOD
+    return diff
+
+def sleep_ms(ms):
+    clock.sleep_ms(ms)
+
+def sleep_us(us):
+    clock.sleep_us(us)
+
+def sleep(seconds):
+    clock.advance_us(seconds * 1000000)
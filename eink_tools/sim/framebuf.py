@@ -0,0 +1,109 @@
+"""
+framebuf模块的替身，只实现墨水屏用到的MONO_HLSB格式(每字节8个水平像素，最高位在左)。
+text()没有内置字库，每个字符画成一个空心小方框，只用来占位。
+"""
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format != MONO_HLSB:
+            raise ValueError("模拟器只支持MONO_HLSB")
+        self.buf = buffer
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8
+        if len(buffer) < self.stride * height:
+            raise ValueError("buffer too small")
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = y * self.stride + (x >> 3)
+        mask = 0x80 >> (x & 7)
+        if c is None:
+            return 1 if self.buf[i] & mask else 0
+        if c:
+            self.buf[i] |= mask
+        else:
+            self.buf[i] &= ~mask & 0xFF
+
+    def fill(self, c):
+        self.buf[:self.stride * self.height] = (b"\xff" if c else b"\x00") * (self.stride * self.height)
+
+    def fill_rect(self, x, y, w, h, c):
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, self.width), min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        full = b"\xff" if c else b"\x00"
+        # 整字节部分切片赋值，两端不足一字节的逐像素处理
+        b0 = (x0 + 7) >> 3
+        b1 = x1 >> 3
+        for row in range(y0, y1):
+            base = row * self.stride
+            if b0 < b1:
+                self.buf[base + b0:base + b1] = full * (b1 - b0)
+                edges = list(range(x0, b0 << 3)) + list(range(b1 << 3, x1))
+            else:
+                edges = range(x0, x1)
+            for col in edges:
+                self.pixel(col, row, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def text(self, s, x, y, c=1):
+        for i in range(len(s)):
+            if s[i] != " ":
+                self.rect(x + i * 8 + 1, y, 6, 7, c)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if palette is not None:
+            raise NotImplementedError("模拟器不支持palette")
+        # 按字节对齐且不透明时整行复制
+        if key == -1 and x >= 0 and x % 8 == 0 and fbuf.width % 8 == 0 and x + fbuf.width <= self.width:
+            n = fbuf.width // 8
+            for row in range(max(0, -y), min(fbuf.height, self.height - y)):
+                dst = (y + row) * self.stride + x // 8
+                src = row * fbuf.stride
+                self.buf[dst:dst + n] = fbuf.buf[src:src + n]
+            return
+        for row in range(max(0, -y), min(fbuf.height, self.height - y)):
+            for col in range(max(0, -x), min(fbuf.width, self.width - x)):
+                v = fbuf.pixel(col, row)
+                if v != key:
+                    self.pixel(x + col, y + row, v)
+
+    def scroll(self, xstep, ystep):
+        raise NotImplementedError
@@ -0,0 +1,154 @@
+"""
+machine模块的替身：Pin、SPI、RTC、Timer等，SPI写入转发给模拟的墨水屏。
+"""
+import time as _time
+
+from .clock import clock
+from .trace import trace
+
+# 引脚号 -> 最近创建的Pin，模拟墨水屏通过它读取DC/CS/RST并驱动BUSY
+pins = {}
+# SPI写入的监听者，即模拟的墨水屏
+spi_devices = []
+
+# 每次spi.write调用的固定开销(us)，模拟驱动层的调用成本，分块越多开销越大
+SPI_CALL_OVERHEAD_US = 20
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self._value = 1 if value is None else int(bool(value))
+        self._irq = None
+        old = pins.get(id)
+        if old is not None and value is None:
+            self._value = old._value
+        pins[id] = self
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._set(int(bool(v)))
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def _set(self, v):
+        old = self._value
+        self._value = v
+        for device in spi_devices:
+            device.pin_changed(self.id, old, v)
+        if self._irq is not None and old != v:
+            trigger, handler = self._irq
+            if (v and trigger & Pin.IRQ_RISING) or (not v and trigger & Pin.IRQ_FALLING):
+                handler(self)
+
+    def drive(self, v):
+        """由模拟的外设驱动输入引脚的电平，会触发中断"""
+        self._set(int(bool(v)))
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._irq = (trigger, handler) if handler else None
+
+class SPI:
+    def __init__(self, id=1, baudrate=1000000, polarity=0, phase=0, bits=8, firstbit=0, sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, baudrate=None, **kw):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        n = len(buf)
+        trace.spi_writes += 1
+        trace.spi_bytes += n
+        clock.advance_us(SPI_CALL_OVERHEAD_US + n * 8 * 1000000 // self.baudrate)
+        for device in spi_devices:
+            device.spi_write(buf)
+
+    def read(self, n, write=0):
+        return bytes([write]) * n
+
+    def readinto(self, buf, write=0):
+        for i in range(len(buf)):
+            buf[i] = write
+
+class RTC:
+    _offset = 0
+
+    def datetime(self, dt=None):
+        if dt is None:
+            t = _time.localtime(_time.time() + RTC._offset)
+            return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+        year, month, day, _, hour, minute, second = dt[:7]
+        target = _time.mktime((year, month, day, hour, minute, second, 0, 0, -1))
+        RTC._offset = target - _time.time()
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kw):
+        self._active = False
+        if kw:
+            self.init(**kw)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self._mode = mode
+        self._period_us = int(1000000 / freq) if freq > 0 else period * 1000
+        self._callback = callback
+        self._active = True
+        clock.schedule(self._period_us, self._fire)
+
+    def _fire(self):
+        if not self._active:
+            return
+        if self._mode == Timer.PERIODIC:
+            clock.schedule(self._period_us, self._fire)
+        else:
+            self._active = False
+        if self._callback:
+            self._callback(self)
+
+    def deinit(self):
+        self._active = False
+
+def idle():
+    # 等待下一个中断：直接推进到下一个模拟事件
+    clock.advance_to_next_event()
+
+def lightsleep(ms=None):
+    clock.sleep_ms(ms or 0)
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+def freq(hz=None):
+    return 240000000
+
+def unique_id():
+    return b"\x00\x11\x22\x33\x44\x55"
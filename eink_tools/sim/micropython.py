@@ -0,0 +1,19 @@
+"""
+micropython模块的替身。没有viper，使用viper加速的代码会走纯Python的回退路径。
+"""
+
+def const(value):
+    return value
+
+def native(func):
+    return func
+
+def schedule(func, arg):
+    # 模拟器里没有真正的中断上下文，直接调用
+    func(arg)
+
+def mem_info(verbose=False):
+    pass
+
+def alloc_emergency_exception_buf(size):
+    pass
@@ -0,0 +1,153 @@
+"""
+模拟的网络：按url查路由表生成响应，并按设定的往返时延、TLS握手时间和带宽推进虚拟时钟。
+usocket和urequests的替身都通过这里访问路由表。
+
+    sim.route("https://example.com/a.bin", data)          # bytes作为响应体
+    sim.route("https://example.com/api", {"ok": 1})       # dict按JSON返回
+    sim.route("https://example.com/", handler)            # 前缀匹配，handler(method, url, headers, body)
+handler返回响应体，或(状态码, 响应头dict, 响应体)。
+"""
+import json
+
+from .clock import clock
+from .trace import trace
+
+# 往返时延、TLS握手耗时(ms)和下行带宽(字节/秒)
+RTT_MS = 40
+TLS_MS = 300
+BANDWIDTH = 500 * 1024
+# 为False时服务端每个响应后关闭连接
+KEEP_ALIVE = True
+
+routes = {}
+
+REASONS = {200: "OK", 202: "Accepted", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+def route(url, response):
+    """注册url(以/结尾时为前缀)对应的响应"""
+    routes[url] = response
+
+def _transfer(nbytes):
+    clock.advance_us(nbytes * 1000000 // BANDWIDTH)
+
+def handle(method, url, headers, body):
+    """按路由表生成(状态码, 响应头, 响应体)"""
+    trace.http_requests += 1
+    clock.advance_us(RTT_MS * 1000)
+    target = routes.get(url)
+    if target is None:
+        prefixes = [u for u in routes if u.endswith("/") and url.startswith(u)]
+        if prefixes:
+            target = routes[max(prefixes, key=len)]
+    if target is None:
+        return 404, {}, b"not found"
+    if callable(target):
+        target = target(method, url, headers, body)
+    status, resp_headers = 200, {}
+    if isinstance(target, tuple):
+        status, resp_headers, target = target
+    if isinstance(target, (dict, list)):
+        resp_headers.setdefault("Content-Type", "application/json")
+        target = json.dumps(target).encode()
+    elif isinstance(target, str):
+        target = target.encode()
+    return status, resp_headers, bytes(target)
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    # 地址直接使用主机名，连接时据此拼出url
+    return [(2, 1, 0, "", (host, port))]
+
+class FakeSocket:
+    """客户端socket：写入的HTTP请求在完整收到后立即生成响应，供readline/readinto读取"""
+    def __init__(self, *args):
+        self.tls = False
+        self.host = None
+        self.port = None
+        self.closed = False
+        self._in = bytearray()
+        self._out = bytearray()
+        self._server_closed = False
+
+    def settimeout(self, t):
+        pass
+
+    def setblocking(self, flag):
+        pass
+
+    def connect(self, addr):
+        self.host, self.port = addr
+        trace.connects += 1
+        clock.advance_us(RTT_MS * 1000)
+
+    def start_tls(self):
+        self.tls = True
+        clock.advance_us(TLS_MS * 1000)
+
+    def write(self, data):
+        if self.closed or self._server_closed:
+            raise OSError(104, "ECONNRESET")
+        self._in.extend(data)
+        self._serve()
+        return len(data)
+
+    send = sendall = write
+
+    def _serve(self):
+        while True:
+            end = self._in.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            lines = bytes(self._in[:end]).decode().split("\r\n")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if len(self._in) < end + 4 + length:
+                return
+            body = bytes(self._in[end + 4:end + 4 + length])
+            del self._in[:end + 4 + length]
+            method, path = lines[0].split(" ")[:2]
+            scheme = "https" if self.tls else "http"
+            default = 443 if self.tls else 80
+            url = "%s://%s%s%s" % (scheme, self.host, "" if self.port == default else ":%d" % self.port, path)
+            status, resp_headers, data = handle(method, url, headers, body)
+            head = "HTTP/1.1 %d %s\r\n" % (status, REASONS.get(status, ""))
+            for name, value in resp_headers.items():
+                head += "%s: %s\r\n" % (name, value)
+            head += "Content-Length: %d\r\nConnection: %s\r\n\r\n" % (len(data), "keep-alive" if KEEP_ALIVE else "close")
+            self._out.extend(head.encode())
+            self._out.extend(data)
+            if not KEEP_ALIVE:
+                self._server_closed = True
+
+    def readline(self):
+        i = self._out.find(b"\n")
+        n = len(self._out) if i < 0 else i + 1
+        line = bytes(self._out[:n])
+        del self._out[:n]
+        _transfer(n)
+        return line
+
+    def readinto(self, buf, nbytes=None):
+        n = min(len(buf) if nbytes is None else nbytes, len(self._out))
+        buf[:n] = self._out[:n]
+        del self._out[:n]
+        _transfer(n)
+        return n
+
+    def read(self, size=-1):
+        n = len(self._out) if size < 0 else min(size, len(self._out))
+        data = bytes(self._out[:n])
+        del self._out[:n]
+        _transfer(n)
+        return data
+
+    recv = read
+
+    def close(self):
+        self.closed = True
+
+def wrap_socket(sock, server_hostname=None, **kw):
+    sock.start_tls()
+    return sock
@@ -0,0 +1,54 @@
+"""
+network模块的替身：WLAN总是能连上。
+"""
+STA_IF = 0
+AP_IF = 1
+AUTH_OPEN = 0
+AUTH_WPA_WPA2_PSK = 4
+
+class WLAN:
+    _ifaces = {}
+
+    def __new__(cls, interface=STA_IF):
+        # 与设备上一样，同一接口返回同一个对象
+        if interface not in cls._ifaces:
+            wlan = super().__new__(cls)
+            wlan.interface = interface
+            wlan._active = False
+            wlan._connected = False
+            wlan._config = {"essid": "sim-ap" if interface == AP_IF else "", "mac": b"\x00\x11\x22\x33\x44\x55"}
+            cls._ifaces[interface] = wlan
+        return cls._ifaces[interface]
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def connect(self, ssid=None, key=None, **kw):
+        self._config["essid"] = ssid
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected and self._active
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -55
+        return 1010 if self.isconnected() else 1000
+
+    def ifconfig(self, config=None):
+        if self.interface == AP_IF:
+            return ("192.168.4.1", "255.255.255.0", "192.168.4.1", "192.168.4.1")
+        return ("192.168.1.50", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+    def config(self, *args, **kw):
+        if args:
+            return self._config.get(args[0])
+        self._config.update(kw)
+
+    def scan(self):
+        return []
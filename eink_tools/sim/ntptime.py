@@ -0,0 +1,16 @@
+"""
+ntptime模块的替身：用电脑的时间设置模拟的RTC。
+"""
+import time
+
+from .machine import RTC
+
+host = "pool.ntp.org"
+timeout = 1
+
+def time_():
+    return int(time.time())
+
+def settime():
+    t = time.gmtime()
+    RTC().datetime((t[0], t[1], t[2], t[6] + 1, t[3], t[4], t[5], 0))
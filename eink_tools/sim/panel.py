@@ -0,0 +1,176 @@
+"""
+模拟的GDEW042T2墨水屏控制器：解析SPI命令流，维护显存，模拟BUSY时序，把每次刷新后的画面写成PNG。
+"""
+import os
+import struct
+import zlib
+
+from .clock import clock
+from .trace import trace
+from . import machine
+
+WIDTH = 400
+HEIGHT = 300
+
+CMD_POWER_OFF = 0x02
+CMD_POWER_ON = 0x04
+CMD_DEEP_SLEEP = 0x07
+CMD_DTM1 = 0x10
+CMD_DISPLAY_REFRESH = 0x12
+CMD_DTM2 = 0x13
+CMD_PARTIAL_WINDOW = 0x90
+CMD_PARTIAL_IN = 0x91
+CMD_PARTIAL_OUT = 0x92
+
+def write_png(path, data, width, height):
+    """把MONO_HLSB数据(1为白)写成1位灰度PNG，每行前加过滤类型0"""
+    stride = (width + 7) // 8
+    raw = b"".join(b"\x00" + bytes(data[y * stride:(y + 1) * stride]) for y in range(height))
+
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+class FakePanel:
+    """
+    :param out_dir: 每次刷新后把屏幕内容写到out_dir/frame_NNN.png，None时不写
+    :param full_refresh_ms: 全屏刷新的BUSY时长；partial_refresh_ms为局部刷新
+    """
+    def __init__(self, rst=37, dc=38, cs=39, busy=40, out_dir=None,
+                 power_on_ms=80, power_off_ms=40, full_refresh_ms=3800, partial_refresh_ms=450):
+        self.rst_id = rst
+        self.dc_id = dc
+        self.cs_id = cs
+        self.busy_id = busy
+        self.out_dir = out_dir
+        self.power_on_ms = power_on_ms
+        self.power_off_ms = power_off_ms
+        self.full_refresh_ms = full_refresh_ms
+        self.partial_refresh_ms = partial_refresh_ms
+        self.stride = WIDTH // 8
+        self.old = bytearray(b"\xff" * (self.stride * HEIGHT))   # DTM1显存
+        self.new = bytearray(b"\xff" * (self.stride * HEIGHT))   # DTM2显存
+        self.glass = bytearray(b"\xff" * (self.stride * HEIGHT)) # 屏幕上实际显示的内容
+        self.frames = 0
+        self._reset_state()
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        machine.spi_devices.append(self)
+        machine.Pin(busy, machine.Pin.IN, value=1)
+
+    def _reset_state(self):
+        self.cmd = None
+        self.args = bytearray()
+        self.powered = False
+        self.sleeping = False
+        self.partial = False
+        self.window = (0, 0, WIDTH - 1, HEIGHT - 1)
+        self.pos = 0
+        self.busy_until = 0
+
+    def detach(self):
+        machine.spi_devices.remove(self)
+
+    def _pin(self, pin_id):
+        pin = machine.pins.get(pin_id)
+        return pin.value() if pin else 1
+
+    def _set_busy(self, ms):
+        # BUSY低电平有效，ms毫秒后释放(上升沿)
+        busy = machine.pins[self.busy_id]
+        busy.drive(0)
+        self.busy_until = clock.now_us + ms * 1000
+        clock.schedule(ms * 1000, lambda: busy.drive(1))
+
+    def pin_changed(self, pin_id, old, new):
+        if pin_id == self.rst_id and old == 0 and new == 1:
+            # 复位：唤醒深度睡眠，控制器状态清零(显存保留)
+            self._reset_state()
+
+    def spi_write(self, buf):
+        if self._pin(self.cs_id):
+            return
+        if self._pin(self.dc_id) == 0:
+            for cmd in bytes(buf):
+                self._command(cmd)
+        else:
+            self._data(buf)
+
+    def _command(self, cmd):
+        self._finish_command()
+        trace.command(cmd)
+        if clock.now_us < self.busy_until and cmd != CMD_DEEP_SLEEP:
+            trace.warn("BUSY期间发送命令0x%02X" % cmd)
+        if self.sleeping:
+            trace.warn("深度睡眠中发送命令0x%02X，需要先复位" % cmd)
+        self.cmd = cmd
+        self.args = bytearray()
+        self.pos = 0
+        if cmd == CMD_POWER_ON:
+            self.powered = True
+            self._set_busy(self.power_on_ms)
+        elif cmd == CMD_POWER_OFF:
+            self.powered = False
+            self._set_busy(self.power_off_ms)
+        elif cmd == CMD_PARTIAL_IN:
+            self.partial = True
+        elif cmd == CMD_PARTIAL_OUT:
+            self.partial = False
+            self.window = (0, 0, WIDTH - 1, HEIGHT - 1)
+        elif cmd == CMD_DISPLAY_REFRESH:
+            self._refresh()
+
+    def _finish_command(self):
+        # 带参数的命令在下一个命令到来时生效
+        if self.cmd == CMD_PARTIAL_WINDOW and len(self.args) >= 8:
+            a = self.args
+            x0 = ((a[0] << 8) | a[1]) & ~7
+            x1 = ((a[2] << 8) | a[3]) | 7
+            y0 = (a[4] << 8) | a[5]
+            y1 = (a[6] << 8) | a[7]
+            self.window = (x0, y0, min(x1, WIDTH - 1), min(y1, HEIGHT - 1))
+        elif self.cmd == CMD_DEEP_SLEEP and self.args[:1] == b"\xa5":
+            self.sleeping = True
+
+    def _data(self, buf):
+        trace.data(len(buf))
+        if self.cmd in (CMD_DTM1, CMD_DTM2):
+            self._write_ram(self.old if self.cmd == CMD_DTM1 else self.new, buf)
+        else:
+            self.args.extend(buf)
+
+    def _write_ram(self, ram, buf):
+        # 按当前窗口逐行写入显存，局部模式下窗口外的显存不变
+        x0, y0, x1, y1 = self.window if self.partial else (0, 0, WIDTH - 1, HEIGHT - 1)
+        row_bytes = (x1 - x0 + 1) // 8
+        total = row_bytes * (y1 - y0 + 1)
+        mv = memoryview(buf)
+        i = 0
+        while i < len(mv) and self.pos < total:
+            row, col = divmod(self.pos, row_bytes)
+            n = min(row_bytes - col, len(mv) - i)
+            start = (y0 + row) * self.stride + x0 // 8 + col
+            ram[start:start + n] = mv[i:i + n]
+            i += n
+            self.pos += n
+        if i < len(mv):
+            trace.warn("显存写入超出窗口%d字节" % (len(mv) - i))
+
+    def _refresh(self):
+        if not self.powered:
+            trace.warn("未上电就刷新")
+        ms = self.partial_refresh_ms if self.partial else self.full_refresh_ms
+        window = self.window if self.partial else None
+        self._set_busy(ms)
+        self.glass[:] = self.new
+        self.frames += 1
+        info = {"frame": self.frames, "at_ms": clock.ticks_ms(), "mode": "partial" if window else "full", "window": window, "busy_ms": ms}
+        if self.out_dir:
+            info["png"] = os.path.join(self.out_dir, "frame_%03d.png" % self.frames)
+            write_png(info["png"], self.glass, WIDTH, HEIGHT)
+        trace.refreshes.append(info)
@@ -0,0 +1,90 @@
+"""
+模拟运行的记录：SPI写入次数和字节数、每个命令的次数、每次刷新的信息，
+以及用span()标记的代码段的Python执行时间和虚拟(墨水屏)时间。
+"""
+import time
+from collections import Counter
+
+from .clock import clock
+
+COMMAND_NAMES = {
+    0x00: "PANEL_SETTING", 0x01: "POWER_SETTING", 0x02: "POWER_OFF", 0x04: "POWER_ON",
+    0x06: "BOOSTER_SOFT_START", 0x07: "DEEP_SLEEP", 0x10: "DTM1", 0x12: "DISPLAY_REFRESH",
+    0x13: "DTM2", 0x20: "LUT_VCOM", 0x21: "LUT_WW", 0x22: "LUT_BW", 0x23: "LUT_WB",
+    0x24: "LUT_BB", 0x30: "PLL_CONTROL", 0x50: "VCOM_DATA_INTERVAL", 0x61: "RESOLUTION",
+    0x82: "VCM_DC", 0x90: "PARTIAL_WINDOW", 0x91: "PARTIAL_IN", 0x92: "PARTIAL_OUT",
+}
+
+class Trace:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.spi_writes = 0
+        self.spi_bytes = 0
+        self.commands = Counter()
+        self.command_log = []  # (虚拟时间ms, 命令, 数据字节数)
+        self.refreshes = []    # 每次刷新的信息
+        self.warnings = []     # 时序错误，如BUSY期间发送命令
+        self.http_requests = 0
+        self.connects = 0
+        self.spans = []
+
+    def command(self, cmd):
+        self.commands[COMMAND_NAMES.get(cmd, "0x%02X" % cmd)] += 1
+        self.command_log.append([clock.ticks_ms(), cmd, 0])
+
+    def data(self, n):
+        if self.command_log:
+            self.command_log[-1][2] += n
+
+    def warn(self, message):
+        self.warnings.append((clock.ticks_ms(), message))
+
+    def snapshot(self):
+        return {
+            "spi_writes": self.spi_writes,
+            "spi_bytes": self.spi_bytes,
+            "commands": sum(self.commands.values()),
+            "refreshes": len(self.refreshes),
+            "http_requests": self.http_requests,
+            "connects": self.connects,
+        }
+
+    def span(self, name):
+        """
+        记录一段代码的开销：
+            with sim.trace.span("show"):
+                ink.show()
+        """
+        return _Span(self, name)
+
+    def summary(self):
+        lines = []
+        for span in self.spans:
+            lines.append("{name:<24} python {python_ms:8.2f}ms  panel {sim_ms:7d}ms  spi {spi_writes:5d}次/{spi_bytes:6d}字节  命令{commands:4d}  刷新{refreshes}  http{http_requests}/连接{connects}".format(**span))
+        for t, message in self.warnings:
+            lines.append(f"警告 @{t}ms: {message}")
+        return "\n".join(lines)
+
+class _Span:
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.before = self.trace.snapshot()
+        self.sim0 = clock.ticks_ms()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        python_ms = (time.perf_counter() - self.t0) * 1000
+        after = self.trace.snapshot()
+        record = {key: after[key] - self.before[key] for key in after}
+        record.update(name=self.name, python_ms=python_ms, sim_ms=clock.ticks_ms() - self.sim0)
+        self.trace.spans.append(record)
+        self.result = record
+        return False
+
+trace = Trace()
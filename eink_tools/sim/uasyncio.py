@@ -0,0 +1,75 @@
+"""
+uasyncio模块的替身，基于asyncio，但事件循环使用虚拟时钟：
+没有就绪任务时直接把虚拟时间推进到下一个定时器或模拟事件(如BUSY释放)，不真正等待，
+多个协程的sleep在虚拟时间上是重叠的，与设备上一致。
+"""
+import asyncio
+import math
+import selectors
+from asyncio import *  # noqa: F401,F403
+
+from .clock import clock
+
+class _VirtualSelector:
+    def __init__(self):
+        self._real = selectors.DefaultSelector()
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+    def select(self, timeout=None):
+        events = self._real.select(0)
+        if events:
+            return events
+        if timeout is None:
+            if clock.next_event_us() is None:
+                # 只在等待真实的socket
+                return self._real.select(None)
+            clock.advance_to_next_event()
+        elif timeout > 0:
+            clock.advance_to_next_event(max_us=math.ceil(timeout * 1000000))
+        return []
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+
+    def time(self):
+        return clock.now_us / 1000000
+
+def new_event_loop():
+    loop = VirtualEventLoop()
+    asyncio.set_event_loop(loop)
+    return loop
+
+def run(main):
+    with asyncio.Runner(loop_factory=VirtualEventLoop) as runner:
+        return runner.run(main)
+
+def sleep_ms(ms):
+    return asyncio.sleep(ms / 1000)
+
+def wait_for_ms(aw, timeout):
+    return asyncio.wait_for(aw, timeout / 1000)
+
+class ThreadSafeFlag:
+    """可以在中断回调中set()的标志，wait()返回时自动清除"""
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
+
+async def _readinto(self, buf):
+    data = await self.read(len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+asyncio.StreamReader.readinto = _readinto
@@ -0,0 +1,59 @@
+"""
+urequests模块的替身：与设备上一样，每个请求新建连接(DNS、TCP、TLS)，用完即关闭。
+"""
+import io
+import json as _json
+
+from . import net
+from .clock import clock
+from .trace import trace
+
+class Response:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.reason = net.REASONS.get(status_code, "").encode()
+        self.headers = headers
+        self.raw = io.BytesIO(content)
+        self._content = content
+
+    @property
+    def content(self):
+        return self._content
+
+    @property
+    def text(self):
+        return self._content.decode("utf-8")
+
+    def json(self):
+        return _json.loads(self._content)
+
+    def close(self):
+        self.raw = None
+
+def request(method, url, data=None, json=None, headers=None, stream=None, timeout=None):
+    if json is not None:
+        data = _json.dumps(json)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    trace.connects += 1
+    clock.advance_us(net.RTT_MS * 1000)
+    if url.startswith("https:"):
+        clock.advance_us(net.TLS_MS * 1000)
+    status, resp_headers, content = net.handle(method, url, {k.lower(): v for k, v in (headers or {}).items()}, data or b"")
+    net._transfer(len(content))
+    return Response(status, resp_headers, content)
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+def post(url, **kw):
+    return request("POST", url, **kw)
+
+def put(url, **kw):
+    return request("PUT", url, **kw)
+
+def delete(url, **kw):
+    return request("DELETE", url, **kw)
+
+def head(url, **kw):
+    return request("HEAD", url, **kw)
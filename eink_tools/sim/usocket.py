@@ -0,0 +1,9 @@
+"""
+usocket模块的替身，连接由net模块模拟。
+"""
+from .net import FakeSocket as socket, getaddrinfo  # noqa: F401
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
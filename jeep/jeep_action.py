@@ -1,9 +1,23 @@
-import utime # type: ignore
 
 # 导入业务包
 from jeep_motor import JeepMotor  # 提前导入避免循环引用问题
 from jeep_servo import Servo  # 提前导入避免循环引用问题
-from jeep_led import JeepLed  # 提前导入避免循环引用问题
+from jeep_led import JeepLed, Blink, Sequence  # 提前导入避免循环引用问题
+import jeep_packet
+from jeep_control import ControlState, ControlLoop, CONTROL_HZ
+
+# 摇杆死区，偏移量不超过该值视为居中
+STICK_DEADZONE = 24
+# 舵机中立角度，以及摇杆推到底时相对中立位置的转角
+STEER_CENTER = 100
+STEER_RANGE = 50
+# 马达占空比每秒最多变化的量，换向和急加速时逐步变化，避免电流冲击导致主控掉电重启
+MOTOR_SLEW = 3000
+# 舵机每秒最多转动的角度，0为立即转到位
+STEER_SLEW = 0
+# 文本指令中摇杆方向对应的摇杆值
+STICK_TEXT_Y = {"top": 127, "bottom": -127}
+STICK_TEXT_X = {"left": -127, "right": 127}
 
 class JeepAction:
     """
@@ -14,17 +28,25 @@ class JeepAction:
         初始化吉普车动作控制
         """
         # 吉普车控制器实例化
-        self.jeepmotor = JeepMotor(14,12,13)
+        self.jeepmotor = JeepMotor(14,12,13,slew=MOTOR_SLEW,update_hz=CONTROL_HZ)
         self.speed = 900  # 初始速度设为900，范围400-1200
-        self.jeepsteering = Servo(15)  # 假设舵机连接在GPIO15
+        self.jeepsteering = Servo(15,slew=STEER_SLEW,update_hz=CONTROL_HZ)  # 假设舵机连接在GPIO15
         self.jeepled = JeepLed(2,2)  # 假设LED连接在GPIO2，2个LED灯
+        # 收到的指令只写入目标值，由固定频率的控制循环驱动电机和舵机
+        self.state = ControlState(STEER_CENTER)
+        self.control = ControlLoop(self.state, self.jeepmotor, self.jeepsteering, hz=CONTROL_HZ)
+        self.control.start()
+        self.hazard = Blink(self.jeepled.RED, on_ms=300, off_ms=300, off_color=self.jeepled.BLACK)
+        self.light_show = Sequence([self.jeepled.RED, self.jeepled.GREEN, self.jeepled.BLUE], step_ms=200, repeat=3)
+        # 二进制控制包的解码器，以及上一包的按钮状态
+        self.packet = jeep_packet.ControlPacket()
+        self.buttons = 0
 
     def _message2action(self, message: str):
         """
-        将接收到的消息转换为具体动作
+        将接收到的文本消息转换为具体动作，二进制控制包见packet2action
         :param message: 接收到的消息，如stop|stop|-2|-2|-2|-2|'
         """
-        print(f"收到指令: {message}")
         channle_list = message.split("|")
         channle_1 = channle_list[0] # 第一频道是左摇杆的方向，top是向上，bottom是向下，stop是停止，还有left和right
         channle_2 = channle_list[1] # 第二频道是右摇杆的方向，top是向上，bottom是向下，stop是停止，还有left和right
@@ -33,63 +55,103 @@ class JeepAction:
         channle_5 = channle_list[4] # 第五频道是蓝色按钮，-2是无变化状态，-1是按下动作，其他数字键释放之后会返回前次按下的时长。
         channle_6 = channle_list[5] # 第六频道是红色按钮，-2是无变化状态，-1是按下动作，其他数字键释放之后会返回前次按下的时长。
 
-        if int(channle_6) == -1:
+        # 换算为与二进制控制包相同的摇杆值和按下的按钮；stop为居中，其他没有用到的方向(None)保持当前状态不变
+        ly = 0 if channle_1 == "stop" else STICK_TEXT_Y.get(channle_1)
+        rx = 0 if channle_2 == "stop" else STICK_TEXT_X.get(channle_2)
+        pressed = 0
+        if channle_3 == "-1":
+            pressed |= jeep_packet.BTN_LEFT_STICK
+        if channle_4 == "-1":
+            pressed |= jeep_packet.BTN_RIGHT_STICK
+        if channle_5 == "-1":
+            pressed |= jeep_packet.BTN_BLUE
+        if channle_6 == "-1":
+            pressed |= jeep_packet.BTN_RED
+        self._apply(ly, rx, pressed, message == "stop|stop|-2|-2|-2|-2|")
+
+    def packet2action(self, data):
+        """
+        将二进制控制包转换为具体动作，乱序、重复或格式错误的包被丢弃并返回False
+        :param data: 收到的控制包，见jeep_packet
+        """
+        packet = self.packet
+        if not packet.decode(data):
+            return False
+        # 按钮位是按住状态，与上一包相比新按住的才是按下动作
+        pressed = packet.buttons & ~self.buttons
+        self.buttons = packet.buttons
+        idle = -STICK_DEADZONE <= packet.ly <= STICK_DEADZONE and -STICK_DEADZONE <= packet.rx <= STICK_DEADZONE and not packet.buttons
+        self._apply(packet.ly, packet.rx, pressed, idle)
+        return True
+
+    def failsafe(self):
+        """
+        遥控信号丢失时调用：停车、舵机回中，双闪提示；收到下一条指令后恢复
+        """
+        self.state.set(0, self.speed, STEER_CENTER)
+        self.buttons = 0
+        self.jeepled.play("failsafe", self.hazard)
+
+    def _apply(self, ly, rx, pressed, idle):
+        """
+        执行动作
+        :param ly: 左摇杆y(-127~127，向上为正)，控制前进后退；None时保持当前的行驶状态
+        :param rx: 右摇杆x(-127~127，向右为正)，控制转向，舵机角度与摇杆偏移量成正比；None时保持当前的转向
+        :param pressed: 本次按下的按钮位
+        :param idle: 没有任何动作，熄灭LED灯
+        """
+        self.jeepled.stop("failsafe")
+        if pressed & jeep_packet.BTN_RED:
             # 加档，当红色按钮被按下时，速度增加100，最大值为1200，最小值为400。
             self.speed = self.speed + 100
             if self.speed >= 1200:
                 self.speed = 1200
 
-        if int(channle_5) == -1:
+        if pressed & jeep_packet.BTN_BLUE:
             # 减档，当蓝色按钮被按下时，速度减少100，最大值为1200，最小值为400。
             self.speed = self.speed - 100
             if self.speed <= 400:
                 self.speed = 400
 
-        # 根据摇杆状态执行对应的动作
-        if channle_1 == "top":
+        # 根据摇杆状态计算目标值，由控制循环执行
+        speed = self.speed
+        if ly is None:
+            direction = self.state.direction
+            speed = self.state.speed
+        elif ly > STICK_DEADZONE:
             # 向前
-            self.jeepmotor.forward(self.speed)
+            direction = 1
             self.jeepled.set_all(self.jeepled.GREEN)
-        elif channle_1 == "bottom":
+        elif ly < -STICK_DEADZONE:
             # 向后
-            self.jeepmotor.backward(self.speed)
+            direction = 2
             self.jeepled.set_all(self.jeepled.RED)
-        elif channle_1 == "stop":
-            # 左转
-            self.jeepmotor.stop(self.speed)
         else:
-            # 没有用到channle_1的其他状态，即左、右。
-            pass
+            # 停止
+            direction = 0
 
-        if channle_2 == "left":
-            # 向左转，舵机转到150度位置，点亮左侧LED
-            self.jeepsteering.write_angle(150)
+        if rx is None:
+            steering = self.state.steering
+        elif rx < -STICK_DEADZONE:
+            # 向左转，摇杆推到底时舵机转到150度位置，点亮左侧LED
+            steering = STEER_CENTER - rx * STEER_RANGE // 127
             self.jeepled.single_led(1,self.jeepled.WHITE)
-        elif channle_2 == "right":
-            # 向右转，舵机转到50度位置，点亮右侧LED
-            self.jeepsteering.write_angle(50)
+        elif rx > STICK_DEADZONE:
+            # 向右转，摇杆推到底时舵机转到50度位置，点亮右侧LED
+            steering = STEER_CENTER - rx * STEER_RANGE // 127
             self.jeepled.single_led(0,self.jeepled.WHITE)
-        elif channle_2 == "stop":
-            # 中立位置，舵机转到100度位置。
-            self.jeepsteering.write_angle(100)
         else:
-            pass
+            # 中立位置，舵机转到100度位置。
+            steering = STEER_CENTER
+        self.state.set(direction, speed, steering)
 
-        if channle_4 == "-1":
-            # 按下右摇杆按钮，用两个LED表演一段灯光秀
-            for i in range(3):
-                self.jeepled.set_all(self.jeepled.RED)
-                utime.sleep_ms(200)
-                self.jeepled.set_all(self.jeepled.GREEN)
-                utime.sleep_ms(200)
-                self.jeepled.set_all(self.jeepled.BLUE)
-                utime.sleep_ms(200)
+        if pressed & jeep_packet.BTN_RIGHT_STICK:
+            # 按下右摇杆按钮，用两个LED表演一段灯光秀；灯效由定时器推进，不阻塞指令处理，再次按下从头开始
+            self.jeepled.play("show", self.light_show)
 
-        if message == "stop|stop|-2|-2|-2|-2|":
+        if idle:
             # 没有任何动作时，停止所有LED灯
             self.jeepled.clear_all()
-        else:
-            pass
 
 if __name__ == "__main__":
     jeepaction = JeepAction()
@@ -0,0 +1,126 @@
+import machine # type: ignore
+import micropython # type: ignore
+from time import ticks_us, ticks_diff # type: ignore
+
+# 控制循环的默认频率
+CONTROL_HZ = 100
+
+class ControlState:
+    """
+    目标值(设定点)。遥控通道(ESP-NOW、WebSocket)只写入这里，由ControlLoop按固定频率执行，
+    网络收包的快慢和突发不会影响电机、舵机的更新时机。
+    """
+    def __init__(self, steering=100):
+        """
+        :param steering: 舵机的初始角度(中立位置)
+        """
+        self.direction = 0  # 0是停，1是正转，2是反转
+        self.speed = 0
+        self.steering = steering
+        self.version = 0    # 每次写入加1，控制循环据此判断目标值是否变化
+
+    def set(self, direction, speed, steering):
+        """写入目标值，可以在任何上下文中调用，不会直接操作硬件；与当前目标值相同时什么也不做"""
+        if direction == self.direction and speed == self.speed and steering == self.steering:
+            return
+        # 控制循环可能在两次赋值之间执行，但version最后才变，下一次执行时总会用上完整的新目标值
+        self.direction = direction
+        self.speed = speed
+        self.steering = steering
+        self.version += 1
+
+class ControlLoop:
+    """
+    定时器驱动的控制循环，按固定频率把ControlState中的目标值应用到JeepMotor和Servo，
+    并推进它们的渐变(slew)，输出没有变化时不写PWM。同时统计每次执行的时间偏差(抖动)和超时(上一次还没执行完定时器又到了)。
+    """
+    def __init__(self, state, motor, servo, hz=CONTROL_HZ, timer_id=-1):
+        """
+        :param state: ControlState实例
+        :param motor: JeepMotor实例
+        :param servo: Servo实例
+        :param hz: 控制频率
+        :param timer_id: 硬件定时器编号，esp8266使用-1(虚拟定时器)
+        """
+        self.state = state
+        self.motor = motor
+        self.servo = servo
+        self.hz = hz
+        self.period_us = 1000000 // hz
+        self.timer_id = timer_id
+        self.timer = None
+        self._applied = -1   # 已应用的目标值版本
+        self._pending = False
+        self._last_us = None
+        self._step_ref = self.step  # 预先绑定，避免在中断中创建绑定方法对象
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空统计，report()之后自动调用"""
+        self.ticks = 0          # 执行次数
+        self.overruns = 0       # 定时器到期时上一次还没执行，被跳过的次数
+        self.max_jitter_us = 0  # 执行间隔与周期的最大偏差
+        self.sum_jitter_us = 0
+        self.max_exec_us = 0    # 单次执行的最长耗时
+
+    def start(self):
+        if self.timer is None:
+            self.timer = machine.Timer(self.timer_id)
+        self._last_us = None
+        self.timer.init(period=max(1, 1000 // self.hz), mode=machine.Timer.PERIODIC, callback=self._timer_irq)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.deinit()
+
+    def _timer_irq(self, timer):
+        # 定时器中断里只排队，PWM在调度器中(中断之外)写入
+        if self._pending:
+            self.overruns += 1
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._step_ref, 0)
+        except RuntimeError:
+            self._pending = False
+            self.overruns += 1
+
+    def step(self, _=None):
+        """执行一次控制：目标值有变化时写入电机和舵机"""
+        t0 = ticks_us()
+        self._pending = False
+        if self._last_us is not None:
+            jitter = abs(ticks_diff(t0, self._last_us) - self.period_us)
+            self.sum_jitter_us += jitter
+            if jitter > self.max_jitter_us:
+                self.max_jitter_us = jitter
+        self._last_us = t0
+        state = self.state
+        version = state.version
+        if version != self._applied:
+            self._applied = version
+            self.motor.motor(state.direction, state.speed)
+            self.servo.write_angle(state.steering)
+        # 推进加减速和转向的渐变，已到达目标时什么也不做
+        self.motor.update()
+        self.servo.update()
+        self.ticks += 1
+        elapsed = ticks_diff(ticks_us(), t0)
+        if elapsed > self.max_exec_us:
+            self.max_exec_us = elapsed
+
+    def report(self):
+        """返回自上次report()以来的统计并清空"""
+        stats = {
+            "hz": self.hz,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "max_jitter_us": self.max_jitter_us,
+            "avg_jitter_us": self.sum_jitter_us // max(1, self.ticks),
+            "max_exec_us": self.max_exec_us,
+        }
+        self.reset_stats()
+        return stats
+
+    def format_report(self):
+        return "控制循环: {ticks}次/{hz}Hz, 超时{overruns}, 抖动平均{avg_jitter_us}us/最大{max_jitter_us}us, 执行最长{max_exec_us}us".format(**self.report())
@@ -4,15 +4,24 @@ import utime # type: ignore
 
 # 导入业务包
 from jeep_action import JeepAction  # 提前导入避免循环引用问题
+import jeep_packet
+
+# 遥控信号丢失的判定时长，超过后停车
+FAILSAFE_MS = 500
+# 每次等待新包的最长时间，同时决定失联检测和统计的响应速度
+RECV_TIMEOUT_MS = 50
+# ESP-NOW单个包的最大长度
+ESPNOW_MAX_DATA = 250
 
 class EspNowReceiver:
     """
     ESP-NOW接收器类，用于接收控制指令信息。
     """
-    def __init__(self, sender_mac: bytes,channel_number:int = 1):
+    def __init__(self, sender_mac: bytes,channel_number:int = 1, failsafe_ms: int = FAILSAFE_MS):
         """
         初始化ESP-NOW接收器
         :param sender_mac: 发送端的MAC地址（6字节bytes）
+        :param failsafe_ms: 超过该时长没有收到遥控信号时停车、舵机回中
         """
         # 网络初始化
         self.channel_number = channel_number
@@ -35,6 +44,17 @@ class EspNowReceiver:
         # 吉普车控制器实例化
         self.jeep_action = JeepAction()
 
+        # 超过该时长没有收到任何包时停车
+        self.failsafe_ms = failsafe_ms
+        self.failsafe_active = False
+        self._latest = {}  # 本批中每个发送端的最新包：MAC -> [缓冲区, 长度, 被合并的包中按下的按钮]
+        self._bufs = {}    # 每个发送端预分配的接收缓冲区
+        # 当前一秒内的统计，上一秒的结果保存在last_stats中
+        self.received = 0
+        self.applied = 0
+        self.coalesced = 0
+        self.last_stats = {}
+
     def _init_wifi(self):
         """初始化WiFi网络配置"""
         # 先配置AP模式固定信道
@@ -47,14 +67,100 @@ class EspNowReceiver:
         sta.active(True)
         sta.disconnect()
 
+    def _rx_dropped(self):
+        # ESP-NOW驱动统计的接收缓冲区溢出丢包数，不支持时为0
+        try:
+            return self.espnow.stats()[4]
+        except (AttributeError, IndexError):
+            return 0
+
+    def _drain(self, host, msg):
+        """
+        收取队列中已到达的所有包，每个发送端只保留最新的一包，返回本批收到的包数。
+        irecv返回的缓冲区会被下一次接收覆盖，所以最新包拷贝到每个发送端预分配的缓冲区中。
+        """
+        count = 0
+        latest = self._latest
+        while msg:
+            count += 1
+            entry = latest.get(host)
+            if entry is None:
+                buf = self._bufs.get(host)
+                if buf is None:
+                    buf = self._bufs[host] = bytearray(ESPNOW_MAX_DATA)
+                entry = latest[host] = [buf, 0, 0]
+            else:
+                self.coalesced += 1
+                # 被合并掉的控制包里按下的按钮并入最新包，按下动作不会因为合并而丢失
+                if entry[1] == jeep_packet.PACKET_SIZE and entry[0][0] == jeep_packet.PACKET_VERSION:
+                    entry[2] |= entry[0][jeep_packet.PACKET_SIZE - 1]
+            n = len(msg)
+            entry[0][:n] = msg
+            entry[1] = n
+            if not self.espnow.any():
+                break
+            host, msg = self.espnow.irecv(0)
+        return count
+
+    def _apply(self, buf, n, buttons):
+        msg = memoryview(buf)[:n]
+        if jeep_packet.is_packet(msg):
+            # 二进制控制包
+            buf[n - 1] |= buttons
+            self.jeep_action.packet2action(msg)
+        else:
+            # 兼容旧遥控的文本指令
+            self.jeep_action._message2action(bytes(msg).decode().strip())
+
+    def _report(self, now):
+        """每秒统计一次收包速率、丢包和合并的包数"""
+        dropped = self._rx_dropped()
+        packet = self.jeep_action.packet
+        self.last_stats = {
+            "rate": self.received,
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "dropped": dropped - self._dropped_base,
+            "invalid": packet.invalid - self._invalid_base,
+            "stale": packet.stale - self._stale_base,
+        }
+        if self.received or self.last_stats["dropped"]:
+            print("ESP-NOW: {rate}包/秒, 执行{applied}, 合并{coalesced}, 丢弃{dropped}, 格式错误{invalid}, 过期{stale}".format(**self.last_stats))
+            print(self.jeep_action.control.format_report())
+        self.received = self.applied = self.coalesced = 0
+        self._dropped_base = dropped
+        self._invalid_base = packet.invalid
+        self._stale_base = packet.stale
+        self._stats_ms = now
+
     def start_receiving(self):
-        """开始接收并处理ESP-NOW消息"""
+        """
+        开始接收并处理ESP-NOW消息。
+        每次把队列中积压的包一次收完，每个发送端只执行最新的一包，不会在卡顿后回放过期指令；
+        超过failsafe_ms没有收到任何包时停车、舵机回中。
+        """
         print("ESP-NOW接收器已启动，等待指令...")
+        self._stats_ms = self._last_rx = utime.ticks_ms()
+        self._dropped_base = self._rx_dropped()
+        self._invalid_base = self._stale_base = 0
         while True:
             try:
-                _, msg = self.espnow.recv()
+                host, msg = self.espnow.irecv(RECV_TIMEOUT_MS)
+                now = utime.ticks_ms()
                 if msg:
-                    self.jeep_action._message2action(msg.decode().strip())
+                    self.received += self._drain(host, msg)
+                    for buf, n, buttons in self._latest.values():
+                        self._apply(buf, n, buttons)
+                        self.applied += 1
+                    self._latest.clear()
+                    self._last_rx = now
+                    self.failsafe_active = False
+                elif not self.failsafe_active and utime.ticks_diff(now, self._last_rx) > self.failsafe_ms:
+                    print(f"{self.failsafe_ms}ms没有收到遥控信号，停车")
+                    self.jeep_action.failsafe()
+                    self.failsafe_active = True
+                if utime.ticks_diff(now, self._stats_ms) >= 1000:
+                    self._report(now)
             except OSError as e:
                 print(f"接收错误: {e}")
                 utime.sleep_ms(100)
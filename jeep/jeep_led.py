@@ -1,10 +1,95 @@
 import machine # type: ignore
+import micropython # type: ignore
 import neopixel # type: ignore
 import time
 
+class Effect:
+    """
+    灯效基类。灯效按时间计算颜色，不阻塞，由JeepLed的定时器推进。
+    Args:
+        leds: 作用的LED索引，None为全部
+        duration_ms: 持续时长，0为一直持续，直到被停止或替换
+    """
+    def __init__(self, leds=None, duration_ms=0):
+        self.leds = leds
+        self.duration_ms = duration_ms
+        self.start = 0
+
+    def color(self, elapsed):
+        """返回elapsed毫秒时的颜色，None表示这一刻不覆盖下层颜色"""
+        return None
+
+    def render(self, now, frame):
+        """把当前颜色写入frame，灯效结束时返回False"""
+        elapsed = time.ticks_diff(now, self.start)
+        if self.duration_ms and elapsed >= self.duration_ms:
+            return False
+        color = self.color(elapsed)
+        if color is None:
+            return True
+        if self.leds is None:
+            for i in range(len(frame)):
+                frame[i] = color
+        else:
+            for i in self.leds:
+                if 0 <= i < len(frame):
+                    frame[i] = color
+        return True
+
+class Solid(Effect):
+    """常亮，如刹车灯"""
+    def __init__(self, color, leds=None, duration_ms=0):
+        super().__init__(leds, duration_ms)
+        self._color = color
+
+    def color(self, elapsed):
+        return self._color
+
+class Blink(Effect):
+    """
+    闪烁，如转向灯
+    Args:
+        count: 闪烁次数，0为一直闪烁
+        off_color: 熄灭时的颜色，None时露出下层颜色
+    """
+    def __init__(self, color, on_ms=400, off_ms=400, count=0, leds=None, off_color=None):
+        super().__init__(leds, (on_ms + off_ms) * count)
+        self._color = color
+        self.on_ms = on_ms
+        self.period = on_ms + off_ms
+        self.off_color = off_color
+
+    def color(self, elapsed):
+        return self._color if elapsed % self.period < self.on_ms else self.off_color
+
+class Sequence(Effect):
+    """
+    按固定间隔依次切换颜色，如灯光秀
+    Args:
+        colors: 颜色列表
+        step_ms: 每个颜色的持续时长
+        repeat: 重复次数，0为一直重复
+    """
+    def __init__(self, colors, step_ms=200, repeat=1, leds=None):
+        super().__init__(leds, step_ms * len(colors) * repeat)
+        self.colors = colors
+        self.step_ms = step_ms
+
+    def color(self, elapsed):
+        return self.colors[elapsed // self.step_ms % len(self.colors)]
+
 class JeepLed:
-    """控制LED灯的类"""
-    def __init__(self, pin=0, num_leds=2):
+    """
+    控制LED灯的类。
+    set_all/single_led设置底层的常亮颜色；play()在底层之上叠加灯效，后播放的覆盖先播放的，
+    同名灯效会被替换，可以随时stop()打断。灯效由定时器推进，只有颜色变化时才写入LED。
+    """
+    def __init__(self, pin=0, num_leds=2, tick_ms=20, timer_id=-1):
+        """
+        Args:
+            tick_ms: 灯效的刷新间隔
+            timer_id: 推进灯效的硬件定时器编号，esp8266使用-1(虚拟定时器)；为None时不启动定时器，由调用方周期性调用tick()
+        """
         self.pin = pin
         self.num_leds = num_leds
         self.np = neopixel.NeoPixel(machine.Pin(self.pin), self.num_leds)
@@ -15,22 +100,94 @@ class JeepLed:
         self.BLUE = (0, 0, 255)
         self.WHITE = (255, 255, 255)
         self.BLACK = (0, 0, 0)  # 熄灭
-        
-        # 初始化时点亮所有LED为白色，然后熄灭
-        self.set_all(self.WHITE)
-        time.sleep(1)
-        self.clear_all()
+
+        self.base = [self.BLACK] * num_leds   # 底层的常亮颜色
+        self._frame = [self.BLACK] * num_leds # 叠加灯效后的颜色，预分配避免定时器中反复申请内存
+        self._shown = [None] * num_leds       # 已写入LED的颜色，None表示未知，下次一定写入
+        self.effects = {}                     # 名称 -> 灯效，按播放顺序叠加
+        self.writes = 0                       # np.write()次数
+        self._pending = False
+        self._busy = False   # 主程序正在修改或刷新，调度器中的tick()此时直接返回
+        self._tick_ref = self.tick  # 预先绑定，避免在中断中创建绑定方法对象
+        self.timer = None
+        if timer_id is not None:
+            self.timer = machine.Timer(timer_id)
+            self.timer.init(period=tick_ms, mode=machine.Timer.PERIODIC, callback=self._timer_irq)
+
+        # 初始化时点亮所有LED为白色，1秒后熄灭
+        self.play("boot", Solid(self.WHITE, duration_ms=1000))
+
+    def _timer_irq(self, timer):
+        # 定时器中断里不能操作LED，交给调度器在中断外执行；上一次还没执行时不重复排队
+        if self.effects and not self._pending:
+            self._pending = True
+            try:
+                micropython.schedule(self._tick_ref, 0)
+            except RuntimeError:
+                self._pending = False  # 调度队列已满，下个周期再试
+
+    def tick(self, _=None):
+        """推进灯效，没有灯效时什么也不做；主程序正在修改灯效或刷新时跳过，下个周期再推进"""
+        self._pending = False
+        if self.effects and not self._busy:
+            self._render()
+
+    def _render(self):
+        # tick()由调度器执行，可能插在主程序的任意两条字节码之间，
+        # 叠加和写入期间置位_busy，避免tick()删除正在遍历的灯效或写出叠加了一半的颜色
+        self._busy = True
+        try:
+            frame = self._frame
+            effects = self.effects
+            now = time.ticks_ms()
+            while True:
+                frame[:] = self.base
+                for name in list(effects):
+                    if not effects[name].render(now, frame):
+                        del effects[name]
+                        break  # 灯效结束的这一帧还要露出下层颜色，重新叠加一次
+                else:
+                    break
+            if frame != self._shown:
+                for i in range(self.num_leds):
+                    self.np[i] = frame[i]
+                self.np.write()
+                self._shown[:] = frame
+                self.writes += 1
+        finally:
+            self._busy = False
+
+    def play(self, name, effect):
+        """
+        播放灯效，立即生效
+        Args:
+            name: 名称，同名的灯效会被替换，如"show"、"left"、"brake"
+            effect: Effect的实例
+        """
+        self.effects.pop(name, None)
+        effect.start = time.ticks_ms()
+        self.effects[name] = effect
+        self._render()
+
+    def stop(self, name=None):
+        """停止指定名称的灯效，name为None时停止全部"""
+        if name is None:
+            self.effects.clear()
+        elif self.effects.pop(name, None) is None:
+            return
+        self._render()
 
     def set_all(self, color):
         """设置所有LED为同一颜色"""
+        self._busy = True  # 底层颜色写完并刷新之前不让tick()插入，由_render()清除
         for i in range(self.num_leds):
-            self.np[i] = color
-        self.np.write()
-    
+            self.base[i] = color
+        self._render()
+
     def clear_all(self):
-        """关闭所有LED灯"""
+        """关闭所有LED灯(灯效不受影响)"""
         self.set_all(self.BLACK)
-    
+
     def single_led(self, index, color):
         """点亮单个LED
         Args:
@@ -38,17 +195,22 @@ class JeepLed:
             color: LED颜色
         """
         if 0 <= index < self.num_leds:
-            self.np[index] = color
-            self.np.write()
+            self.base[index] = color
+            self._render()
 
 if __name__ == "__main__":
     jeepled = JeepLed(pin=0, num_leds=2)
     while True:
-        command = input("Enter command (on、off、color_RGB): ")
+        command = input("Enter command (on、off、show、blink、color_RGB): ")
         command_list = command.split(",")
         if command_list[0] == "on":
             jeepled.set_all(jeepled.WHITE)
         elif command_list[0] == "off":
+            jeepled.stop()
             jeepled.clear_all()
+        elif command_list[0] == "show":
+            jeepled.play("show", Sequence([jeepled.RED, jeepled.GREEN, jeepled.BLUE], 200, repeat=3))
+        elif command_list[0] == "blink":
+            jeepled.play("left", Blink((255, 120, 0), leds=(1,), count=5, off_color=jeepled.BLACK))
         else:
-            jeepled.set_all((int(command_list[0]), int(command_list[1]), int(command_list[2])))
\ No newline at end of file
+            jeepled.set_all((int(command_list[0]), int(command_list[1]), int(command_list[2])))
@@ -2,45 +2,102 @@
 from machine import Pin,PWM # type: ignore
 import utime # type: ignore
 
+# 马达能转动的最小占空比和最大占空比
+MIN_DUTY = 600
+MAX_DUTY = 1023
+# 减速到停止后至少保持停转的时长(毫秒)，等马达基本停下再反向加速，避免反接时的电流冲击
+REVERSE_DWELL_MS = 200
+
 class JeepMotor:
-    def __init__(self,ENA_PIN=14,IN1_PIN=12,IN2_PIN=13) -> None:
+    def __init__(self,ENA_PIN=14,IN1_PIN=12,IN2_PIN=13,slew=0,update_hz=100,reverse_dwell_ms=REVERSE_DWELL_MS) -> None:
         # 电机初始化，GPIO口分别是14、12、13，即D5、D6、D7。
         # 这里用一条控制逻辑，控制了两个马达。
+        # slew: 占空比每秒最多变化多少，0为立即生效；不为0时需要以update_hz的频率调用update()推进(ControlLoop会调用)
+        # reverse_dwell_ms: 有slew时，转动中减速到0后保持停转的时长，之后才重新起步(含换向)
         self.ENA = PWM(Pin(ENA_PIN)) # type: ignore
         self.ENA.freq(500)
         self.IN1 = Pin(IN1_PIN, Pin.OUT,value=0)
         self.IN2 = Pin(IN2_PIN, Pin.OUT,value=0)
+        self.ramp_step = max(1, slew // update_hz) if slew else 0
+        self.dwell_ticks = reverse_dwell_ms * update_hz // 1000
+        self._hold = 0  # 剩余的停转保持次数
+        # 带符号的占空比，正数为正转、负数为反转、0为停
+        self.target = 0
+        self.current = 0
+        # 已写入的输出，相同时不再重复写PWM和引脚
+        self._duty = 0
+        self._direction = 0
+        self.ENA.duty(0)
+
+    def _output(self, value):
+        # 把带符号的占空比写到马达，只写有变化的部分
+        if value > 0:
+            direction, duty = 1, value
+        elif value < 0:
+            direction, duty = 2, -value
+        else:
+            direction, duty = 0, 0
+        if duty != self._duty:
+            self._duty = duty
+            self.ENA.duty(duty)
+        if direction != self._direction:
+            self._direction = direction
+            if direction == 0:
+                self.IN1.off()
+                self.IN2.off()
+            elif direction == 1:
+                self.IN1.off()
+                self.IN2.on()
+            else:
+                self.IN1.on()
+                self.IN2.off()
 
     def motor(self,direction=0,speed=900):
         # direction为0是停转，为1是正转，为2是反转。
-        speed = min(max(speed, 600), 1023)  # 确保速度在 600 到 1023 之间
-        print(f"马达方向代码（0是停，1是正，2是反）：{direction}，速度：{speed}")
-        if direction == 0:
-            self.ENA.duty(0)
-            self.IN1.off()
-            self.IN2.off()
-        elif direction == 1:
-            self.ENA.duty(speed)
-            self.IN1.off()
-            self.IN2.on()
+        speed = min(max(speed, MIN_DUTY), MAX_DUTY)  # 确保速度在 600 到 1023 之间
+        if direction == 1:
+            self.target = speed
         elif direction == 2:
-            self.ENA.duty(speed)
-            self.IN1.on()
-            self.IN2.off()
+            self.target = -speed
+        else:
+            self.target = 0
+        if not self.ramp_step:
+            self.current = self.target
+            self._output(self.target)
+
+    def update(self):
+        # 按slew向目标占空比推进一步。低于MIN_DUTY时马达转不动，直接停；
+        # 换向时先停下，保持停转reverse_dwell_ms，再从MIN_DUTY开始反向加速
+        target = self.target
+        current = self.current
+        if current == target:
+            return
+        if current == 0:
+            if self._hold:
+                # 刚刚停下，先保持停转，再从MIN_DUTY起步
+                self._hold -= 1
+                return
+            current = MIN_DUTY if target > 0 else -MIN_DUTY
+        elif target > current:
+            current = min(current + self.ramp_step, target)
+        else:
+            current = max(current - self.ramp_step, target)
+        if -MIN_DUTY < current < MIN_DUTY:
+            current = 0
+            self._hold = self.dwell_ticks
+        self.current = current
+        self._output(current)
 
     def stop(self,speed=0):
         # 马达停止
-        print(f"全部停止！")
         self.motor(0,speed)
 
     def forward(self,speed=900):
         # 向前
-        print(f"向前，速度：{speed}。")
         self.motor(1,speed) 
 
     def backward(self,speed=900):
         # 向后
-        print(f"向后，速度：{speed}。")
         self.motor(2,speed)
 
 if __name__ == "__main__":
@@ -55,4 +112,4 @@ if __name__ == "__main__":
     utime.sleep(1)
     jeepmotor.stop()
 
-    print("测试结束。")
\ No newline at end of file
+    print("测试结束。")
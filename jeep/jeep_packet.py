@@ -0,0 +1,71 @@
+import ustruct # type: ignore
+from time import ticks_ms, ticks_diff # type: ignore
+
+# 二进制控制包，固定8字节，小端：
+#   版本(u8) 序号(u16) 左摇杆x 左摇杆y 右摇杆x 右摇杆y(有符号字节，-127~127，y向上为正) 按钮位(u8)
+# 按钮位是当前是否按住，按下动作由接收端比较前后两包得出。
+# 文本指令的第一个字节是字母，不会与版本号混淆，两种格式可以在同一个通道上混用。
+PACKET_FORMAT = "<BHbbbbB"
+PACKET_SIZE = 8
+PACKET_VERSION = 1
+
+BTN_LEFT_STICK = 0x01   # 左摇杆按钮
+BTN_RIGHT_STICK = 0x02  # 右摇杆按钮
+BTN_BLUE = 0x04         # 蓝色按钮
+BTN_RED = 0x08          # 红色按钮
+
+# 超过该时长没有收到有效包时，不再检查序号，接受任意序号(发送端重启后序号从头开始)
+RESYNC_MS = 1000
+
+def is_packet(data):
+    """判断收到的数据是不是二进制控制包"""
+    return len(data) == PACKET_SIZE and data[0] == PACKET_VERSION
+
+class ControlPacket:
+    """
+    控制包的编码和解码。
+    解码时丢弃版本不符、长度不符和序号不比上一包新的数据(乱序或重复)，序号按16位回绕比较。
+    """
+    def __init__(self):
+        self.buf = bytearray(PACKET_SIZE)  # 编码用的预分配缓冲区
+        self.seq = 0
+        self.lx = 0
+        self.ly = 0
+        self.rx = 0
+        self.ry = 0
+        self.buttons = 0
+        self._last_ms = None  # 上一个有效包的接收时间
+        self.invalid = 0      # 格式错误的包数
+        self.stale = 0        # 因序号过旧被丢弃的包数
+
+    def encode(self, lx, ly, rx, ry, buttons):
+        """
+        编码下一个包，序号自动递增，返回内部缓冲区(下次编码前有效)，供ESP-NOW遥控端发送。
+        """
+        self.seq = (self.seq + 1) & 0xFFFF
+        ustruct.pack_into(PACKET_FORMAT, self.buf, 0, PACKET_VERSION, self.seq, lx, ly, rx, ry, buttons)
+        return self.buf
+
+    def decode(self, data):
+        """
+        解码一个包，有效时更新lx/ly/rx/ry/buttons并返回True。
+        :param data: bytes、bytearray或memoryview
+        """
+        if not is_packet(data):
+            self.invalid += 1
+            return False
+        _, seq, lx, ly, rx, ry, buttons = ustruct.unpack_from(PACKET_FORMAT, data)
+        now = ticks_ms()
+        if self._last_ms is not None and ticks_diff(now, self._last_ms) < RESYNC_MS:
+            delta = (seq - self.seq) & 0xFFFF
+            if delta == 0 or delta >= 0x8000:
+                self.stale += 1
+                return False
+        self._last_ms = now
+        self.seq = seq
+        self.lx = lx
+        self.ly = ly
+        self.rx = rx
+        self.ry = ry
+        self.buttons = buttons
+        return True
@@ -1,4 +1,5 @@
 from machine import PWM,Pin # type: ignore
+import array
 import math
 
 # originally by Radomir Dopieralski http://sheep.art.pl
@@ -13,32 +14,68 @@ class Servo:
         min_us (int): The minimum signal length supported by the servo.
         max_us (int): The maximum signal length supported by the servo.
         angle (int): The angle between the minimum and maximum positions.
+        slew (int): Maximum speed in degrees per second, 0 for no ramp.
+        update_hz (int): How often update() is called when ``slew`` is set.
     """
-    def __init__(self, pin, freq=50, min_us=600, max_us=2400, angle=180):
+    def __init__(self, pin, freq=50, min_us=600, max_us=2400, angle=180, slew=0, update_hz=100):
         self.min_us = min_us
         self.max_us = max_us
         self.us = 0
         self.freq = freq
         self.angle = angle
         self.pwm = PWM(Pin(pin), freq=freq, duty=0) # type: ignore
+        self._duty = 0
+        # Duty for every whole degree from 0 to ``angle``, so write_angle is a table lookup.
+        total_range = max_us - min_us
+        self._lut = array.array("H", (self._duty_for_us(min_us + total_range * d // angle) for d in range(angle + 1)))
+        # Slew rate in degrees per second; 0 moves at once, otherwise update() must be
+        # called ``update_hz`` times per second to advance the ramp.
+        self.ramp_step = max(1, slew // update_hz) if slew else 0
+        self.target = None
+        self.current = None
+
+    def _duty_for_us(self, us):
+        us = min(self.max_us, max(self.min_us, us))
+        return us * 1024 * self.freq // 1000000
+
+    def _write_duty(self, duty):
+        # Skip the PWM write when the output would not change.
+        if duty != self._duty:
+            self._duty = duty
+            self.pwm.duty(duty)
 
     def write_us(self, us):
         """Set the signal to be ``us`` microseconds long. Zero disables it."""
+        self.target = self.current = None
         if us == 0:
-            self.pwm.duty(0)
+            self._write_duty(0)
             return
-        us = min(self.max_us, max(self.min_us, us))
-        duty = us * 1024 * self.freq // 1000000
-        self.pwm.duty(duty)
+        self._write_duty(self._duty_for_us(us))
 
     def write_angle(self, degrees=None, radians=None):
         """Move to the specified angle in ``degrees`` or ``radians``."""
         if degrees is None:
             degrees = math.degrees(radians) # type: ignore
-        degrees = degrees % 360
-        total_range = self.max_us - self.min_us
-        us = self.min_us + total_range * degrees // self.angle
-        self.write_us(us)
+        degrees = int(degrees) % 360
+        if degrees > self.angle:
+            degrees = self.angle
+        self.target = degrees
+        if not self.ramp_step or self.current is None:
+            self.current = degrees
+            self._write_duty(self._lut[degrees])
+
+    def update(self):
+        """Advance the slew ramp by one step towards the last requested angle."""
+        target = self.target
+        current = self.current
+        if target is None or target == current:
+            return
+        if target > current:
+            current = min(current + self.ramp_step, target)
+        else:
+            current = max(current - self.ramp_step, target)
+        self.current = current
+        self._write_duty(self._lut[current])
 
 if __name__ == "__main__":
     servo = Servo(15)
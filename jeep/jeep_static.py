@@ -0,0 +1,105 @@
+"""
+静态文件发送：按固定大小分块读取，用sendall发送，不把整个文件读进内存。
+- 客户端支持gzip且存在同名的.gz文件时，直接发送压缩文件(电脑上用 gzip -9 -k 文件名 生成后一起上传)
+- 用文件内容的CRC32作为ETag，客户端带If-None-Match且未变化时返回304
+"""
+import uos # type: ignore
+import ubinascii # type: ignore
+
+CHUNK_SIZE = 512
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "js": "application/javascript",
+    "css": "text/css",
+    "json": "application/json",
+    "png": "image/png",
+    "ico": "image/x-icon",
+}
+
+# 路径 -> (大小, 修改时间, ETag)，文件没有变化时不再重复计算CRC
+_etags = {}
+
+def _stat(path):
+    try:
+        st = uos.stat(path)
+        return st[6], st[8]
+    except OSError:
+        return None
+
+def content_type(path):
+    return CONTENT_TYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+def parse_request_head(data):
+    """
+    解析请求行和请求头。
+    :param data: 以空行结束的请求头字节数据
+    :return: (方法, 路径, 请求头字典)，请求头的名称统一转为小写
+    """
+    lines = data[:data.find(b'\r\n\r\n')].decode().split('\r\n')
+    parts = lines[0].split(' ')
+    if len(parts) != 3:
+        raise ValueError("无效的请求行")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    return parts[0], parts[1].split('?', 1)[0], headers
+
+def etag(path, size, mtime, chunk_size=CHUNK_SIZE):
+    """返回文件的ETag，按路径、大小和修改时间缓存"""
+    cached = _etags.get(path)
+    if cached and cached[0] == size and cached[1] == mtime:
+        return cached[2]
+    crc = 0
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            crc = ubinascii.crc32(mv[:n], crc)
+    tag = '"{:08x}-{:x}"'.format(crc, size)
+    _etags[path] = (size, mtime, tag)
+    return tag
+
+def send_file(sock, path, request_headers=None, chunk_size=CHUNK_SIZE):
+    """
+    发送静态文件，包含响应头。
+    :param sock: 客户端socket
+    :param path: 设备上的文件路径
+    :param request_headers: parse_request_head返回的请求头字典(小写名称)
+    :return: HTTP状态码，文件不存在时返回404且不发送任何内容
+    """
+    request_headers = request_headers or {}
+    send_path = path
+    encoding = ""
+    st = None
+    if "gzip" in request_headers.get("accept-encoding", ""):
+        st = _stat(path + ".gz")
+        if st is not None:
+            send_path = path + ".gz"
+            encoding = "Content-Encoding: gzip\r\n"
+    if st is None:
+        st = _stat(path)
+        if st is None:
+            return 404
+    size, mtime = st
+    tag = etag(send_path, size, mtime, chunk_size)
+    common = "ETag: " + tag + "\r\nCache-Control: no-cache\r\nVary: Accept-Encoding\r\nConnection: close\r\n"
+    if request_headers.get("if-none-match") == tag:
+        sock.sendall(("HTTP/1.1 304 Not Modified\r\n" + common + "\r\n").encode())
+        return 304
+    sock.sendall(("HTTP/1.1 200 OK\r\nContent-Type: " + content_type(path) + "\r\nContent-Length: " + str(size) + "\r\n" + encoding + common + "\r\n").encode())
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(send_path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            # sendall保证整块发完，不会像send一样只发出一部分
+            sock.sendall(mv[:n])
+    return 200
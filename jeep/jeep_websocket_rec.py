@@ -6,9 +6,21 @@ import gc
 import ubinascii # type: ignore
 import ujson # type: ignore
 import machine # type: ignore
+import jeep_static
 from jeep_action import JeepAction  # 提前导入避免循环引用问题
 jeep_action = JeepAction()
 
+# 每个WebSocket连接的接收缓冲区大小，控制指令都很短
+WS_BUFFER_SIZE = 1024
+# 为True时打印每条收到的指令和回复，调试用；控制指令很频繁，平时关闭以减少每条指令的开销
+WS_DEBUG = False
+
+# 可以通过HTTP访问的静态文件，只开放遥控网页
+STATIC_FILES = {
+    "/": "jeep_remote_index.html",
+    "/index.html": "jeep_remote_index.html",
+}
+
 wlan_sta = network.WLAN(network.STA_IF)
 wlan_sta.active(True)
 wlan_mac = wlan_sta.config('mac')
@@ -54,17 +66,177 @@ def ws_handshake(sock, data):
             return True
     return False
 
-def ws_send(sock, message):
-    """发送WebSocket消息"""
+# WebSocket操作码
+WS_OP_CONT = 0x0
+WS_OP_TEXT = 0x1
+WS_OP_BINARY = 0x2
+WS_OP_CLOSE = 0x8
+WS_OP_PING = 0x9
+WS_OP_PONG = 0xA
+
+try:
+    import micropython # type: ignore
+
+    @micropython.viper
+    def _unmask(buf, start: int, n: int, mask):
+        # 原生代码逐字节异或掩码，速度接近C
+        p = ptr8(buf) # type: ignore
+        m = ptr8(mask) # type: ignore
+        i = 0
+        while i < n:
+            p[start + i] = p[start + i] ^ m[i & 3]
+            i += 1
+except:
+    def _unmask(buf, start, n, mask):
+        # 没有viper时把整段当作大整数一次异或，避免逐字节的Python循环
+        seg = memoryview(buf)[start:start + n]
+        key = (bytes(mask) * ((n >> 2) + 1))[:n]
+        seg[:] = (int.from_bytes(seg, 'big') ^ int.from_bytes(key, 'big')).to_bytes(n, 'big')
+
+class WsFrameParser:
+    """
+    单个连接的增量WebSocket帧解析器。
+    数据直接接收到预分配的bytearray中，用读写偏移量管理，不再反复拼接和切片bytes；
+    支持16位和64位长度、分片消息和控制帧(ping/pong/close)。
+    """
+    def __init__(self, size=1024):
+        """
+        :param size: 缓冲区大小，需能容纳最大的一条完整消息
+        """
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.start = 0       # 下一帧的起始偏移
+        self.end = 0         # 已接收数据的结束偏移
+        self.msg_opcode = 0  # 正在拼接的分片消息的操作码，0表示没有
+        self.msg_start = 0   # 分片消息已拼接部分的起始偏移
+        self.msg_len = 0     # 分片消息已拼接部分的长度
+
+    def _move(self, dst, src, n):
+        # 把数据向缓冲区前部移动，每次拷贝的长度不超过移动距离，保证源和目标不重叠
+        step = src - dst
+        pos = 0
+        while pos < n:
+            size = min(step, n - pos)
+            self.mv[dst + pos:dst + pos + size] = self.mv[src + pos:src + pos + size]
+            pos += size
+
+    def free(self):
+        """返回缓冲区尾部的空闲空间，空间不足时先把未处理的数据移到缓冲区开头"""
+        keep = self.msg_start if self.msg_opcode else self.start
+        if keep == self.end:
+            # 数据已全部处理，直接复位偏移量
+            if self.msg_opcode:
+                self.msg_start = 0
+            self.start = self.end = 0
+        elif keep > 0 and len(self.buf) - self.end < len(self.buf) >> 2:
+            self._move(0, keep, self.end - keep)
+            self.start -= keep
+            self.end -= keep
+            if self.msg_opcode:
+                self.msg_start -= keep
+        if self.end == len(self.buf):
+            raise ValueError("WebSocket消息超过缓冲区大小")
+        return self.mv[self.end:]
+
+    def commit(self, n):
+        """登记写入free()返回空间中的n个字节"""
+        self.end += n
+
+    def feed(self, data):
+        """拷贝一段已收到的数据到缓冲区，如握手请求之后紧跟的数据"""
+        pos = 0
+        while pos < len(data):
+            space = self.free()
+            n = min(len(space), len(data) - pos)
+            space[:n] = data[pos:pos + n]
+            self.commit(n)
+            pos += n
+
+    def recv_from(self, sock):
+        """
+        从socket直接读入缓冲区，返回读到的字节数，0表示对端已关闭，None表示暂时没有数据。
+        sock需为非阻塞模式，只读取已到达的数据，不会等缓冲区填满。
+        """
+        n = sock.readinto(self.free())
+        if n:
+            self.commit(n)
+        return n
+
+    def next(self):
+        """
+        解析下一条完整的消息或控制帧。
+        :return: (操作码, 负载memoryview)，数据不完整时返回None；
+                 负载直接引用内部缓冲区，在下一次调用free/feed/recv_from之前有效
+        """
+        buf = self.buf
+        while True:
+            i = self.start
+            avail = self.end - i
+            if avail < 2:
+                return None
+            fin = buf[i] & 0x80
+            opcode = buf[i] & 0x0F
+            masked = buf[i + 1] & 0x80
+            n = buf[i + 1] & 0x7F
+            hdr = 2
+            if n == 126:
+                if avail < 4:
+                    return None
+                n = (buf[i + 2] << 8) | buf[i + 3]
+                hdr = 4
+            elif n == 127:
+                if avail < 10:
+                    return None
+                n = int.from_bytes(self.mv[i + 2:i + 10], 'big')
+                hdr = 10
+            if masked:
+                hdr += 4
+            if hdr + n + (self.msg_len if self.msg_opcode else 0) > len(buf):
+                raise ValueError(f"WebSocket消息过大: {n}字节")
+            if avail < hdr + n:
+                return None
+            p = i + hdr
+            if masked:
+                _unmask(buf, p, n, bytes(self.mv[p - 4:p]))
+            self.start = p + n
+            if opcode >= WS_OP_CLOSE:
+                # 控制帧不分片，可以插在分片消息中间
+                return opcode, self.mv[p:p + n]
+            if opcode != WS_OP_CONT:
+                if fin:
+                    self.msg_opcode = 0
+                    return opcode, self.mv[p:p + n]
+                # 分片消息的第一帧
+                self.msg_opcode = opcode
+                self.msg_start = p
+                self.msg_len = n
+                continue
+            if not self.msg_opcode:
+                continue  # 没有开头的续帧，丢弃
+            # 续帧：把负载接到已拼接部分的后面
+            dst = self.msg_start + self.msg_len
+            if dst != p:
+                self._move(dst, p, n)
+            self.msg_len += n
+            if fin:
+                opcode = self.msg_opcode
+                self.msg_opcode = 0
+                return opcode, self.mv[self.msg_start:self.msg_start + self.msg_len]
+
+def ws_send(sock, message, opcode=WS_OP_TEXT):
+    """发送WebSocket消息，message为str或bytes，默认作为文本帧发送"""
     try:
-        msg_bytes = message.encode('utf-8')
-        frame = bytearray([0x81])  # 文本帧
+        msg_bytes = message.encode('utf-8') if isinstance(message, str) else message
+        frame = bytearray([0x80 | opcode])
         
         if len(msg_bytes) < 126:
             frame.append(len(msg_bytes))
-        else:
+        elif len(msg_bytes) < 65536:
             frame.append(126)
             frame.extend(len(msg_bytes).to_bytes(2, 'big'))
+        else:
+            frame.append(127)
+            frame.extend(len(msg_bytes).to_bytes(8, 'big'))
         
         frame.extend(msg_bytes)
         sock.send(bytes(frame))
@@ -73,55 +245,34 @@ def ws_send(sock, message):
         print(f"发送错误: {e}")
         return False
 
-def ws_receive(data):
-    """解析WebSocket消息"""
-    # 检查是否是握手响应（包含HTTP头）
-    if b'\r\n\r\n' in data:
-        # print("检测到握手响应，跳过...")
-        header_end = data.find(b'\r\n\r\n') + 4  # 找到HTTP头结束位置
-        data = data[header_end:]  # 提取纯WebSocket数据帧部分
-        
-    if len(data) < 2:
-        return None, data
-    
-    # 检查操作码
-    opcode = data[0] & 0x0F
-    if opcode != 0x01:  # 非文本帧
-        return None, data[2:]
-    
-    masked = data[1] & 0x80
-    payload_len = data[1] & 0x7F
-    
-    idx = 2
-    if payload_len == 126:
-        if len(data) < 4:
-            return None, data
-        payload_len = int.from_bytes(data[2:4], 'big')
-        idx = 4
-    elif payload_len == 127:
-        return None, data  # 不支持超长消息
-    
-    if masked:
-        if len(data) < idx + 4 + payload_len:
-            return None, data
-        mask = data[idx:idx+4]
-        idx += 4
-    else:
-        if len(data) < idx + payload_len:
-            return None, data
-    
-    payload = data[idx:idx+payload_len]
-    
-    if masked:
-        payload = bytearray(payload)
-        for i in range(len(payload)):
-            payload[i] ^= mask[i % 4]
-        payload = bytes(payload)
-    
-    try:
-        return payload.decode('utf-8'), data[idx+payload_len:]
-    except:
-        return None, data[idx+payload_len:]
+def ws_process(sock, parser, client_id):
+    """处理解析器中所有完整的WebSocket消息，收到关闭帧时返回False"""
+    while True:
+        frame = parser.next()
+        if frame is None:
+            return True
+        opcode, payload = frame
+        if opcode == WS_OP_TEXT:
+            msg = bytes(payload).decode('utf-8')
+            if WS_DEBUG:
+                print(f"📥 客户端 #{client_id}: {msg}")
+            # 处理命令并回复
+            response = handle_command(msg)
+        elif opcode == WS_OP_BINARY:
+            # 二进制控制包直接执行，不回复确认，减少每条指令的处理和传输开销
+            jeep_action.packet2action(payload)
+            continue
+        elif opcode == WS_OP_PING:
+            ws_send(sock, bytes(payload), WS_OP_PONG)
+            continue
+        elif opcode == WS_OP_CLOSE:
+            ws_send(sock, bytes(payload[:2]), WS_OP_CLOSE)
+            return False
+        else:
+            continue
+        ws_send(sock, response)
+        if WS_DEBUG:
+            print(f"📤 服务端: {response}")
 
 def handle_command(message):
     """处理客户端命令"""
@@ -142,6 +293,17 @@ def handle_command(message):
             return ujson.dumps({"cmd_type":"wifistatus","ap_ip":str(ap.ifconfig()[0]),"sta_ip":str(wlan_sta.ifconfig()[0])})
     except Exception as e:
         return ujson.dumps({"cmd_type":"error","return_detail": str(e)})
+def serve_http(sock, data):
+    """处理普通HTTP请求，提供遥控网页"""
+    method, path, headers = jeep_static.parse_request_head(data)
+    print(f"HTTP请求: {method} {path}")
+    # 发送网页期间阻塞，设置超时避免慢客户端长时间卡住控制指令
+    sock.settimeout(5)
+    if method == "GET" and path in STATIC_FILES:
+        if jeep_static.send_file(sock, STATIC_FILES[path], headers) != 404:
+            return
+    sock.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\nConnection: close\r\n\r\n404 Not Found")
+
 def start_websocket_server():
     """启动WebSocket服务器"""
     apmodel()
@@ -159,6 +321,7 @@ def start_websocket_server():
     
     clients = {}  # sock -> buffer
     client_ids = {}  # sock -> id
+    parsers = {}  # 已完成握手的连接 -> WsFrameParser
     next_client_id = 1
     
     try:
@@ -169,6 +332,8 @@ def start_websocket_server():
                 if sock is server_socket:
                     # 新客户端连接
                     client_sock, addr = server_socket.accept()
+                    # 非阻塞读取，poll报告可读时只取已到达的数据，不会卡住其他连接
+                    client_sock.setblocking(False)
                     client_id = next_client_id
                     next_client_id += 1
                     clients[client_sock] = b''
@@ -179,16 +344,31 @@ def start_websocket_server():
                 else:
                     # 处理客户端数据
                     try:
-                        data = sock.recv(256)  # 减小缓冲区
+                        if sock in parsers:
+                            # 已握手的WebSocket连接，数据直接收进解析器的预分配缓冲区
+                            parser = parsers[sock]
+                            n = parser.recv_from(sock)
+                            if n is None or (n and ws_process(sock, parser, client_ids[sock])):
+                                continue
+                            data = b''  # 对端断开或发送了关闭帧
+                        else:
+                            data = sock.recv(256)  # 减小缓冲区
                         if data:
                             clients[sock] += data                     
-                            # 检查是否是WebSocket握手
+                            # 检查是否是WebSocket握手，请求头接收完整后再处理
+                            if b'\r\n\r\n' not in clients[sock]:
+                                continue
                             if b'GET' in clients[sock] and b'Upgrade: websocket' in clients[sock]:
                                 if ws_handshake(sock, clients[sock]):
                                     client_id = client_ids[sock]
                                     print(f"🔗 客户端 #{client_id} 握手成功")
                                     ws_send(sock, ujson.dumps({"cmd_type":"websocket","connect_status":f"websocket连接成功! 你是客户端 #{client_id}"}))
+                                    parser = WsFrameParser(WS_BUFFER_SIZE)
+                                    # 握手请求之后可能已经跟着WebSocket数据
+                                    parser.feed(clients[sock][clients[sock].find(b'\r\n\r\n') + 4:])
+                                    parsers[sock] = parser
                                     clients[sock] = b''  # 清空缓冲区
+                                    ws_process(sock, parser, client_id)
                                 else:
                                     # 发送普通HTTP响应
                                     sock.send(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\n")
@@ -197,19 +377,11 @@ def start_websocket_server():
                                     del clients[sock]
                                     del client_ids[sock]
                             else:
-                                # 处理WebSocket数据
-                                while True:
-                                    msg, remaining = ws_receive(clients[sock])
-                                    if msg is None:
-                                        break                                   
-                                    client_id = client_ids[sock]
-                                    print(f"📥 客户端 #{client_id}: {msg}")                                    
-                                    # 处理命令并回复
-                                    response = handle_command(msg)
-                                    ws_send(sock, response)
-                                    print(f"📤 服务端: {response}")                                   
-                                    clients[sock] = remaining
-                                    gc.collect()  # 及时回收内存                       
+                                serve_http(sock, clients[sock])
+                                poll.unregister(sock)
+                                sock.close()
+                                del clients[sock]
+                                del client_ids[sock]
                         else:
                             # 客户端断开连接
                             client_id = client_ids.get(sock, '未知')
@@ -220,6 +392,7 @@ def start_websocket_server():
                                 del clients[sock]
                             if sock in client_ids:
                                 del client_ids[sock]
+                            parsers.pop(sock, None)
                                 
                     except Exception as e:
                         # 客户端错误
@@ -234,10 +407,13 @@ def start_websocket_server():
                             del clients[sock]
                         if sock in client_ids:
                             del client_ids[sock]
+                        parsers.pop(sock, None)
             
             # 定期内存回收
             if ticks_ms() % 5000 < 100:  # 每5秒左右回收一次
                 gc.collect()
+                if parsers:
+                    print(jeep_action.control.format_report())
                 
     except KeyboardInterrupt:
         print("\n🛑 服务器被用户停止")
@@ -0,0 +1,15 @@
+"""
+主机上的回归测试，在模拟器(eink_tools/sim)上运行设备端的纯Python部分：
+    python -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "eink_tools"))
+
+import sim  # noqa: E402
+
+# 必须在导入设备端模块之前替换machine、framebuf、uasyncio等模块
+sim.install(out_dir=None)
+sys.path.insert(0, os.path.join(ROOT, "jeep"))
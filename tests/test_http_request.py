@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from ink_websocket import parse_request_head, HttpBody
+
+class Reader:
+    """按固定大小分段返回数据的StreamReader替身"""
+    def __init__(self, data, step=5):
+        self.data = data
+        self.step = step
+
+    async def read(self, n):
+        n = min(n, self.step)
+        data, self.data = self.data[:n], self.data[n:]
+        return data
+
+    async def readinto(self, buf):
+        data = await self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+def read_all(body, size=7):
+    async def run():
+        out = bytearray()
+        buf = bytearray(size)
+        while True:
+            n = await body.readinto(buf)
+            if not n:
+                return bytes(out)
+            out += buf[:n]
+    return asyncio.run(run())
+
+def test_parse_request_head():
+    req = parse_request_head(b"POST /api/show?page=2&mode=full HTTP/1.1\r\nHost: ink\r\nContent-Length: 12\r\n\r\n")
+    assert req["method"] == "POST"
+    assert req["path"] == "/api/show"
+    assert req["query_params"] == {"page": "2", "mode": "full"}
+    assert req["http_version"] == "HTTP/1.1"
+    assert req["headers"]["Content-Length"] == "12"
+
+def test_bad_request_line():
+    with pytest.raises(ValueError):
+        parse_request_head(b"GARBAGE\r\n\r\n")
+
+def test_content_length_with_first_bytes():
+    body = HttpBody(Reader(b"world!extra"), {"Content-Length": "12"}, first=b"hello ")
+    assert read_all(body) == b"hello world!"
+    assert body.done
+
+def test_empty_body():
+    body = HttpBody(Reader(b""), {})
+    assert read_all(body) == b""
+
+def test_chunked():
+    raw = b"5\r\nhello\r\n7;ext=1\r\n, world\r\n0\r\nX-Trailer: 1\r\n\r\n"
+    body = HttpBody(Reader(raw[4:], step=3), {"transfer-encoding": "chunked"}, first=raw[:4])
+    assert read_all(body, size=4) == b"hello, world"
+    assert body.done
+
+def test_invalid_chunk_length():
+    body = HttpBody(Reader(b"zz\r\nhello\r\n"), {"Transfer-Encoding": "chunked"})
+    with pytest.raises(ValueError):
+        read_all(body)
+
+def test_truncated_body():
+    body = HttpBody(Reader(b"short"), {"Content-Length": "100"})
+    with pytest.raises(OSError):
+        read_all(body)
+    body = HttpBody(Reader(b"a\r\nabc"), {"Transfer-Encoding": "chunked"})
+    with pytest.raises(OSError):
+        read_all(body)
+
+def test_read_limits():
+    body = HttpBody(Reader(b"x" * 100), {"Content-Length": "100"})
+    with pytest.raises(ValueError):
+        asyncio.run(body.read(50))
+    body = HttpBody(Reader(b"400\r\n" + b"x" * 1024 + b"\r\n0\r\n\r\n"), {"Transfer-Encoding": "chunked"})
+    with pytest.raises(ValueError):
+        asyncio.run(body.read(600))
+    body = HttpBody(Reader(b'{"a": 1}'), {"Content-Length": "8"})
+    assert asyncio.run(body.read(50)) == b'{"a": 1}'
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from ink_cache import FileCache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return FileCache("cache", 100)
+
+def index(dirname="cache"):
+    with open(os.path.join(dirname, "index.json")) as f:
+        return json.load(f)
+
+def test_put_get(cache):
+    assert cache.get("a") is None
+    cache.put("a", b"x" * 10)
+    path = cache.get("a")
+    with open(path, "rb") as f:
+        assert f.read() == b"x" * 10
+    assert "a" in cache and "b" not in cache
+    assert cache.total_bytes() == 10
+
+def test_hit_does_not_rewrite_index_until_flush(cache):
+    cache.put("a", b"1" * 10)
+    cache.put("b", b"2" * 10)
+    before = index()
+    cache.get("a")
+    assert index() == before
+    cache.flush()
+    assert index() != before
+    assert index()["entries"]["a"][1] > index()["entries"]["b"][1]
+
+def test_lru_eviction(cache):
+    cache.put("a", b"1" * 40)
+    cache.put("b", b"2" * 40)
+    cache.get("a")
+    cache.put("c", b"3" * 40)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.total_bytes() == 80
+
+def test_replace_counts_once(cache):
+    cache.put("a", b"1" * 60)
+    cache.put("a", b"2" * 60)
+    assert cache.total_bytes() == 60
+    with open(cache.get("a"), "rb") as f:
+        assert f.read() == b"2" * 60
+
+def test_evict_and_remove(cache):
+    cache.put("a", b"1" * 30)
+    cache.put("b", b"2" * 30)
+    cache.evict()
+    assert "a" in cache and "b" in cache
+    cache.evict(60)
+    assert "a" not in cache
+    assert list(index()["entries"]) == ["b"]
+    cache.remove("b")
+    assert "b" not in cache
+    assert cache.total_bytes() == 0
+    assert index()["entries"] == {}
+
+def test_reload_from_index(cache):
+    cache.put("a", b"1" * 30)
+    cache.get("a")
+    cache.flush()
+    reloaded = FileCache("cache", 100)
+    assert "a" in reloaded
+    assert reloaded.total_bytes() == 30
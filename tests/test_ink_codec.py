@@ -0,0 +1,64 @@
+import io
+import os
+
+import pytest
+
+import ink_codec
+
+def sample_frame(width=400, height=300):
+    # 大片空白、整行黑色和随机噪点混合，覆盖重复段和原始字节段
+    stride = ink_codec.frame_size(width, 1)
+    frame = bytearray(b"\xff" * ink_codec.frame_size(width, height))
+    frame[stride * 10:stride * 12] = b"\x00" * (stride * 2)
+    frame[stride * 50:stride * 60] = os.urandom(stride * 10)
+    frame[-3:] = b"\x12\x34\x56"
+    return bytes(frame)
+
+def test_round_trip():
+    frame = sample_frame()
+    packed = ink_codec.encode(frame)
+    assert ink_codec.parse_header(packed) == (400, 300)
+    assert len(packed) < len(frame)
+    out = bytearray(len(frame))
+    assert ink_codec.decode_into(packed, out) == (400, 300)
+    assert bytes(out) == frame
+
+def test_long_runs_and_literals():
+    # 超过128字节的重复段和原始段都要拆开编码
+    data = b"\xaa" * 300 + bytes(range(256)) + b"\x00" * 129 + b"\x01\x02"
+    packed = ink_codec.packbits_encode(data)
+    out = bytearray(len(data))
+    decoder = ink_codec.PackBitsDecoder(out)
+    decoder.feed(packed)
+    assert decoder.done()
+    assert bytes(out) == data
+
+def test_raw_data_has_no_header():
+    assert ink_codec.parse_header(b"\xff" * 20) is None
+    with pytest.raises(ValueError):
+        ink_codec.decode_into(b"\xff" * 20, bytearray(20))
+
+def test_encode_checks_size():
+    with pytest.raises(ValueError):
+        ink_codec.encode(b"\xff" * 10, 400, 300)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 512])
+def test_decode_stream_in_chunks(chunk_size):
+    frame = sample_frame()
+    packed = ink_codec.encode(frame)
+    stream = io.BytesIO(packed[ink_codec.HEADER_SIZE + 5:])
+    out = bytearray(len(frame))
+    nbytes = ink_codec.decode_stream(stream, out, packed[ink_codec.HEADER_SIZE:ink_codec.HEADER_SIZE + 5], chunk_size)
+    assert bytes(out) == frame
+    assert nbytes == len(packed) - ink_codec.HEADER_SIZE - 5
+
+def test_decode_stream_truncated():
+    packed = ink_codec.encode(sample_frame())
+    stream = io.BytesIO(packed[ink_codec.HEADER_SIZE:-10])
+    with pytest.raises(ValueError):
+        ink_codec.decode_stream(stream, bytearray(15000))
+
+def test_decoder_rejects_overflow():
+    decoder = ink_codec.PackBitsDecoder(bytearray(4))
+    with pytest.raises(ValueError):
+        decoder.feed(ink_codec.packbits_encode(b"\x00" * 8))
@@ -0,0 +1,72 @@
+import framebuf
+import pytest
+
+import ink_font
+from make_font import pack_bitmap, write_font
+
+def solid(width, height):
+    return pack_bitmap([[1] * width for _ in range(height)], width, height)
+
+@pytest.fixture
+def fonts(tmp_path):
+    # 8号字体只有"A"(宽4)和"中"(宽8)，16号字体只有"A"
+    write_font(str(tmp_path / "font8.efn"), 8, {ord("A"): (4, solid(4, 8)), ord("中"): (8, solid(8, 8))})
+    write_font(str(tmp_path / "font16.efn"), 16, {ord("A"): (8, solid(8, 16))})
+    (tmp_path / "readme.txt").write_text("not a font")
+    return ink_font.FontSet(str(tmp_path))
+
+def blank(width=64, height=40):
+    buf = bytearray(b"\xff" * (width // 8 * height))
+    return framebuf.FrameBuffer(buf, width, height, framebuf.MONO_HLSB)
+
+def test_font_choice(fonts):
+    assert fonts.sizes == [8, 16]
+    assert fonts.font(8).height == 8
+    assert fonts.font(12).height == 8
+    assert fonts.font(30).height == 16
+    assert fonts.font(4).height == 8
+    assert fonts.font(12) is fonts.font(8)
+
+def test_glyph_lookup(fonts):
+    font = fonts.font(8)
+    assert font.glyph("A")[0] == 4
+    assert font.glyph("中")[0] == 8
+    assert font.glyph("B") is None
+    assert font.text_width("A中B") == 4 + 8 + 4
+    assert font.missing("A中B\n文") == ["B", "文"]
+
+def test_not_a_font(tmp_path):
+    path = tmp_path / "bad.efn"
+    path.write_bytes(b"\x00" * 32)
+    with pytest.raises(ValueError):
+        ink_font.BitmapFont(str(path))
+
+def test_missing_chars(fonts, tmp_path):
+    assert ink_font.missing_chars(fonts, {"text": "A中\nAB|-1|16", "fontsize": 8}) == ["B"]
+    assert ink_font.missing_chars(fonts, {"text": "中"}) == ["中"]
+    assert ink_font.missing_chars(ink_font.FontSet(str(tmp_path / "none")), {"text": "A"}) is None
+
+def test_parse_layout():
+    data = {"text": "一|0|20\n二||\n三|-2", "fontsize": 16, "align": -1}
+    assert ink_font.parse_layout(data) == [("一", 0, 20), ("二", -1, 16), ("三", -2, 16)]
+
+def test_render_alignment(fonts):
+    fb = blank()
+    y = ink_font.render_layout(fb, 64, 40, fonts, {"text": "A|2|8\nA|-1|8\nA|-2|8"})
+    assert y == 3 * (8 + ink_font.LINE_GAP)
+    row = [[fb.pixel(x, yy) for x in range(64)] for yy in (0, 13, 26)]
+    assert [x for x in range(64) if row[0][x] == 0] == [2, 3, 4, 5]
+    assert [x for x in range(64) if row[1][x] == 0] == [30, 31, 32, 33]
+    assert [x for x in range(64) if row[2][x] == 0] == [60, 61, 62, 63]
+
+def test_render_wraps_and_clips(fonts):
+    fb = blank()
+    # 每行最多8个"中"，20个字折成3行，第3行超出高度20后不再绘制
+    y = ink_font.render_layout(fb, 64, 20, fonts, {"text": "中" * 20, "fontsize": 8, "align": 0})
+    assert y == 2 * (8 + ink_font.LINE_GAP)
+    assert fb.pixel(63, 0) == 0 and fb.pixel(63, 13) == 0
+    assert all(fb.pixel(x, 8) == 1 for x in range(64))
+
+def test_render_without_fonts(tmp_path):
+    with pytest.raises(OSError):
+        ink_font.render_layout(blank(), 64, 40, ink_font.FontSet(str(tmp_path)), {"text": "A"})
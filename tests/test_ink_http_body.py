@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+from ink_http import Body
+
+def read_all(body, size=5):
+    out = bytearray()
+    buf = bytearray(size)
+    while True:
+        n = body.readinto(buf)
+        if not n:
+            return bytes(out)
+        out += buf[:n]
+
+def test_content_length():
+    body = Body(io.BytesIO(b"0123456789tail"), 10, False)
+    assert read_all(body) == b"0123456789"
+    assert body.done and body.remaining == 0
+
+def test_chunked():
+    raw = b"4\r\nWiki\r\n6;name=x\r\npedia \r\nE\r\nin \r\n\r\nchunks.\r\n0\r\nExpires: never\r\n\r\n"
+    body = Body(io.BytesIO(raw), None, True)
+    assert read_all(body, size=3) == b"Wikipedia in \r\n\r\nchunks."
+    assert body.done
+
+def test_chunked_read():
+    body = Body(io.BytesIO(b"3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n"), None, True)
+    assert body.read() == b"abcde"
+
+def test_until_eof():
+    body = Body(io.BytesIO(b"no length"), None, False)
+    assert read_all(body) == b"no length"
+
+def test_truncated():
+    with pytest.raises(OSError):
+        read_all(Body(io.BytesIO(b"short"), 100, False))
+    with pytest.raises(OSError):
+        read_all(Body(io.BytesIO(b"a\r\nabc"), None, True))
@@ -0,0 +1,49 @@
+import sim
+
+from jeep_packet import ControlPacket, is_packet, PACKET_SIZE, RESYNC_MS, BTN_BLUE, BTN_RED
+
+def packet(seq, lx=0, ly=0, rx=0, ry=0, buttons=0):
+    sender = ControlPacket()
+    sender.seq = (seq - 1) & 0xFFFF
+    return bytes(sender.encode(lx, ly, rx, ry, buttons))
+
+def test_round_trip():
+    sender, receiver = ControlPacket(), ControlPacket()
+    data = sender.encode(-127, 127, 5, -5, BTN_BLUE | BTN_RED)
+    assert len(data) == PACKET_SIZE and is_packet(data)
+    assert receiver.decode(memoryview(data))
+    assert (receiver.lx, receiver.ly, receiver.rx, receiver.ry) == (-127, 127, 5, -5)
+    assert receiver.buttons == BTN_BLUE | BTN_RED
+    assert receiver.seq == sender.seq == 1
+
+def test_invalid_packets():
+    receiver = ControlPacket()
+    assert not is_packet(b"forward")
+    assert not receiver.decode(b"\x01" * 7)
+    assert not receiver.decode(b"\x02" + bytes(7))
+    assert receiver.invalid == 2
+
+def test_duplicate_and_out_of_order():
+    receiver = ControlPacket()
+    assert receiver.decode(packet(10, lx=1))
+    assert not receiver.decode(packet(10, lx=2))
+    assert not receiver.decode(packet(9, lx=3))
+    assert receiver.decode(packet(12, lx=4))
+    assert receiver.stale == 2
+    assert receiver.lx == 4
+
+def test_sequence_wraps():
+    receiver = ControlPacket()
+    assert receiver.decode(packet(0xFFFF))
+    assert receiver.decode(packet(0))
+    assert receiver.decode(packet(1))
+    assert not receiver.decode(packet(0xFFFE))
+
+def test_resync_after_silence():
+    # 发送端重启后序号从头开始，超过RESYNC_MS没有有效包时接受
+    receiver = ControlPacket()
+    assert receiver.decode(packet(500))
+    assert not receiver.decode(packet(1))
+    sim.clock.advance_us((RESYNC_MS + 1) * 1000)
+    assert receiver.decode(packet(1))
+    assert receiver.seq == 1
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from ink_websocket import WsFrameParser, WS_OP_TEXT, WS_OP_BINARY, WS_OP_CONT, WS_OP_PING
+
+def frame(opcode, payload, fin=True, mask=True):
+    # 按RFC 6455编码一帧，客户端发来的帧带掩码
+    head = bytearray([(0x80 if fin else 0) | opcode])
+    bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head.append(bit | n)
+    elif n < 65536:
+        head.append(bit | 126)
+        head += n.to_bytes(2, "big")
+    else:
+        head.append(bit | 127)
+        head += n.to_bytes(8, "big")
+    if mask:
+        key = os.urandom(4)
+        head += key
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return bytes(head) + payload
+
+def messages(parser):
+    out = []
+    while True:
+        msg = parser.next()
+        if msg is None:
+            return out
+        out.append((msg[0], bytes(msg[1])))
+
+def test_masked_text_and_lengths():
+    parser = WsFrameParser(1024)
+    medium = os.urandom(300)
+    parser.feed(frame(WS_OP_TEXT, b"hello") + frame(WS_OP_BINARY, medium) + frame(WS_OP_TEXT, b"x", mask=False))
+    assert messages(parser) == [(WS_OP_TEXT, b"hello"), (WS_OP_BINARY, medium), (WS_OP_TEXT, b"x")]
+
+def test_64bit_length():
+    parser = WsFrameParser(70100)
+    payload = os.urandom(70000)
+    parser.feed(frame(WS_OP_BINARY, payload))
+    assert messages(parser) == [(WS_OP_BINARY, payload)]
+
+def test_byte_by_byte():
+    parser = WsFrameParser(256)
+    data = frame(WS_OP_TEXT, b"abc" * 50)
+    got = []
+    for i in range(len(data)):
+        parser.feed(data[i:i + 1])
+        got += messages(parser)
+    assert got == [(WS_OP_TEXT, b"abc" * 50)]
+
+def test_fragmented_with_control_frame():
+    parser = WsFrameParser(1024)
+    parser.feed(frame(WS_OP_TEXT, b"hel", fin=False) + frame(WS_OP_PING, b"p")
+                + frame(WS_OP_CONT, b"lo ", fin=False) + frame(WS_OP_CONT, b"world"))
+    assert messages(parser) == [(WS_OP_PING, b"p"), (WS_OP_TEXT, b"hello world")]
+
+def test_orphan_continuation_is_dropped():
+    parser = WsFrameParser(256)
+    parser.feed(frame(WS_OP_CONT, b"junk") + frame(WS_OP_TEXT, b"ok"))
+    assert messages(parser) == [(WS_OP_TEXT, b"ok")]
+
+def test_buffer_reuse_over_many_messages():
+    # 缓冲区远小于总数据量，消费后空间应被回收
+    parser = WsFrameParser(128)
+    for i in range(200):
+        payload = bytes([i % 256]) * 40
+        parser.feed(frame(WS_OP_BINARY, payload))
+        assert messages(parser) == [(WS_OP_BINARY, payload)]
+
+def test_oversize_message():
+    parser = WsFrameParser(64)
+    parser.feed(frame(WS_OP_BINARY, b"\x00" * 100)[:10])
+    with pytest.raises(ValueError):
+        parser.next()
+
+def test_oversize_fragments():
+    parser = WsFrameParser(64)
+    parser.feed(frame(WS_OP_TEXT, b"a" * 30, fin=False))
+    assert parser.next() is None
+    parser.feed(frame(WS_OP_CONT, b"b" * 30)[:6])
+    with pytest.raises(ValueError):
+        parser.next()